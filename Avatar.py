@@ -10,6 +10,9 @@ import picture
 
 class Avatar :
 
+    # Image drawn for the avatar
+    SPRITE = "rec/avatar.gif"
+
     # Constructor for the avatar class
     #
     # Input parameters x and y are the initial integer positions of the
@@ -81,11 +84,11 @@ class Avatar :
     # Draw the avatar
     #
     # Uses the avatar's current position to place and draw the avatar
-    #    on the canvas
-    def draw(self):
+    #    on the given StdDraw canvas, the window by default
+    def draw(self, canvas=StdDraw.getDefaultCanvas()):
         drawX = (self.x + 0.5) * Tile.SIZE
         drawY = (self.y + 0.5) * Tile.SIZE
-        StdDraw.picture(picture.Picture("rec/avatar.gif"), drawX, drawY)
+        canvas.picture(picture.sprite(self.SPRITE), drawX, drawY)
 
 # Main code to test the avatar class    
 if __name__ == "__main__":
@@ -0,0 +1,93 @@
+#
+# Author: Lorn Jaeger
+#
+# Description: Headless simulation benchmark for the Ultima 0.1 game. Loads
+#              a level without opening a window, runs a number of simulation
+#              ticks with scripted avatar input and no sleeps, and reports
+#              ticks per second and the time spent in each phase.
+#
+# Usage: python Benchmark.py level [ticks] [keys] [tickMs] [seed] [store]
+#
+
+import sys
+import time
+import random
+from World import World
+from EventLog import EventLog, eventLog
+
+# Default number of ticks, avatar input script and simulated tick length
+TICKS = 1000
+KEYS = "wwddssaa+-"
+TICK_MS = 100
+
+# Run a headless simulation and time each phase of every tick
+#
+# Input parameters are the level file, the number of ticks to run, the
+#    keys the avatar presses (one per tick, repeating) and the simulated
+#    length of a tick in milliseconds, which sets how many monster turns
+#    fall due in each tick. With monsterStore set the monsters are kept
+#    in a MonsterStore and moved in batches.
+# Returns a dictionary of total seconds spent in each phase, plus the
+#    number of ticks actually run, monster turns taken and monsters
+#    active and dormant at the end
+def runBenchmark(filename, ticks=TICKS, keys=KEYS, tickMs=TICK_MS, monsterStore=False):
+    world = World(filename, headless=True, monsterStore=monsterStore)
+    phases = {"monsters": 0.0, "avatar": 0.0, "lighting": 0.0, "draw": 0.0}
+    clock = 0.0
+    tick = 0
+    turns = 0
+    while tick < ticks and world.avatarAlive() and world.getNumMonsters() > 0:
+        clock += tickMs / 1000.0
+
+        start = time.perf_counter()
+        turns += world.stepMonsters(clock)
+        monsters = time.perf_counter()
+        world.applyKey(keys[tick % len(keys)])
+        avatar = time.perf_counter()
+        world.updateLighting()
+        lighting = time.perf_counter()
+        world.draw()
+        drawn = time.perf_counter()
+
+        phases["monsters"] += monsters - start
+        phases["avatar"] += avatar - monsters
+        phases["lighting"] += lighting - avatar
+        phases["draw"] += drawn - lighting
+        tick += 1
+    phases["ticks"] = tick
+    phases["turns"] = turns
+    phases["active"] = world.getActiveCount()
+    phases["dormant"] = world.getDormantCount()
+    drains, phases["queueMean"], phases["queuePeak"], depth = world.renderQueue.getDepthStats()
+    return phases
+
+# Main code to run the benchmark from the command line
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Must specify a level file!")
+        sys.exit(1)
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else TICKS
+    keys = sys.argv[3] if len(sys.argv) > 3 else KEYS
+    tickMs = float(sys.argv[4]) if len(sys.argv) > 4 else TICK_MS
+    if len(sys.argv) > 5:
+        random.seed(int(sys.argv[5]))
+    monsterStore = len(sys.argv) > 6 and sys.argv[6] == "store"
+    # Writing events would be timed along with the simulation
+    eventLog.setLevel(EventLog.OFF)
+
+    start = time.perf_counter()
+    result = runBenchmark(sys.argv[1], ticks, keys, tickMs, monsterStore)
+    total = time.perf_counter() - start
+    ticks = result["ticks"]
+    simulated = sum(result[name] for name in ("monsters", "avatar", "lighting", "draw"))
+
+    print("level %s: %d ticks, %d monster turns, %.3f s total (including load)" %
+          (sys.argv[1], ticks, result["turns"], total))
+    print("%d monsters active, %d dormant" % (result["active"], result["dormant"]))
+    print("render queue: %.1f cells waiting per tick on average, %d at most" %
+          (result["queueMean"], result["queuePeak"]))
+    if ticks > 0 and simulated > 0:
+        print("%.1f ticks/sec" % (ticks / simulated))
+        for name in ("monsters", "avatar", "lighting", "draw"):
+            print("  %-9s %10.1f us/tick  %5.1f%%" %
+                  (name, 1e6 * result[name] / ticks, 100.0 * result[name] / simulated))
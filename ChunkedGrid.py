@@ -0,0 +1,369 @@
+#
+# Author: Lorn Jaeger
+#
+# Description: Tile grid for the Ultima 0.1 game that keeps only part of
+#              the map in memory. The map is split into square chunks that
+#              are read from the map file the first time a cell in them is
+#              looked at, and the least recently used chunks are dropped
+#              once the resident chunks would pass a memory cap. Lit flags
+#              and other values kept for every cell are paged in the same
+#              chunks, made the first time a cell in them is set, and count
+#              against the same cap. Occupants are kept only for the cells
+#              that have them.
+#
+
+import threading
+from array import array
+from collections import OrderedDict
+from TileGrid import TileGrid
+from MapFile import MapFile
+
+# NumPy only speeds up setting lit flags a page at a time
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# A dictionary standing in for a flat array that is mostly one value.
+#    Missing cells read as the default, and setting a cell to the default
+#    forgets it, so memory follows the cells that differ.
+class SparseArray(dict):
+
+    def __init__(self, default):
+        super().__init__()
+        self.default = default
+
+    def __missing__(self, cell):
+        return self.default
+
+    def __setitem__(self, cell, value):
+        if value == self.default:
+            self.pop(cell, None)
+        else:
+            super().__setitem__(cell, value)
+
+# Split a box of cells, given as its left and bottom cell and its width
+#    and height, into its parts in each square chunk of size cells
+#
+# Yields the (chunk x, chunk y) key of each chunk the box overlaps and the
+#    left and bottom cell and the width and height of the part inside it
+def boxParts(size, left, bottom, width, height):
+    for chunkX in range(left // size, (left + width - 1) // size + 1):
+        partLeft = max(left, chunkX * size)
+        partWidth = min(left + width, (chunkX + 1) * size) - partLeft
+        for chunkY in range(bottom // size, (bottom + height - 1) // size + 1):
+            partBottom = max(bottom, chunkY * size)
+            partHeight = min(bottom + height, (chunkY + 1) * size) - partBottom
+            yield (chunkX, chunkY), partLeft, partBottom, partWidth, partHeight
+
+# Copy the values of a box of cells out of square pages of size cells, in
+#    the order of TileGrid's flat arrays
+#
+# Input parameters are a function returning the page of a (chunk x, chunk
+#    y) key, the page size, the box's left and bottom cell and its width
+#    and height, and the array to copy into, width * height long
+# Returns the array copied into
+def copyBox(page, size, left, bottom, width, height, box):
+    for key, partLeft, partBottom, partWidth, partHeight in boxParts(size, left, bottom, width, height):
+        values = page(key)
+        start = (partLeft % size) * size + partBottom % size
+        end = (partLeft - left) * height + partBottom - bottom
+        for column in range(partWidth):
+            box[end:end + partHeight] = values[start:start + partHeight]
+            start += size
+            end += height
+    return box
+
+# The tile types of a chunked map, indexed like TileGrid.types by
+#    x * height + y. Each chunk is a bytearray of size * size types,
+#    cell (x, y) at (x % size) * size + y % size.
+class ChunkPages:
+
+    # Constructor for the pages
+    #
+    # Input parameters are the MapFile to read tiles from, the width and
+    #    height in cells of a chunk and the most bytes of tile types to
+    #    keep in memory at once
+    def __init__(self, level, size, residentBytes):
+        self.level = level
+        self.height = level.height
+        self.size = size
+        self.residentBytes = residentBytes
+        self.pages = OrderedDict()      # (chunk x, chunk y) -> bytearray
+        # Other pages whose bytes count against the same cap
+        self.others = []
+        # Types set since the map was read, by chunk, so they survive the
+        #    chunk being dropped and read again
+        self.changes = {}
+        # Pages are shared by the main thread and the scheduler thread
+        self.lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    # Returns the number of chunks that fit in the cap beside the other
+    #    pages, and always at least one
+    def capacity(self):
+        others = sum(pages.getBytes() for pages in self.others)
+        return max(1, (self.residentBytes - others) // (self.size * self.size))
+
+    # Returns the chunk holding (x, y), reading it in if needed
+    def page(self, x, y):
+        return self.chunk((x // self.size, y // self.size))
+
+    # Returns the chunk with the given (chunk x, chunk y) key, reading it
+    #    in if needed
+    def chunk(self, key):
+        with self.lock:
+            page = self.pages.get(key)
+            if page is not None:
+                self.pages.move_to_end(key)
+                return page
+            page = self.read(key)
+            self.pages[key] = page
+            self.evict()
+            return page
+
+    # Drop the least recently used chunks until they fit in the cap. The
+    #    caller holds the lock.
+    def evict(self):
+        capacity = self.capacity()
+        while len(self.pages) > capacity:
+            self.pages.popitem(last=False)
+            self.evictions += 1
+
+    # Drop chunks to make room for the other pages
+    def shrink(self):
+        with self.lock:
+            self.evict()
+
+    # Read one chunk from the map file and apply the changes made to it
+    def read(self, key):
+        size = self.size
+        page = bytearray([TileGrid.INVALID]) * (size * size)
+        left = key[0] * size
+        bottom = key[1] * size
+        top = min(self.height, bottom + size)
+        for x in range(left, min(self.level.width, left + size)):
+            codes = self.level.readCodes(x, bottom, top).translate(MapFile.TRANSLATE)
+            start = (x - left) * size
+            page[start:start + len(codes)] = codes
+        for offset, value in self.changes.get(key, {}).items():
+            page[offset] = value
+        self.loads += 1
+        return page
+
+    def __getitem__(self, cell):
+        x, y = divmod(cell, self.height)
+        return self.page(x, y)[(x % self.size) * self.size + y % self.size]
+
+    def __setitem__(self, cell, value):
+        x, y = divmod(cell, self.height)
+        offset = (x % self.size) * self.size + y % self.size
+        page = self.page(x, y)
+        with self.lock:
+            page[offset] = value
+            self.changes.setdefault((x // self.size, y // self.size), {})[offset] = value
+
+    def __len__(self):
+        return self.level.width * self.height
+
+    # Returns the number of bytes of tile types in memory
+    def getBytes(self):
+        return len(self.pages) * self.size * self.size
+
+# Values kept for every cell of a chunked map, such as its lit flags,
+#    indexed like TileGrid.lit by x * height + y and paged in chunks of
+#    size * size values laid out like ChunkPages. A chunk whose values
+#    are all the default has no page until one of them is set to
+#    something else, and pages back at the default are dropped when
+#    memory is short, so memory follows the cells that differ.
+class StatePages:
+
+    # Constructor for the pages
+    #
+    # Input parameters are the height in cells of the map, the width and
+    #    height in cells of a chunk, the array typecode of the values, the
+    #    value of the cells that have no page, and a function to call
+    #    whenever a page is made
+    def __init__(self, height, size, typecode, default, grow):
+        self.height = height
+        self.size = size
+        self.typecode = typecode
+        self.default = default
+        self.blank = array(typecode, [default]) * (size * size)
+        self.pages = {}                 # (chunk x, chunk y) -> array
+        self.grow = grow
+        # Pages kept by the last sweep, so sweeps wait until the pages
+        #    have doubled since
+        self.kept = 0
+
+    # Returns the page with the given (chunk x, chunk y) key, or the blank
+    #    page if it has none and make is False
+    def chunk(self, key, make=False):
+        page = self.pages.get(key)
+        if page is None:
+            if not make:
+                return self.blank
+            # Make room first, so a sweep cannot drop the new blank page
+            self.grow()
+            page = self.pages[key] = self.blank[:]
+        return page
+
+    # Set every value to the given one, dropping every page
+    def reset(self, default):
+        self.pages.clear()
+        self.default = default
+        self.blank = array(self.typecode, [default]) * (self.size * self.size)
+
+    # Drop the pages whose values are all the default again, unless the
+    #    pages have not doubled since the last sweep
+    def sweep(self):
+        if len(self.pages) < 2 * max(self.kept, 8):
+            return
+        blank = self.blank
+        for key in [key for key, page in self.pages.items() if page == blank]:
+            del self.pages[key]
+        self.kept = len(self.pages)
+
+    def __getitem__(self, cell):
+        x, y = divmod(cell, self.height)
+        page = self.pages.get((x // self.size, y // self.size))
+        if page is None:
+            return self.default
+        return page[(x % self.size) * self.size + y % self.size]
+
+    def __setitem__(self, cell, value):
+        x, y = divmod(cell, self.height)
+        key = (x // self.size, y // self.size)
+        page = self.pages.get(key)
+        if page is None:
+            if value == self.default:
+                return
+            page = self.chunk(key, True)
+        page[(x % self.size) * self.size + y % self.size] = value
+
+    # Returns the number of bytes of values in memory
+    def getBytes(self):
+        return len(self.pages) * len(self.blank) * self.blank.itemsize
+
+class ChunkedGrid(TileGrid):
+
+    # Constructor for the grid
+    #
+    # Input parameters are the MapFile to page tiles in from, the width
+    #    and height in cells of a chunk and the most bytes to keep in
+    #    memory. Every TileGrid method works unchanged on the paged types
+    #    and lit flags and the sparse occupancy.
+    #    The cap covers the tile types, the lit flags and the pages made
+    #    with statePages(). When they would pass it, the pages of lit
+    #    flags and other values that are back at their default are
+    #    dropped, then the least recently used chunks of tile types, which
+    #    can be read again; pages still holding values are never dropped,
+    #    so those alone can take the grid past the cap. The occupancy,
+    #    which grows with the monsters, is not covered.
+    def __init__(self, level, size=64, residentBytes=16 * 1024 * 1024):
+        self.width = level.width
+        self.height = level.height
+        self.residentBytes = residentBytes
+        self.types = ChunkPages(level, size, residentBytes)
+        self.lit = self.statePages('B', 0)
+        self.occupancy = SparseArray(0)     # occupant id, 0 if empty
+        self.occupants = {}                 # occupant id -> object
+
+    # Make pages of a value kept for every cell, counted against the cap
+    #
+    # Input parameters are the array typecode of the values and the value
+    #    of every cell to start with
+    # Returns the StatePages
+    def statePages(self, typecode, default):
+        pages = StatePages(self.height, self.types.size, typecode, default, self.fit)
+        self.types.others.append(pages)
+        return pages
+
+    # Keep the pages in memory under the cap if they can be, after a page
+    #    of values has been made
+    def fit(self):
+        if self.getResidentBytes() <= self.residentBytes:
+            return
+        for pages in self.types.others:
+            pages.sweep()
+        self.types.shrink()
+
+    # Set the lit flag of every cell to the given value
+    def setAllLit(self, value):
+        self.lit.reset(1 if value else 0)
+
+    # Returns the lit flags of a box of cells, given as its left and
+    #    bottom cell and its width and height, as bytes in the order of
+    #    TileGrid's flat arrays
+    def getLitBox(self, left, bottom, width, height):
+        return bytes(copyBox(self.lit.chunk, self.lit.size, left, bottom, width, height,
+                             bytearray(width * height)))
+
+    # Returns the tile type codes of a box of cells, given as its left and
+    #    bottom cell and its width and height, as bytes in the order of
+    #    TileGrid's flat arrays
+    def getTypeBox(self, left, bottom, width, height):
+        return bytes(copyBox(self.types.chunk, self.types.size, left, bottom, width, height,
+                             bytearray(width * height)))
+
+    # Set the lit flag of the cells of a box to a value where a mask says
+    #
+    # Input parameters are the box's left and bottom cell, a NumPy
+    #    boolean array indexed [x, y] whose element [0, 0] is that cell,
+    #    and the value. Each page is set with one NumPy operation.
+    def setLitMask(self, left, bottom, mask, value):
+        make = value != self.lit.default
+        size = self.lit.size
+        width, height = mask.shape
+        for key, partLeft, partBottom, partWidth, partHeight in boxParts(size, left, bottom, width, height):
+            if not make and key not in self.lit.pages:
+                continue
+            part = mask[partLeft - left:partLeft - left + partWidth,
+                        partBottom - bottom:partBottom - bottom + partHeight]
+            if not part.any():
+                continue
+            page = numpy.frombuffer(self.lit.chunk(key, make), dtype=numpy.uint8).reshape(size, size)
+            page[partLeft % size:partLeft % size + partWidth,
+                 partBottom % size:partBottom % size + partHeight][part] = value
+
+    # Accessor method
+    #
+    # Returns the number of chunks in memory
+    def getResidentChunks(self):
+        return len(self.types.pages)
+
+    # Accessor method
+    #
+    # Returns the number of bytes in memory counted against the cap
+    def getResidentBytes(self):
+        return self.types.getBytes() + sum(pages.getBytes() for pages in self.types.others)
+
+# Main code to test the chunked grid class
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Must specify a map file!")
+        sys.exit(1)
+    level = MapFile.open(sys.argv[1])
+    whole = MapFile.load(sys.argv[1])
+    flat = TileGrid(whole.width, whole.height)
+    whole.fillGrid(flat)
+    # Room for just four chunks, so walking the map drops and rereads them
+    grid = ChunkedGrid(level, 16, 4 * 16 * 16)
+    same = all(grid.getType(x, y) == flat.getType(x, y)
+               for x in range(level.width) for y in range(level.height))
+    print("same tiles %s, %d chunks read, %d dropped, %d resident" %
+          (same, grid.types.loads, grid.types.evictions, grid.getResidentChunks()))
+    # Light the bottom row, which makes a page of lit flags per chunk
+    #    along it, then put it out again
+    for x in range(level.width):
+        grid.setLit(x, 0, True)
+    lit = grid.getLitBox(0, 0, level.width, 1).count(1)
+    pages = len(grid.lit.pages)
+    for x in range(level.width):
+        grid.setLit(x, 0, False)
+    print("lit %d cells in %d pages, %d bytes resident of %d" %
+          (lit, pages, grid.getResidentBytes(), grid.residentBytes))
+    level.close()
@@ -0,0 +1,174 @@
+#
+# Author: Lorn Jaeger
+#
+# Description: Buffered event log for the Ultima 0.1 game. Game and monster
+#              threads append events to a ring buffer without doing any
+#              I/O; a background thread formats them and writes them to a
+#              file or stdout. Events below the log's level are dropped at
+#              the call, and calls written as
+#                  if __debug__: eventLog.info(...)
+#              are removed altogether when Python runs with -O.
+#
+
+import atexit
+import sys
+import threading
+import time
+from collections import deque
+
+class EventLog:
+
+    # Levels, lowest first. A log writes events at or above its level.
+    DEBUG = 10
+    INFO = 20
+    WARNING = 30
+    ERROR = 40
+    OFF = 100
+    NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+    # Constructor for the log
+    #
+    # Input parameters are the stream to write to (stdout if None), the
+    #    lowest level written, the most events held before the oldest
+    #    are dropped and the seconds the writer waits between drains
+    def __init__(self, stream=None, level=INFO, capacity=8192, interval=0.05):
+        self.stream = stream
+        self.level = level
+        # Appending to a deque is atomic, so threads log without a lock;
+        #    a full deque drops its oldest event
+        self.buffer = deque(maxlen=capacity)
+        self.interval = interval
+        self.thread = None
+        self.threadLock = threading.Lock()
+        # Keeps a flush() and the writer from interleaving their output
+        self.drainLock = threading.Lock()
+        self.logged = 0         # events accepted
+        self.written = 0        # events written
+        self.peak = 0           # most events waiting at a drain
+
+    # Send events to a file instead of the current stream
+    #
+    # Input parameter is a file name, or None for stdout
+    def openFile(self, filename):
+        self.flush()
+        self.stream = open(filename, 'a') if filename is not None else None
+
+    # Mutator for the lowest level written
+    def setLevel(self, level):
+        self.level = level
+
+    # Record an event
+    #
+    # Input parameters are the level, a category such as "light",
+    #    "combat" or "move", and a format string with its arguments.
+    #    Formatting is left to the writer thread.
+    def log(self, level, category, message, *args):
+        if level < self.level:
+            return
+        self.buffer.append((level, category, message, args))
+        self.logged += 1
+        if self.thread is None:
+            self.start()
+
+    def debug(self, category, message, *args):
+        if EventLog.DEBUG >= self.level:
+            self.log(EventLog.DEBUG, category, message, *args)
+
+    def info(self, category, message, *args):
+        if EventLog.INFO >= self.level:
+            self.log(EventLog.INFO, category, message, *args)
+
+    def warning(self, category, message, *args):
+        self.log(EventLog.WARNING, category, message, *args)
+
+    def error(self, category, message, *args):
+        self.log(EventLog.ERROR, category, message, *args)
+
+    # Accessor method
+    #
+    # Returns the number of events dropped because the buffer was full.
+    #    The counts are updated without a lock, so this is approximate
+    #    while threads are logging.
+    def getDropped(self):
+        return self.logged - self.written - len(self.buffer)
+
+    # Accessor method
+    #
+    # Returns the number of events waiting to be written
+    def getDepth(self):
+        return len(self.buffer)
+
+    # Start the writer thread
+    def start(self):
+        with self.threadLock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    # Writer thread body: drain the buffer every interval
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.drainLock:
+                self.drain()
+
+    # Write every waiting event
+    #
+    # The caller holds drainLock
+    def drain(self):
+        buffer = self.buffer
+        waiting = len(buffer)
+        if waiting == 0:
+            return
+        self.peak = max(self.peak, waiting)
+        lines = []
+        while buffer:
+            try:
+                level, category, message, args = buffer.popleft()
+            except IndexError:
+                break
+            if args:
+                message = message % args
+            if level >= EventLog.WARNING:
+                lines.append("%s %s: %s\n" % (EventLog.NAMES[level], category, message))
+            else:
+                lines.append(message + "\n")
+        stream = self.stream if self.stream is not None else sys.stdout
+        try:
+            stream.write("".join(lines))
+            stream.flush()
+        except (OSError, ValueError):
+            # A closed or broken stream must not take the game down
+            pass
+        self.written += len(lines)
+
+    # Write every waiting event now, from the calling thread
+    def flush(self):
+        with self.drainLock:
+            self.drain()
+
+# The game's log. Lighting results and combat are logged at INFO and
+#    movement at DEBUG, so by default only warnings and errors are
+#    written; setLevel(EventLog.INFO) shows the rest, and openFile()
+#    keeps them off stdout.
+eventLog = EventLog(level=EventLog.WARNING)
+atexit.register(eventLog.flush)
+
+# Main code to test the event log class
+if __name__ == "__main__":
+    import io
+
+    log = EventLog(io.StringIO(), EventLog.INFO, 1000)
+    workers = [threading.Thread(target=lambda n=n: [log.info("test", "thread %d event %d", n, i)
+                                                     for i in range(600)]) for n in range(4)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    log.debug("test", "not written")
+    log.flush()
+    print("%d logged in %.1f ms, %d written, %d dropped, peak %d waiting" %
+          (log.logged, 1000 * elapsed, log.written, log.getDropped(), log.peak))
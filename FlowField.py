@@ -0,0 +1,174 @@
+#
+# Author: Lorn Jaeger
+#
+# Description: Distance-to-avatar flow field for the Ultima 0.1 game. One
+#              Dijkstra search from the avatar over the passable tiles near
+#              it gives every cell the direction of its shortest path to the
+#              avatar, so any number of monsters can chase the avatar by
+#              reading one entry each instead of searching for a path.
+#
+
+import heapq
+import math
+from array import array
+
+class FlowField:
+
+    # Direction codes, matching the random directions in Monster.step
+    NONE = 0
+    UP = 1
+    DOWN = 2
+    LEFT = 3
+    RIGHT = 4
+
+    # Neighbour offsets and the direction that leads back from each
+    #    neighbour to the cell it was reached from
+    STEPS = ((0, 1, DOWN), (0, -1, UP), (-1, 0, RIGHT), (1, 0, LEFT))
+
+    # Constructor for the field
+    #
+    # Input parameters are the TileGrid the field covers and the aggro
+    #    radius: only cells less than that many tiles from the avatar
+    #    are searched, and only monsters on them chase the avatar
+    def __init__(self, grid, radius):
+        self.grid = grid
+        self.radius = radius
+        # The field covers a square window around the avatar just big
+        #    enough for the aggro disk, so its size does not depend on the
+        #    size of the map. Cell (x, y) is entry
+        #    (x - originX) * side + (y - originY) of the arrays.
+        self.reach = int(math.ceil(radius))
+        self.side = 2 * self.reach + 1
+        cells = self.side * self.side
+        self.originX = 0
+        self.originY = 0
+        # Path cost to the avatar and direction of the next step for each
+        #    window cell. An entry is only valid while its stamp equals
+        #    version, so a new search never has to clear the window.
+        self.distance = array('i', [0]) * cells
+        self.direction = array('b', [0]) * cells
+        self.stamp = array('i', [0]) * cells
+        self.version = 0
+        self.source = None
+        self.searched = 0       # cells settled by the last search
+        self.updates = 0        # searches run so far
+
+    # Search again from the avatar at (x, y)
+    #
+    # Each step costs 1 plus the damage of the tile stepped onto, so
+    #    monsters go around lava when a way around is not much longer.
+    #    Only the cells inside the aggro disk are visited, so the cost of
+    #    an update does not depend on the size of the map.
+    def update(self, x, y):
+        grid = self.grid
+        height = grid.height
+        types = grid.types
+        passable = grid.PASSABLE
+        damage = grid.DAMAGE
+        distance = self.distance
+        direction = self.direction
+        stamp = self.stamp
+        limit = self.radius * self.radius
+        side = self.side
+        originX = x - self.reach
+        originY = y - self.reach
+
+        self.version += 1
+        version = self.version
+        self.source = (x, y)
+        self.originX = originX
+        self.originY = originY
+        self.updates += 1
+        settled = 0
+
+        start = self.reach * side + self.reach
+        distance[start] = 0
+        direction[start] = FlowField.NONE
+        stamp[start] = version
+        frontier = [(0, x, y)]
+        while frontier:
+            cost, currentX, currentY = heapq.heappop(frontier)
+            if cost > distance[(currentX - originX) * side + currentY - originY]:
+                continue
+            settled += 1
+            for deltaX, deltaY, back in FlowField.STEPS:
+                nextX = currentX + deltaX
+                nextY = currentY + deltaY
+                if nextX < 0 or nextX >= grid.width or nextY < 0 or nextY >= height:
+                    continue
+                offsetX = nextX - x
+                offsetY = nextY - y
+                if not offsetX * offsetX + offsetY * offsetY < limit:
+                    continue
+                tile = types[nextX * height + nextY]
+                if not passable[tile]:
+                    continue
+                nextCost = cost + 1 + damage[tile]
+                cell = (nextX - originX) * side + nextY - originY
+                if stamp[cell] != version or nextCost < distance[cell]:
+                    distance[cell] = nextCost
+                    direction[cell] = back
+                    stamp[cell] = version
+                    heapq.heappush(frontier, (nextCost, nextX, nextY))
+        self.searched = settled
+
+    # A tile changed: search again if it lies inside the aggro disk
+    def invalidate(self, x, y):
+        if self.source is None:
+            return
+        deltaX = x - self.source[0]
+        deltaY = y - self.source[1]
+        if math.sqrt(deltaX * deltaX + deltaY * deltaY) < self.radius:
+            self.update(*self.source)
+
+    # Index of (x, y) in the window arrays, or -1 if the cell is outside
+    #    the window or was not reached by the last search
+    def entry(self, x, y):
+        windowX = x - self.originX
+        windowY = y - self.originY
+        if windowX < 0 or windowY < 0 or windowX >= self.side or windowY >= self.side:
+            return -1
+        cell = windowX * self.side + windowY
+        if self.stamp[cell] != self.version:
+            return -1
+        return cell
+
+    # Accessor method
+    #
+    # Returns the direction code of the best step from (x, y) toward the
+    #    avatar, or NONE if the cell is outside the field
+    def getDirection(self, x, y):
+        cell = self.entry(x, y)
+        if cell < 0:
+            return FlowField.NONE
+        return self.direction[cell]
+
+    # Accessor method
+    #
+    # Returns the path cost from (x, y) to the avatar, or -1 if the cell is
+    #    outside the field
+    def getDistance(self, x, y):
+        cell = self.entry(x, y)
+        if cell < 0:
+            return -1
+        return self.distance[cell]
+
+# Main code to test the flow field class
+if __name__ == "__main__":
+    from TileGrid import TileGrid
+
+    # A wall with a gap between the avatar and the left side of the map
+    grid = TileGrid(12, 7)
+    for x in range(12):
+        for y in range(7):
+            grid.setCode(x, y, "G")
+    for y in range(1, 7):
+        grid.setCode(5, y, "M")
+    field = FlowField(grid, 8.0)
+    field.update(8, 3)
+    symbols = {FlowField.NONE: ".", FlowField.UP: "^", FlowField.DOWN: "v",
+               FlowField.LEFT: "<", FlowField.RIGHT: ">"}
+    for y in range(6, -1, -1):
+        print("".join("@" if (x, y) == (8, 3) else "#" if not grid.isPassable(x, y)
+                      else symbols[field.getDirection(x, y)] for x in range(12)))
+    print("distance from (3, 3): %d, cells searched: %d" % (field.getDistance(3, 3), field.searched))
@@ -0,0 +1,103 @@
+#
+# Author: Lorn Jaeger
+#
+# Description: Event-driven game loop for the Ultima 0.1 game. The loop
+#              sleeps until a key is typed or the world changes, draws a
+#              frame only when there is something new to show, and paces
+#              frames on fixed time slots of the monotonic clock. Keys
+#              are handled a few at a time between frames, and it records
+#              how long each key took to reach the screen.
+#
+
+import time
+import pygame
+
+class GameLoop:
+
+    # Default most frames drawn per second
+    FPS = 60
+    # Default most keys handled before the loop looks again at whether a
+    #    frame is due
+    KEYS_PER_WAKE = 4
+
+    # Constructor for the loop
+    #
+    # Input parameters are the world to run, the most frames per second to
+    #    draw and the most keys to handle between two chances to draw
+    def __init__(self, world, fps=FPS, keysPerWake=KEYS_PER_WAKE):
+        self.world = world
+        self.frame = 1.0 / fps
+        self.keysPerWake = keysPerWake
+        self.frames = 0         # frames drawn
+        self.wakes = 0          # times the loop woke up
+        self.latencies = []     # seconds from each key arriving to its frame
+        self.caption = None
+
+    # Run the game until the avatar dies or every monster is dead
+    def run(self):
+        world = self.world
+        canvas = world.canvas
+        world.renderQueue.listener = canvas.postWake
+        # Keys handled since the last frame, by arrival time
+        pending = []
+        # Show the frame the world drew when it was made
+        self.render()
+        nextFrame = time.monotonic() + self.frame
+        while world.avatarAlive() and world.getNumMonsters() > 0:
+            now = time.monotonic()
+            changed = world.hasChanges()
+            if changed and now >= nextFrame:
+                self.render()
+                shown = time.monotonic()
+                self.latencies.extend(shown - arrived for arrived in pending)
+                pending = []
+                # Keep to the fixed slots, but after a stall start again
+                #    from now instead of drawing frames back to back
+                nextFrame += self.frame
+                if nextFrame < shown:
+                    nextFrame = shown + self.frame
+                continue
+
+            # Sleep until input or a change, but with a change already
+            #    waiting only until its frame slot. Keys left from the last
+            #    wakeup are handled first, without sleeping.
+            if not canvas.hasNextKeyTyped():
+                canvas.waitForEvent(max(0.0, nextFrame - now) if changed else None)
+                self.wakes += 1
+            # Handle only a few keys before looking again at the frame
+            #    slot, so a burst of slow keys cannot hold off every frame
+            handled = 0
+            while handled < self.keysPerWake and canvas.hasNextKeyTyped():
+                ch = canvas.nextKeyTyped()
+                world.handleKey(ch)
+                handled += 1
+                # Keys that changed nothing never reach the screen
+                if world.hasChanges():
+                    pending.append(canvas.lastKeyTime())
+        world.renderQueue.listener = None
+
+    # Draw a frame of whatever changed and show it
+    def render(self):
+        world = self.world
+        with world.lock:
+            world.draw()
+        # Display avatar health in the window title bar
+        caption = "Health: " + str(world.avatar.getHitPoints())
+        if caption != self.caption and world.canvas.isWindow():
+            pygame.display.set_caption(caption)
+            self.caption = caption
+        world.canvas.show(0)
+        self.frames += 1
+
+    # Accessor method
+    #
+    # Returns the number of keys measured and the mean, 95th percentile
+    #    and worst time in milliseconds from a key arriving to the frame
+    #    showing its effect, or None if no key has been measured
+    def getLatencyStats(self):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        mean = sum(ordered) / len(ordered)
+        percentile = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+        return len(ordered), 1000 * mean, 1000 * percentile, 1000 * ordered[-1]
@@ -0,0 +1,124 @@
+#
+# Author: Lorn Jaeger
+#
+# Description: Bounded least-recently-used cache of lighting results for the
+#              Ultima 0.1 game, keyed by avatar position and torch radius.
+#              Results are kept as LitRegions, a byte for each cell of
+#              their bounding box, and the cache is capped in bytes.
+#
+
+from collections import OrderedDict
+from LitRegion import LitRegion
+
+class LightCache:
+
+    # Constructor for the cache
+    #
+    # Input parameters are the most results to keep and the most bytes of
+    #    lit flags to keep summed over all results, which bounds the memory
+    #    used
+    def __init__(self, maxEntries=256, maxBytes=16 * 1024 * 1024):
+        self.entries = OrderedDict()    # (x, y, r) -> (LitRegion, opaque count)
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.bytes = 0                  # bytes of lit flags held over all entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Change the limits of the cache, evicting results if needed
+    def setLimits(self, maxEntries, maxBytes):
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.evict()
+
+    # Look up the lighting for a torch of radius r at (x, y)
+    #
+    # Returns a (LitRegion of lit cells, number of opaque lit cells) tuple,
+    #    or None if the result is not cached
+    def get(self, x, y, r):
+        key = (x, y, r)
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return result
+
+    # Store the lighting for a torch of radius r at (x, y)
+    #
+    # Input parameters are the torch position and radius, the lit cells,
+    #    as a LitRegion or a collection of (x, y) cells, and how many of
+    #    them are opaque
+    def put(self, x, y, r, lit, opaque):
+        key = (x, y, r)
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key)[0].getBytes()
+        if not isinstance(lit, LitRegion):
+            lit = LitRegion.fromCells(lit)
+        if lit.getBytes() > self.maxBytes:
+            return
+        self.entries[key] = (lit, opaque)
+        self.bytes += lit.getBytes()
+        self.evict()
+
+    # Drop least recently used results until the cache is within its limits
+    def evict(self):
+        while self.entries and \
+              (len(self.entries) > self.maxEntries or self.bytes > self.maxBytes):
+            key, (lit, opaque) = self.entries.popitem(last=False)
+            self.bytes -= lit.getBytes()
+            self.evictions += 1
+
+    # Drop every result that lit the cell at (x, y)
+    #
+    # Called when that tile's opacity changes. A cell that was not lit was
+    #    either outside the torch disk or not reachable, and changing its
+    #    opacity cannot change either, so other results stay valid.
+    def invalidate(self, x, y):
+        cell = (x, y)
+        for key in [key for key, (lit, opaque) in self.entries.items() if cell in lit]:
+            self.bytes -= self.entries.pop(key)[0].getBytes()
+
+    # Drop every cached result
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    # Accessor method
+    #
+    # Returns the number of results currently cached
+    def getSize(self):
+        return len(self.entries)
+
+    # Accessor method
+    #
+    # Returns the number of bytes of lit flags held by the cached results
+    def getBytes(self):
+        return self.bytes
+
+    # Accessor method
+    #
+    # Returns the fraction of lookups that found a cached result
+    def getHitRate(self):
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return self.hits / lookups
+
+# Main code to test the light cache class
+if __name__ == "__main__":
+    cache = LightCache(2, 16)
+    cache.put(0, 0, 2.0, {(0, 0), (1, 0)}, 0)
+    cache.put(1, 0, 2.0, {(0, 0), (1, 0), (2, 0)}, 1)
+    print(cache.get(0, 0, 2.0) is not None, cache.get(5, 5, 2.0) is None)
+    # Adding a third result evicts the least recently used one
+    cache.put(2, 0, 2.0, {(2, 0)}, 0)
+    print(cache.getSize(), cache.get(1, 0, 2.0) is None)
+    # Changing the opacity of (0, 0) drops the results that lit it
+    cache.invalidate(0, 0)
+    print(cache.getSize(), "%.2f" % cache.getHitRate())
+    # A result bigger than the whole cache is not kept
+    cache.put(0, 0, 9.0, {(0, 0), (9, 9)}, 0)
+    print(cache.getSize(), cache.getBytes())
@@ -0,0 +1,130 @@
+#
+# Author: Lorn Jaeger
+#
+# Description: Compact set of lit cells for the Ultima 0.1 game. A lighting
+#              result is kept as one byte per cell of its bounding box, in
+#              the order of TileGrid's flat arrays, instead of as a Python
+#              set of (x, y) tuples, so a cached result costs about a byte
+#              a cell rather than the hundred or more a tuple in a set does.
+#
+
+# NumPy only speeds up setting flags and comparing regions
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class LitRegion:
+
+    # Constructor for the region
+    #
+    # Input parameters are the left and bottom cell and the width and
+    #    height of the bounding box, the flags of its cells as bytes, 1
+    #    for a lit cell, with cell (x, y) at
+    #    (x - left) * height + (y - bottom), and the number of lit cells
+    def __init__(self, left, bottom, width, height, flags, count):
+        self.left = left
+        self.bottom = bottom
+        self.width = width
+        self.height = height
+        self.flags = flags
+        self.count = count
+
+    # Make a region holding the (x, y) cells of a collection
+    @staticmethod
+    def fromCells(cells):
+        if not cells:
+            return LitRegion(0, 0, 0, 0, b"", 0)
+        left = min(x for x, y in cells)
+        bottom = min(y for x, y in cells)
+        width = max(x for x, y in cells) - left + 1
+        height = max(y for x, y in cells) - bottom + 1
+        flags = bytearray(width * height)
+        for x, y in cells:
+            flags[(x - left) * height + y - bottom] = 1
+        return LitRegion(left, bottom, width, height, bytes(flags), len(cells))
+
+    # Make a region of the lit flags of a TileGrid inside a box, given as
+    #    its left and bottom cell and its width and height, holding count
+    #    lit cells
+    @staticmethod
+    def fromGrid(tiles, left, bottom, width, height, count):
+        return LitRegion(left, bottom, width, height, tiles.getLitBox(left, bottom, width, height), count)
+
+    # Make a region from a NumPy boolean array indexed [x, y] whose
+    #    element [0, 0] is the cell at (left, bottom)
+    @staticmethod
+    def fromMask(left, bottom, mask):
+        width, height = mask.shape
+        return LitRegion(left, bottom, width, height, mask.astype(numpy.uint8).tobytes(),
+                         int(numpy.count_nonzero(mask)))
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, cell):
+        x = cell[0] - self.left
+        y = cell[1] - self.bottom
+        return 0 <= x < self.width and 0 <= y < self.height and self.flags[x * self.height + y] == 1
+
+    def __iter__(self):
+        left = self.left
+        bottom = self.bottom
+        height = self.height
+        if numpy is not None:
+            indexes = numpy.flatnonzero(numpy.frombuffer(self.flags, dtype=numpy.uint8))
+            return zip((indexes // height + left).tolist(), (indexes % height + bottom).tolist())
+        return ((left + index // height, bottom + index % height)
+                for index, flag in enumerate(self.flags) if flag)
+
+    # The cells in exactly one of this region and another collection of
+    #    cells, as a set, so regions combine with sets like sets do
+    def __xor__(self, other):
+        if numpy is None or not isinstance(other, LitRegion):
+            return set(self) ^ set(other)
+        # Compare the two masks over the box covering both
+        left = min(self.left, other.left)
+        bottom = min(self.bottom, other.bottom)
+        width = max(self.left + self.width, other.left + other.width) - left
+        height = max(self.bottom + self.height, other.bottom + other.height) - bottom
+        changed = numpy.zeros((width, height), dtype=bool)
+        for region in (self, other):
+            if region.count:
+                changed[region.left - left:region.left - left + region.width,
+                        region.bottom - bottom:region.bottom - bottom + region.height] ^= region.mask()
+        changedX, changedY = numpy.nonzero(changed)
+        return set(zip((changedX + left).tolist(), (changedY + bottom).tolist()))
+
+    __rxor__ = __xor__
+
+    # Returns the flags as a NumPy boolean array indexed [x, y]
+    def mask(self):
+        return numpy.frombuffer(self.flags, dtype=numpy.uint8).reshape(self.width, self.height).view(bool)
+
+    # Set the lit flag of each cell of the region in a TileGrid
+    def setFlags(self, tiles, value):
+        if not self.count:
+            return
+        if numpy is not None and isinstance(tiles.lit, bytearray):
+            flags = numpy.frombuffer(tiles.lit, dtype=numpy.uint8).reshape(tiles.width, tiles.height)
+            flags[self.left:self.left + self.width, self.bottom:self.bottom + self.height][self.mask()] = value
+        elif numpy is not None and hasattr(tiles, "setLitMask"):
+            # A ChunkedGrid sets its paged flags a page at a time
+            tiles.setLitMask(self.left, self.bottom, self.mask(), value)
+        else:
+            for x, y in self:
+                tiles.setLit(x, y, value)
+
+    # Accessor method
+    #
+    # Returns the number of bytes held by the region's flags
+    def getBytes(self):
+        return len(self.flags)
+
+# Main code to test the lit region class
+if __name__ == "__main__":
+    first = LitRegion.fromCells({(2, 3), (3, 3), (4, 5)})
+    second = LitRegion.fromCells({(3, 3), (4, 5), (5, 5)})
+    print(len(first), (4, 5) in first, (2, 4) in first, sorted(first))
+    print(sorted(first ^ second), sorted({(2, 3), (9, 9)} ^ first))
+    print(first.width, first.height, first.getBytes())
@@ -0,0 +1,273 @@
+#
+# Author: Lorn Jaeger
+#
+# Description: Map files for the Ultima 0.1 game. Reads the text maps in
+#              maps/*.txt and a compact binary format made from them: a
+#              fixed header, the tile codes packed one byte per cell in the
+#              order of the TileGrid arrays, and a table of fixed size
+#              monster records. Binary maps are memory-mapped and copied
+#              into the grid whole, with no per-cell parsing.
+#
+# Usage: python MapFile.py map.txt [map.txt ...]
+#        writes map.ulm next to each text map
+#
+
+import mmap
+import os
+import struct
+import sys
+from TileGrid import TileGrid
+
+class MapFile:
+
+    # Binary layout: magic, version, width, height, avatar x, y, hit
+    #    points, damage and torch radius, and the number of monsters;
+    #    then width * height tile code bytes, cell (x, y) at x * height + y;
+    #    then one record per monster: code, x, y, hit points, damage and
+    #    milliseconds between moves
+    MAGIC = b"ULTM"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHxxIIIIiidI")
+    MONSTER = struct.Struct("<2sxxIIiiI")
+    # Longest monster code a record holds
+    CODE_LENGTH = 2
+    EXTENSION = ".ulm"
+
+    # Tile type value for each tile code byte, for bytes.translate()
+    TRANSLATE = bytearray([TileGrid.INVALID]) * 256
+    for _code, _value in TileGrid.CODE_VALUES.items():
+        TRANSLATE[ord(_code)] = _value
+    TRANSLATE = bytes(TRANSLATE)
+    del _code, _value
+    # Byte stored for each tile code; anything else is stored as 0, which
+    #    translates to INVALID
+    CODE_BYTES = {code: ord(code) for code in TileGrid.CODE_VALUES}
+
+    # Constructor for a map
+    #
+    # Input parameters are the width and height in cells, the avatar's
+    #    (x, y, hp, damage, torch) values, the tile code bytes in grid
+    #    order and a list of (code, x, y, hp, damage, sleepMs) monster
+    #    records
+    def __init__(self, width, height, avatar, codes, monsters):
+        self.width = width
+        self.height = height
+        self.avatar = avatar
+        self.codes = codes
+        self.monsters = monsters
+        # Open file and mapping of a map opened with open()
+        self.file = None
+        self.data = None
+        self.tileStart = 0
+
+    # Fill a TileGrid of the map's size with the map's tiles
+    def fillGrid(self, grid):
+        grid.types[:] = self.codes.translate(MapFile.TRANSLATE)
+
+    # Copy the tile codes of column x from row bottom up to row top
+    #
+    # Works on maps read whole and on binary maps opened with open()
+    def readCodes(self, x, bottom, top):
+        start = x * self.height
+        if self.data is not None:
+            start += self.tileStart
+            return self.data[start + bottom:start + top]
+        return self.codes[start + bottom:start + top]
+
+    # Release the file of a map opened with open()
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+            self.file.close()
+            self.data = None
+            self.file = None
+
+    # Is the file a binary map
+    @staticmethod
+    def isBinary(filename):
+        with open(filename, 'rb') as f:
+            return f.read(len(MapFile.MAGIC)) == MapFile.MAGIC
+
+    # Read a map, binary or text depending on its first bytes
+    @staticmethod
+    def load(filename):
+        if MapFile.isBinary(filename):
+            return MapFile.readBinary(filename)
+        return MapFile.readText(filename)
+
+    # Open a map without reading its tiles
+    #
+    # A binary map stays memory-mapped, and readCodes() copies tiles out
+    #    of it as they are needed, so the map may be far larger than
+    #    memory. A text map has no fixed layout to seek in, so it is read
+    #    whole.
+    @staticmethod
+    def open(filename):
+        if not MapFile.isBinary(filename):
+            return MapFile.readText(filename)
+        f = open(filename, 'rb')
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            level = MapFile.readHeader(filename, data)
+        except ValueError:
+            data.close()
+            f.close()
+            raise
+        level.file = f
+        level.data = data
+        return level
+
+    # Read a text map
+    #
+    # The first line holds the width and height, the second the avatar's
+    #    x, y, hit points, damage and torch radius. Then come height lines
+    #    of width tile codes, top row first, and then one line of six
+    #    values for each monster. Blank lines are skipped.
+    #    The file is read a line at a time: each row goes straight into
+    #    the tile codes and each monster line straight into its record,
+    #    so apart from the map itself only one line is held at once.
+    #    Raises ValueError naming the file and line of the first line
+    #    that does not fit the format.
+    @staticmethod
+    def readText(filename):
+        with open(filename, 'r') as f:
+            lines = MapFile.fields(filename, f)
+            number, line = next(lines, (0, None))
+            width, height = MapFile.parse(filename, number, line, "width and height", (int, int))
+            number, line = next(lines, (number, None))
+            avatar = MapFile.parse(filename, number, line, "avatar x, y, hit points, damage and torch",
+                                   (int, int, int, int, float))
+
+            codes = bytearray(width * height)
+            for row in range(0, height):
+                number, line = next(lines, (number, None))
+                if line is None:
+                    raise ValueError("%s:%d: expected %d rows of tiles, found %d" %
+                                     (filename, number, height, row))
+                if len(line) != width:
+                    raise ValueError("%s:%d: expected %d tile codes, found %d" %
+                                     (filename, number, width, len(line)))
+                # Cell (x, y) is at x * height + y, so a row is every
+                #    height-th byte
+                rowCodes = "".join(line).encode('ascii', 'replace')
+                if len(rowCodes) != width:
+                    rowCodes = bytes(MapFile.CODE_BYTES.get(code, 0) for code in line)
+                codes[height - row - 1::height] = rowCodes
+
+            monsters = []
+            for number, line in lines:
+                try:
+                    code, x, y, hp, damage, sleepMs = line
+                    monsters.append((code, int(x), int(y), int(hp), int(damage), int(sleepMs)))
+                except ValueError:
+                    # Let parse() say what is wrong with the line
+                    MapFile.parse(filename, number, line, "monster code, x, y, hit points, damage and sleep",
+                                  (str, int, int, int, int, int))
+                MapFile.checkPosition("%s:%d" % (filename, number), "monster", width, height, *monsters[-1][1:3])
+        MapFile.checkPosition(filename, "avatar", width, height, *avatar[0:2])
+        return MapFile(width, height, avatar, bytes(codes), monsters)
+
+    # Check that a position read from a map is on the map
+    #
+    # Input parameters are where it was read, for the error message, what
+    #    stands there, the map's width and height and the position.
+    #    Raises ValueError if the position is off the map, as a monster or
+    #    avatar placed there would index outside the map's arrays.
+    @staticmethod
+    def checkPosition(where, what, width, height, x, y):
+        if not (0 <= x < width and 0 <= y < height):
+            raise ValueError("%s: %s at (%d, %d) is outside the %d x %d map" % (where, what, x, y, width, height))
+
+    # Generate the (line number, fields) of each non-blank line of a file
+    @staticmethod
+    def fields(filename, f):
+        for number, text in enumerate(f, 1):
+            line = text.split()
+            if line:
+                yield number, line
+
+    # Convert the fields of one line
+    #
+    # Input parameters are the file name and line number for errors, the
+    #    fields (None at the end of the file), a description of what the
+    #    line should hold and the type of each field.
+    # Returns a tuple of the converted fields
+    @staticmethod
+    def parse(filename, number, line, expected, types):
+        if line is None:
+            raise ValueError("%s:%d: expected %s, found the end of the file" % (filename, number, expected))
+        if len(line) != len(types):
+            raise ValueError("%s:%d: expected %s, found %d values" % (filename, number, expected, len(line)))
+        try:
+            return tuple(kind(field) for kind, field in zip(types, line))
+        except ValueError:
+            raise ValueError("%s:%d: expected %s, found %s" %
+                             (filename, number, expected, " ".join(line))) from None
+
+    # Read a binary map by memory-mapping it
+    @staticmethod
+    def readBinary(filename):
+        with open(filename, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                level = MapFile.readHeader(filename, data)
+                start = level.tileStart
+                level.codes = data[start:start + level.width * level.height]
+                level.tileStart = 0
+        return level
+
+    # Read the header and monster table of a binary map
+    #
+    # Input parameters are the file name, for error messages, and the
+    #    mapped file. Returns a MapFile without tiles whose tileStart is
+    #    where the tile codes begin.
+    @staticmethod
+    def readHeader(filename, data):
+        if len(data) < MapFile.HEADER.size:
+            raise ValueError("%s: truncated map file" % filename)
+        magic, version, width, height, avatarX, avatarY, hp, damage, torch, count = \
+            MapFile.HEADER.unpack_from(data, 0)
+        if magic != MapFile.MAGIC or version != MapFile.VERSION:
+            raise ValueError("%s: not a version %d map file" % (filename, MapFile.VERSION))
+        start = MapFile.HEADER.size
+        end = start + width * height
+        table = end + count * MapFile.MONSTER.size
+        if len(data) < table:
+            raise ValueError("%s: truncated map file" % filename)
+        monsters = [(code.rstrip(b'\0').decode('ascii'), x, y, monsterHp, monsterDamage, sleepMs)
+                    for code, x, y, monsterHp, monsterDamage, sleepMs
+                    in MapFile.MONSTER.iter_unpack(data[end:table])]
+        for index, monster in enumerate(monsters):
+            MapFile.checkPosition(filename, "monster %d" % index, width, height, *monster[1:3])
+        MapFile.checkPosition(filename, "avatar", width, height, avatarX, avatarY)
+        level = MapFile(width, height, (avatarX, avatarY, hp, damage, torch), None, monsters)
+        level.tileStart = start
+        return level
+
+    # Write the map in the binary format
+    #
+    # Raises ValueError, before writing anything, if a monster code is too
+    #    long for a record
+    def writeBinary(self, filename):
+        for code, x, y, hp, damage, sleepMs in self.monsters:
+            if len(code.encode('ascii')) > MapFile.CODE_LENGTH:
+                raise ValueError("%s: monster code %s at (%d, %d) is longer than %d characters" %
+                                 (filename, code, x, y, MapFile.CODE_LENGTH))
+        with open(filename, 'wb') as f:
+            f.write(MapFile.HEADER.pack(MapFile.MAGIC, MapFile.VERSION, self.width, self.height,
+                                        *self.avatar, len(self.monsters)))
+            f.write(self.codes)
+            for code, x, y, hp, damage, sleepMs in self.monsters:
+                f.write(MapFile.MONSTER.pack(code.encode('ascii'), x, y, hp, damage, sleepMs))
+
+# Main code to convert text maps to binary maps
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Must specify a map file!")
+        sys.exit(1)
+    for textName in sys.argv[1:]:
+        binaryName = os.path.splitext(textName)[0] + MapFile.EXTENSION
+        level = MapFile.readText(textName)
+        level.writeBinary(binaryName)
+        print("%s -> %s: %d x %d, %d monsters, %d bytes" %
+              (textName, binaryName, level.width, level.height, len(level.monsters),
+               os.path.getsize(binaryName)))
@@ -21,6 +21,22 @@ class MonsterType(Enum):
 #adding comment to test commit
 class Monster:
 
+    # Image drawn for each type of monster
+    SPRITES = {
+        MonsterType.SKELETON: "rec/skeleton.gif",
+        MonsterType.ORC:      "rec/orc.gif",
+        MonsterType.BAT:      "rec/bat.gif",
+        MonsterType.SLIME:    "rec/slime.gif",
+    }
+
+    # Map file code for each type of monster
+    CODES = {
+        "SK": MonsterType.SKELETON,
+        "OR": MonsterType.ORC,
+        "BA": MonsterType.BAT,
+        "SL": MonsterType.SLIME,
+    }
+
     # Construct a new monster
     # 
     # param world	- the world the monster moves about in
@@ -38,18 +54,10 @@ class Monster:
             self.damage = int(damage)
             self.sleep = int(sleepMs)/1000
             self.counter = 0                    # Counter for the damage timer
+            self.ident = 0                      # Id given by the world
             
             
-            if code == "SK":
-                self.type = MonsterType.SKELETON
-            elif code == "OR":
-                self.type = MonsterType.ORC
-            elif code == "BA":
-                self.type = MonsterType.BAT
-            elif code =="SL":
-                self.type = MonsterType.SLIME
-            else:
-                self.type == MonsterType.INVALID
+            self.type = self.CODES.get(code, MonsterType.INVALID)
             
             
         
@@ -62,24 +70,17 @@ class Monster:
 
     #
     # Draw this monster at its current location
-    def draw(self):
-        
+    #
+    # param canvas	- StdDraw canvas to draw on, the window by default
+    def draw(self, canvas=StdDraw.getDefaultCanvas()):
+
         drawX = (self.x + 0.5) * Tile.SIZE
         drawY = (self.y + 0.5) * Tile.SIZE
 
-        if self.world.tiles[self.x][self.y].getLit():
-            
-            
-            if self.type == MonsterType.SKELETON:
-                StdDraw.picture(picture.Picture("rec/skeleton.gif"), drawX, drawY)
-            elif self.type == MonsterType.ORC:
-                StdDraw.picture(picture.Picture("rec/orc.gif"), drawX, drawY)
-            elif self.type == MonsterType.BAT:
-                StdDraw.picture(picture.Picture("rec/bat.gif"), drawX, drawY)
-            elif self.type == MonsterType.SLIME:
-                StdDraw.picture(picture.Picture("rec/slime.gif"), drawX, drawY)
-
-            
+        if self.world.tiles.getLit(self.x, self.y):
+            fileName = self.SPRITES.get(self.type)
+            if fileName is not None:
+                canvas.picture(picture.sprite(fileName), drawX, drawY)
 
     #
     # Get the number of hit points the monster has remaining
@@ -119,34 +120,67 @@ class Monster:
         self.y = y
 
 
+    #
+    # Take one turn: count down the damage timer and try to move one step,
+    #    toward the avatar if the monster is within the world's flow field
+    #    and in a random direction otherwise
+    #
+    # return True while the monster is alive and wants more turns
+    def step(self):
+        if self.hp <= 0:
+            return False
+        # Far from the avatar the monster stops taking turns
+        if self.world.parkIfFar(self):
+            return False
+        # Increment damage counter
+        if self.counter > 0:
+            self.counter -= 1
+        # Follow the flow field, or generate a random direction
+        direction = 0
+        field = self.world.flowField
+        if field is not None:
+            direction = field.getDirection(self.x, self.y)
+        if direction == 0:
+            direction = random.randint(0, 4)
+        deltaX = 0
+        deltaY = 0
+        if direction == 1:
+            deltaY = 1
+        elif direction == 2:
+            deltaY = -1
+        elif direction == 3:
+            deltaX = -1
+        elif direction == 4:
+            deltaX = 1
+
+        x = self.getX() + deltaX
+        y = self.getY() + deltaY
+        # Check again that the monster is still alive
+        # Avoids the monster leaving ghost occupied tiles
+        # Then move
+        if self.hp > 0:
+            self.world.monsterMove(self, x, y)
+        return self.hp > 0
+
+    #
+    # Make up for turns missed while parked, in one coarse step
+    #
+    # The damage timer counts down as it would have; the position is kept,
+    #    since a random walk is as likely to end anywhere as where it began
+    #
+    # param turns	- number of turns missed
+    def catchUp(self, turns):
+        self.counter = max(0, self.counter - turns)
+
     #
     # Thread that moves the monster around periodically
+    #
+    # The world drives monsters from its scheduler instead; this is kept
+    #    for running a single monster on its own thread
     def run(self):
         
         # While the monster is alive
         while self.hp > 0:
             time.sleep(self.sleep)
-            # Increment damage counter
-            if self.counter > 0:
-                self.counter -= 1
-            # Generate a random direction
-            direction = random.randint(0, 4)
-            deltaX = 0
-            deltaY = 0
-            if direction == 1:
-                deltaY = 1
-            elif direction == 2:
-                deltaY = -1
-            elif direction == 3:
-                deltaX = -1
-            elif direction == 4:
-                deltaX = 1
-    
-            x = self.getX() + deltaX
-            y = self.getY() + deltaY
-            # Check again that the monster is still alive
-            # Avoids the monster leaving ghost occupied tiles
-            # Then move
-            if self.hp > 0:
-                self.world.monsterMove(self, x, y)
+            self.step()
 
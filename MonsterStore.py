@@ -0,0 +1,251 @@
+#
+# Author: Lorn Jaeger
+#
+# Description: Struct-of-arrays monster storage for the Ultima 0.1 game.
+#              Every monster attribute lives in a NumPy array, and one call
+#              moves every monster whose turn is due at once, so tens of
+#              thousands of monsters can be simulated without a Python
+#              object or a Python-level step per monster.
+#
+
+import sys
+import time
+import random
+import numpy
+from TileGrid import TileGrid
+from Monster import Monster, MonsterType
+from EventLog import eventLog
+
+class MonsterStore:
+
+    # Moves for each random direction, matching Monster.step
+    DELTA_X = numpy.array([0, 0, 0, -1, 1])
+    DELTA_Y = numpy.array([0, 1, -1, 0, 0])
+
+    # Lookup tables indexed by tile type code
+    PASSABLE = numpy.frombuffer(bytes(TileGrid.PASSABLE), dtype=numpy.uint8).astype(bool)
+    DAMAGE = numpy.array(TileGrid.DAMAGE)
+
+    # Constructor for the store
+    #
+    # Input parameters are the world the monsters live in and a list of
+    #    (code, x, y, hp, damage, sleepMs) records as read from a map file
+    def __init__(self, world, records):
+        self.world = world
+        self.width = world.width
+        self.height = world.height
+        count = len(records)
+        self.x = numpy.array([int(r[1]) for r in records], dtype=numpy.int64)
+        self.y = numpy.array([int(r[2]) for r in records], dtype=numpy.int64)
+        self.hp = numpy.array([int(r[3]) for r in records], dtype=numpy.int64)
+        self.damage = numpy.array([int(r[4]) for r in records], dtype=numpy.int64)
+        self.delay = numpy.array([int(r[5]) / 1000 for r in records], dtype=numpy.float64)
+        self.counter = numpy.zeros(count, dtype=numpy.int64)    # damage timer
+        self.type = numpy.array([Monster.CODES.get(r[0], MonsterType.INVALID).value
+                                 for r in records], dtype=numpy.uint8)
+        self.wake = self.delay.copy()                           # next turn time
+        self.alive = self.hp > 0
+        # Monsters far from the avatar are parked: they take no turns
+        #    until it comes near, and parked holds when each was parked
+        self.active = numpy.ones(count, dtype=bool)
+        self.parked = numpy.zeros(count, dtype=numpy.float64)
+
+        # Monster index + 1 on each cell, 0 if empty
+        self.occupancy = numpy.zeros(self.width * self.height, dtype=numpy.int32)
+        self.occupancy[self.x * self.height + self.y] = numpy.arange(1, count + 1)
+
+        # Seeded from the random module, so random.seed() repeats a run
+        self.random = numpy.random.default_rng(random.getrandbits(64))
+        self.steps = 0          # monster turns taken so far
+        self.conflicts = 0      # moves refused because another monster won the cell
+
+    # Accessor method
+    #
+    # Returns the number of monsters still alive
+    def count(self):
+        return int(numpy.count_nonzero(self.alive))
+
+    # Returns the number of living monsters taking turns
+    def activeCount(self):
+        return int(numpy.count_nonzero(self.alive & self.active))
+
+    # Returns the index of the monster on the cell at (x, y), or -1
+    def at(self, x, y):
+        return int(self.occupancy[x * self.height + y]) - 1
+
+    # Do damage to a monster, removing it from its cell if it dies
+    #
+    # Returns True if the monster died
+    def incurDamage(self, index, points):
+        self.counter[index] += 3
+        self.hp[index] -= points
+        if self.hp[index] <= 0 and self.alive[index]:
+            self.alive[index] = False
+            self.occupancy[self.x[index] * self.height + self.y[index]] = 0
+            return True
+        return False
+
+    # Find the monsters near a point
+    #
+    # Returns an array of the indexes of living monsters less than r
+    #    cells from (x, y)
+    def within(self, x, y, r):
+        deltaX = self.x - x
+        deltaY = self.y - y
+        near = numpy.sqrt(deltaX * deltaX + deltaY * deltaY) < r
+        return numpy.nonzero(near & self.alive)[0]
+
+    # Park the monsters that have wandered far from the avatar, and wake
+    #    the parked monsters it has come near
+    #
+    # A woken monster makes up for the turns it missed in one coarse step:
+    #    its damage timer counts down and it keeps its position.
+    def updateActivity(self, now):
+        radius = self.world.activityRadius
+        if radius <= 0:
+            return
+        deltaX = self.x - self.world.avatar.getX()
+        deltaY = self.y - self.world.avatar.getY()
+        distance = numpy.sqrt(deltaX * deltaX + deltaY * deltaY)
+        waking = numpy.nonzero(self.alive & ~self.active & (distance < radius))[0]
+        parking = self.alive & self.active & ~(distance < radius + self.world.ACTIVITY_MARGIN)
+        if len(waking):
+            missed = (now - self.parked[waking]) // numpy.maximum(self.delay[waking], 0.001)
+            self.counter[waking] = numpy.maximum(self.counter[waking] - missed.astype(numpy.int64), 0)
+            self.wake[waking] = now + self.delay[waking]
+            self.active[waking] = True
+            self.world.wakes += len(waking)
+        if parking.any():
+            self.parked[parking] = now
+            self.active[parking] = False
+            self.world.parks += int(numpy.count_nonzero(parking))
+
+    # Give a turn to every monster that is due at time now
+    #
+    # Each due monster inside the world's flow field steps toward the
+    #    avatar, and the others pick a random direction. Moves off the map, onto
+    #    impassable tiles or onto tiles holding a monster are refused; a
+    #    move onto the avatar attacks it instead. When several monsters
+    #    pick the same free tile, one chosen at random gets it. Monsters
+    #    take the damage of the tile they move onto.
+    # Returns the list of (x, y) cells whose contents changed
+    def tick(self, now):
+        self.updateActivity(now)
+        due = numpy.nonzero(self.alive & self.active & (self.wake <= now))[0]
+        if len(due) == 0:
+            return []
+        self.steps += len(due)
+        self.counter[due] = numpy.maximum(self.counter[due] - 1, 0)
+
+        direction = self.random.integers(0, 5, len(due))
+        fromX = self.x[due]
+        fromY = self.y[due]
+        field = self.world.flowField
+        if field is not None:
+            windowX = fromX - field.originX
+            windowY = fromY - field.originY
+            inside = (windowX >= 0) & (windowX < field.side) & (windowY >= 0) & (windowY < field.side)
+            entry = numpy.where(inside, windowX * field.side + windowY, 0)
+            current = inside & (numpy.frombuffer(field.stamp, dtype=numpy.intc)[entry] == field.version)
+            chase = numpy.frombuffer(field.direction, dtype=numpy.int8)[entry]
+            direction = numpy.where(current & (chase > 0), chase, direction)
+        toX = fromX + self.DELTA_X[direction]
+        toY = fromY + self.DELTA_Y[direction]
+        valid = (direction != 0) & (toX >= 0) & (toX < self.width) & \
+                (toY >= 0) & (toY < self.height)
+        toCell = numpy.where(valid, toX * self.height + toY, 0)
+        types = numpy.frombuffer(self.world.tiles.types, dtype=numpy.uint8)
+        valid &= self.PASSABLE[types[toCell]] & (self.occupancy[toCell] == 0)
+
+        avatarX = self.world.avatar.getX()
+        avatarY = self.world.avatar.getY()
+        attack = valid & (toX == avatarX) & (toY == avatarY)
+        if attack.any():
+            self.world.avatar.incurDamage(int(self.damage[due[attack]].sum()))
+            if __debug__:
+                eventLog.info("combat", "%d monsters hit avatar for %d, avatar hp %d",
+                              int(numpy.count_nonzero(attack)), int(self.damage[due[attack]].sum()),
+                              self.world.avatar.getHitPoints())
+
+        # Of the monsters moving onto the same tile, a random one wins
+        movers = numpy.nonzero(valid & ~attack)[0]
+        order = self.random.permutation(movers)
+        cells, first = numpy.unique(toCell[order], return_index=True)
+        winners = order[first]
+        self.conflicts += len(movers) - len(winners)
+
+        moved = due[winners]
+        self.occupancy[fromX[winners] * self.height + fromY[winners]] = 0
+        self.occupancy[cells] = moved + 1
+        self.x[moved] = toX[winners]
+        self.y[moved] = toY[winners]
+        changed = list(zip(fromX[winners].tolist(), fromY[winners].tolist()))
+        changed.extend(zip(toX[winners].tolist(), toY[winners].tolist()))
+        if attack.any():
+            changed.append((avatarX, avatarY))
+
+        # Damage from the tiles moved onto
+        self.counter[moved] += 3
+        self.hp[moved] -= self.DAMAGE[types[cells]]
+        dead = moved[self.hp[moved] <= 0]
+        if len(dead):
+            self.alive[dead] = False
+            self.occupancy[self.x[dead] * self.height + self.y[dead]] = 0
+            if __debug__:
+                eventLog.info("combat", "%d monsters die on damaging tiles", len(dead))
+        if __debug__:
+            eventLog.debug("move", "%d monsters move, %d lose a contested tile", len(moved), len(movers) - len(winners))
+
+        # Keep each monster's cadence, restarting any that fell behind
+        wake = self.wake[due] + self.delay[due]
+        self.wake[due] = numpy.where(wake < now, now + self.delay[due], wake)
+        return changed
+
+    # Start every monster's first turn one interval after time now
+    def startClock(self, now):
+        self.wake = self.delay + now
+
+    # Scheduler entry point: take every turn due at time now (the current
+    #    time if not given) and mark the cells that changed for redrawing
+    #
+    # Returns True while any monster is alive
+    def step(self, now=None):
+        if now is None:
+            now = time.monotonic()
+        stripes = self.world.regionLocks.acquireAll()
+        try:
+            changed = self.tick(now)
+        finally:
+            self.world.regionLocks.release(stripes)
+        self.world.markDirtyCells(changed)
+        return bool(self.alive.any())
+
+    # Time between scheduler turns for the whole store: the shortest
+    #    monster interval
+    @property
+    def sleep(self):
+        if len(self.delay) == 0:
+            return 1.0
+        return max(0.001, float(self.delay.min()))
+
+    # Returns a list of the (x, y) cells holding a living monster
+    def cells(self):
+        alive = numpy.nonzero(self.alive)[0]
+        return list(zip(self.x[alive].tolist(), self.y[alive].tolist()))
+
+# Main code to test the monster store class
+if __name__ == "__main__":
+    from World import World
+
+    if len(sys.argv) < 2:
+        print("Must specify a level file!")
+        sys.exit(1)
+    world = World(sys.argv[1], headless=True, monsterStore=True)
+    store = world.store
+    print("%d monsters" % store.count())
+    now = 0.0
+    for tick in range(100):
+        now += 0.1
+        world.stepMonsters(now)
+    print("%d turns, %d conflicts, %d alive" % (store.steps, store.conflicts, store.count()))
+    print("%d cells occupied" % numpy.count_nonzero(store.occupancy))
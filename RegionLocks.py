@@ -0,0 +1,119 @@
+#
+# Author: Lorn Jaeger
+#
+# Description: Per-chunk locks over the world grid for the Ultima 0.1 game.
+#              Moves lock only the chunks they touch, so moves in different
+#              parts of the map do not wait for each other.
+#
+
+import threading
+from contextlib import contextmanager
+
+class RegionLocks:
+
+    # Constructor for the locks
+    #
+    # Input parameters are the width and height of the grid in cells and
+    #    the width and height of the square chunk each lock covers
+    def __init__(self, width, height, chunk=16):
+        self.chunk = chunk
+        self.columns = (width + chunk - 1) // chunk
+        self.rows = (height + chunk - 1) // chunk
+        # Locks are made the first time their chunk is touched, so a huge
+        #    map only pays for the chunks in use
+        self.locks = {}
+        # Number of times each lock was found held by another thread
+        self.contention = {}
+
+    # Index of the lock covering the cell at (x, y)
+    def stripe(self, x, y):
+        return (x // self.chunk) * self.rows + (y // self.chunk)
+
+    # Acquire the locks covering every (x, y) cell in cells
+    #
+    # Locks are always taken in increasing stripe order, so two moves that
+    #    cross a chunk border in opposite directions cannot deadlock.
+    # Returns the stripes acquired, to be handed to release()
+    def acquire(self, cells):
+        stripes = sorted({self.stripe(x, y) for x, y in cells})
+        for stripe in stripes:
+            self.lockStripe(stripe)
+        return stripes
+
+    # Acquire the locks for a move from (fromX, fromY) to (toX, toY)
+    #
+    # The same as acquire() for those two cells, without building a set.
+    # Returns the stripes acquired, to be handed to release()
+    def acquireMove(self, fromX, fromY, toX, toY):
+        first = (fromX // self.chunk) * self.rows + (fromY // self.chunk)
+        second = (toX // self.chunk) * self.rows + (toY // self.chunk)
+        if first == second:
+            stripes = (first,)
+        elif first < second:
+            stripes = (first, second)
+        else:
+            stripes = (second, first)
+        for stripe in stripes:
+            self.lockStripe(stripe)
+        return stripes
+
+    # Acquire every lock, for a step that may touch any part of the map
+    #
+    # Returns the stripes acquired, to be handed to release()
+    def acquireAll(self):
+        stripes = range(self.columns * self.rows)
+        for stripe in stripes:
+            self.lockStripe(stripe)
+        return stripes
+
+    # Acquire one stripe's lock, counting it if another thread holds it
+    def lockStripe(self, stripe):
+        lock = self.locks.get(stripe)
+        if lock is None:
+            # setdefault is atomic, so racing threads get the same lock
+            lock = self.locks.setdefault(stripe, threading.Lock())
+        if not lock.acquire(False):
+            lock.acquire()
+            # Counted while holding the lock, so counts are not lost
+            self.contention[stripe] = self.contention.get(stripe, 0) + 1
+
+    # Release the stripes returned by acquire()
+    def release(self, stripes):
+        for stripe in reversed(stripes):
+            self.locks[stripe].release()
+
+    # Hold the locks covering every (x, y) cell in cells for a with block
+    @contextmanager
+    def holding(self, cells):
+        stripes = self.acquire(cells)
+        try:
+            yield stripes
+        finally:
+            self.release(stripes)
+
+    # Accessor method
+    #
+    # Returns a dictionary giving, for each stripe a thread ever had to wait
+    #    for, how many times it waited
+    def getContention(self):
+        return dict(self.contention)
+
+    # Accessor method
+    #
+    # Returns the total number of times any thread had to wait for a lock
+    def getTotalContention(self):
+        return sum(self.contention.values())
+
+# Main code to test the region locks class
+if __name__ == "__main__":
+    locks = RegionLocks(50, 50, 16)
+    print("%d x %d chunks" % (locks.columns, locks.rows))
+    # A move across a chunk border takes both chunks' locks in order
+    with locks.holding([(15, 3), (16, 3)]) as stripes:
+        print(stripes)
+        # Another thread touching one of them has to wait
+        waiter = threading.Thread(target=lambda: locks.release(locks.acquire([(16, 4)])))
+        waiter.start()
+        waiter.join(0.1)
+    waiter.join()
+    print(locks.getTotalContention())
@@ -0,0 +1,130 @@
+#
+# Author: Lorn Jaeger
+#
+# Description: Render-command queue for the Ultima 0.1 game. Simulation
+#              threads publish the cells whose appearance they changed,
+#              and only the main thread takes them off the queue and draws
+#              them, so no thread but the main one ever touches pygame's
+#              drawing surface. Publishing takes no lock.
+#
+
+import threading
+from collections import deque
+
+class RenderQueue:
+
+    # Constructor for the queue
+    #
+    # Input parameter is an optional function called with no arguments,
+    #    from the publishing thread, when a command arrives while the
+    #    consumer has nothing waiting, so a game loop can sleep until then
+    def __init__(self, listener=None):
+        # Appending to and popping from a deque are atomic, so publishers
+        #    and the consumer never wait on each other
+        self.commands = deque()
+        self.listener = listener
+        # Set when the listener has been called since the last drain, so
+        #    a burst of commands wakes the consumer only once
+        self.signalled = False
+        self.published = 0      # commands published
+        self.drained = 0        # commands taken by the consumer
+        self.drains = 0         # times the consumer drained the queue
+        self.peak = 0           # most commands waiting at a drain
+        self.depthTotal = 0     # commands waiting summed over the drains
+
+    # Publish a command to redraw the cell at (x, y)
+    def push(self, x, y):
+        self.commands.append((x, y))
+        self.published += 1
+        self.signal()
+
+    # Publish a command to redraw each (x, y) cell of a collection
+    def pushAll(self, cells):
+        if not cells:
+            return
+        self.commands.extend(cells)
+        self.published += len(cells)
+        self.signal()
+
+    # Call the listener unless it was called since the last drain
+    #
+    # The consumer clears the flag before draining, and a publisher sets it
+    #    after appending, so a command published during or after a drain
+    #    always either is drained or calls the listener
+    def signal(self):
+        if not self.signalled:
+            self.signalled = True
+            if self.listener is not None:
+                self.listener()
+
+    # Take every waiting command off the queue
+    #
+    # Called only by the main thread. Returns the set of cells to redraw,
+    #    each cell once however many times it was published.
+    def drain(self):
+        self.signalled = False
+        commands = self.commands
+        cells = set()
+        waiting = 0
+        while commands:
+            try:
+                cells.add(commands.popleft())
+            except IndexError:
+                break
+            waiting += 1
+        self.drained += waiting
+        self.drains += 1
+        self.peak = max(self.peak, waiting)
+        self.depthTotal += waiting
+        return cells
+
+    # Is any command waiting
+    def isEmpty(self):
+        return not self.commands
+
+    # Accessor method
+    #
+    # Returns the number of commands waiting to be drawn
+    def getDepth(self):
+        return len(self.commands)
+
+    # Accessor method
+    #
+    # Returns the number of drains, the mean and the most commands
+    #    waiting at a drain, and the commands waiting now. The counts are
+    #    updated without a lock, so this is approximate while threads are
+    #    publishing.
+    def getDepthStats(self):
+        mean = self.depthTotal / self.drains if self.drains else 0.0
+        return self.drains, mean, self.peak, len(self.commands)
+
+# Main code to test the render queue class
+if __name__ == "__main__":
+    import time
+
+    # Four publishers push a cell at a time, and 50 cells at once every
+    #    millisecond, while this thread drains like a 500 fps game loop
+    def publish(n):
+        for turn in range(100):
+            for y in range(50):
+                queue.push(n, y)
+            queue.pushAll([(n, y) for y in range(50, 100)])
+            time.sleep(0.001)
+
+    wakes = []
+    queue = RenderQueue(lambda: wakes.append(threading.current_thread().name))
+    workers = [threading.Thread(target=publish, args=(n,)) for n in range(4)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    cells = 0
+    while any(worker.is_alive() for worker in workers) or not queue.isEmpty():
+        cells += len(queue.drain())
+        time.sleep(0.002)
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    drains, mean, peak, depth = queue.getDepthStats()
+    print("%d published in %.1f ms, %d drained over %d drains, %d cells drawn, %d wakes" %
+          (queue.published, 1000 * elapsed, queue.drained, drains, cells, len(wakes)))
+    print("depth mean %.1f, peak %d, left %d" % (mean, peak, depth))
@@ -0,0 +1,132 @@
+#
+# Author: Lorn Jaeger
+#
+# Description: Central tick scheduler for the Ultima 0.1 game. A single
+#              thread wakes every actor (monster) when its next turn is
+#              due, instead of each actor sleeping on its own thread.
+#
+
+import heapq
+import itertools
+import threading
+import time
+
+class Scheduler:
+
+    # Constructor for the scheduler
+    #
+    # Actors are objects with a step() method that takes one turn and
+    #    returns True while the actor wants more turns, and a sleep
+    #    attribute giving the seconds between turns.
+    def __init__(self):
+        self.queue = []                     # heap of (wake time, order, actor)
+        self.order = itertools.count()      # breaks ties between equal times
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.steps = 0                      # turns taken so far
+
+    # Schedule an actor's first turn
+    #
+    # Input parameters are the actor and the delay in seconds before its
+    #    first turn. If now is given it is the time the delay counts from.
+    def add(self, actor, delay, now=None):
+        if now is None:
+            now = time.monotonic()
+        with self.condition:
+            heapq.heappush(self.queue, (now + delay, next(self.order), actor))
+            self.condition.notify()
+
+    # Accessor method
+    #
+    # Returns the number of actors waiting for a turn
+    def getSize(self):
+        return len(self.queue)
+
+    # Accessor method
+    #
+    # Returns the time of the earliest scheduled turn, or None if no actor
+    #    is scheduled
+    def nextWake(self):
+        with self.condition:
+            if not self.queue:
+                return None
+            return self.queue[0][0]
+
+    # Give a turn to every actor that is due at time now
+    #
+    # Each actor is scheduled again one sleep interval after the turn it
+    #    just took, so it keeps the same cadence it had with its own
+    #    thread. An actor that has fallen more than an interval behind is
+    #    scheduled from now instead of taking a burst of turns to catch up.
+    # Returns the number of turns taken
+    def runDue(self, now):
+        taken = 0
+        while True:
+            with self.condition:
+                if not self.queue or self.queue[0][0] > now:
+                    return taken
+                wake, order, actor = heapq.heappop(self.queue)
+            if actor.step():
+                wake += actor.sleep
+                if wake < now:
+                    wake = now + actor.sleep
+                with self.condition:
+                    heapq.heappush(self.queue, (wake, next(self.order), actor))
+            taken += 1
+            self.steps += 1
+
+    # Start the thread that gives actors their turns in real time
+    def start(self):
+        if self.thread is not None:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    # Stop the scheduler thread after the turn it is taking
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    # Thread body: sleep until the earliest turn is due, then take it
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running:
+                    now = time.monotonic()
+                    if self.queue and self.queue[0][0] <= now:
+                        break
+                    if self.queue:
+                        self.condition.wait(self.queue[0][0] - now)
+                    else:
+                        self.condition.wait()
+                if not self.running:
+                    return
+            self.runDue(time.monotonic())
+
+# Main code to test the scheduler class
+if __name__ == "__main__":
+    # An actor that counts its turns and stops after five of them
+    class Counter:
+        def __init__(self, sleep):
+            self.sleep = sleep
+            self.turns = 0
+
+        def step(self):
+            self.turns += 1
+            return self.turns < 5
+
+    fast = Counter(0.01)
+    slow = Counter(0.05)
+    scheduler = Scheduler()
+    scheduler.add(fast, fast.sleep)
+    scheduler.add(slow, slow.sleep)
+    scheduler.start()
+    time.sleep(0.12)
+    print("fast %d slow %d threads %d" % (fast.turns, slow.turns, threading.active_count()))
+    scheduler.stop()
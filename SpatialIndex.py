@@ -0,0 +1,120 @@
+#
+# Author: Lorn Jaeger
+#
+# Description: Spatial index of the monsters in the Ultima 0.1 game. The
+#              tile grid's occupancy array answers "who is on this cell",
+#              and a hash grid of buckets answers "who is near this cell",
+#              with constant time insert, move and remove.
+#
+
+import math
+
+class SpatialIndex:
+
+    # Constructor for the index
+    #
+    # Input parameters are the TileGrid whose occupancy array holds the
+    #    monster on each cell, and the width and height in cells of the
+    #    buckets used for range queries
+    def __init__(self, grid, bucket=8):
+        self.grid = grid
+        self.bucket = bucket
+        self.members = {}       # monster id -> monster
+        self.buckets = {}       # (bucket x, bucket y) -> set of monsters
+
+    # Add a monster at its current location
+    def insert(self, monster):
+        self.members[monster.ident] = monster
+        self.grid.setOccupant(monster.getX(), monster.getY(), monster)
+        key = (monster.getX() // self.bucket, monster.getY() // self.bucket)
+        self.buckets.setdefault(key, set()).add(monster)
+
+    # Move a monster to (x, y), updating its location
+    def move(self, monster, x, y):
+        oldKey = (monster.getX() // self.bucket, monster.getY() // self.bucket)
+        newKey = (x // self.bucket, y // self.bucket)
+        self.grid.setOccupant(monster.getX(), monster.getY(), None)
+        monster.setLocation(x, y)
+        self.grid.setOccupant(x, y, monster)
+        if newKey != oldKey:
+            self.buckets[oldKey].discard(monster)
+            self.buckets.setdefault(newKey, set()).add(monster)
+
+    # Remove a monster from the index
+    def remove(self, monster):
+        if self.members.pop(monster.ident, None) is None:
+            return
+        cell = self.grid.index(monster.getX(), monster.getY())
+        if self.grid.occupancy[cell] == monster.ident:
+            self.grid.occupancy[cell] = 0
+        self.grid.occupants.pop(monster.ident, None)
+        key = (monster.getX() // self.bucket, monster.getY() // self.bucket)
+        self.buckets[key].discard(monster)
+
+    # Returns the monster on the cell at (x, y), or None
+    def at(self, x, y):
+        return self.grid.getOccupant(x, y)
+
+    # Find the monsters near a point
+    #
+    # Input parameters are the point (x, y) and a radius r. Only the
+    #    buckets overlapping the square around the circle are looked at.
+    # Returns a list of the monsters less than r cells from (x, y)
+    def within(self, x, y, r):
+        found = []
+        reach = int(math.ceil(r))
+        for bucketX in range((x - reach) // self.bucket, (x + reach) // self.bucket + 1):
+            for bucketY in range((y - reach) // self.bucket, (y + reach) // self.bucket + 1):
+                members = self.buckets.get((bucketX, bucketY))
+                if not members:
+                    continue
+                for monster in tuple(members):
+                    deltaX = monster.getX() - x
+                    deltaY = monster.getY() - y
+                    if math.sqrt(deltaX * deltaX + deltaY * deltaY) < r:
+                        found.append(monster)
+        return found
+
+    # Number of monsters in the index
+    def __len__(self):
+        return len(self.members)
+
+    # Iterate over a snapshot of the monsters, so other threads may move
+    #    or remove monsters meanwhile
+    def __iter__(self):
+        return iter(list(self.members.values()))
+
+    def __contains__(self, monster):
+        return monster.ident in self.members
+
+# Main code to test the spatial index class
+if __name__ == "__main__":
+    from TileGrid import TileGrid
+
+    # A stand-in for a monster with an id and a location
+    class Marker:
+        def __init__(self, ident, x, y):
+            self.ident = ident
+            self.x = x
+            self.y = y
+
+        def getX(self):
+            return self.x
+
+        def getY(self):
+            return self.y
+
+        def setLocation(self, x, y):
+            self.x = x
+            self.y = y
+
+    index = SpatialIndex(TileGrid(40, 40), 8)
+    markers = [Marker(i + 1, (i * 7) % 40, (i * 11) % 40) for i in range(20)]
+    for marker in markers:
+        index.insert(marker)
+    print(len(index), index.at(7, 11).ident)
+    index.move(markers[1], 20, 20)
+    print(index.at(7, 11), index.at(20, 20).ident)
+    print(sorted(m.ident for m in index.within(20, 20, 6.0)))
+    index.remove(markers[1])
+    print(len(index), index.at(20, 20))
@@ -5,12 +5,19 @@ The stddraw module defines functions that allow the user to create a
 drawing.  A drawing appears on the canvas.  The canvas appears
 in the window.  As a convenience, the module also imports the
 commonly used Color objects defined in the color module.
+
+Every drawing is made on a Canvas object, which carries its own
+surface, scales, pen and input queue.  The module functions draw on a
+default canvas shown in the window; further canvases may be created
+offscreen, any number of them in one process, for drawings that are
+saved or copied elsewhere instead of shown.
 """
 
 import time
 import os
 import sys
 import color
+import picture as _picture
 import string
 
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = 'hide'
@@ -69,38 +76,12 @@ _DEFAULT_PEN_COLOR = color.BLACK
 _DEFAULT_FONT_FAMILY = 'Helvetica'
 _DEFAULT_FONT_SIZE = 12
 
-_xmin = None
-_ymin = None
-_xmax = None
-_ymax = None
-
-_fontFamily = _DEFAULT_FONT_FAMILY
-_fontSize = _DEFAULT_FONT_SIZE
-
-_canvasWidth = float(_DEFAULT_CANVAS_SIZE)
-_canvasHeight = float(_DEFAULT_CANVAS_SIZE)
-_penRadius = None
-_penColor = _DEFAULT_PEN_COLOR
-_keysTyped = []
-
-# Has the window been created?
-_windowCreated = False
-
-#-----------------------------------------------------------------------
-# Begin added by Alan J. Broder
-#-----------------------------------------------------------------------
-
-# Keep track of mouse status
-
-# Has the mouse been left-clicked since the last time we checked?
-_mousePressed = False
+# Event posted by postWake() to end a waitForEvent() early
+_WAKE_EVENT = pygame.USEREVENT
 
-# The position of the mouse as of the most recent mouse click
-_mousePos = None
- 
-#-----------------------------------------------------------------------
-# End added by Alan J. Broder
-#-----------------------------------------------------------------------
+# The canvas shown in the window, once the window has been created.
+# pygame has one display, so only one canvas may have the window.
+_windowCanvas = None
 
 #-----------------------------------------------------------------------
 
@@ -116,646 +97,885 @@ def _pygameColor(c):
 
 #-----------------------------------------------------------------------
 
-# Private functions to scale and factor X and Y values.
-
-def _scaleX(x):
-    return _canvasWidth * (x - _xmin) / (_xmax - _xmin)
-
-def _scaleY(y):
-    return _canvasHeight * (_ymax - y) / (_ymax - _ymin)
-
-def _factorX(w):
-    return w * _canvasWidth / abs(_xmax - _xmin)
-
-def _factorY(h):
-    return h * _canvasHeight / abs(_ymax - _ymin)
-
-#-----------------------------------------------------------------------
-# Begin added by Alan J. Broder
-#-----------------------------------------------------------------------
-
-def _userX(x):
-    return _xmin + x * (_xmax - _xmin) / _canvasWidth
-
-def _userY(y):
-    return _ymax - y * (_ymax - _ymin) / _canvasHeight
+class Canvas:
+    """
+    A drawing surface with its own scales, pen, font and input queue.
+    A window canvas creates the stddraw window when it is sized or
+    first drawn on, shows its drawing there and receives the window's
+    keys and mouse clicks.  An offscreen canvas draws on a surface of
+    its own that is never shown; show() just ends its frame.
+    """
+
+    def __init__(self, w=_DEFAULT_CANVAS_SIZE, h=_DEFAULT_CANVAS_SIZE,
+                 window=False):
+        """
+        Create a canvas w pixels wide and h pixels high, shown in the
+        window if window is True and offscreen otherwise.
+        """
+        self._window = window
+        self._canvasWidth = float(w)
+        self._canvasHeight = float(h)
+        self._fontFamily = _DEFAULT_FONT_FAMILY
+        self._fontSize = _DEFAULT_FONT_SIZE
+        self._penRadius = None
+        self._penColor = _DEFAULT_PEN_COLOR
+        self._keysTyped = []
+        # time.monotonic() when each key in _keysTyped arrived, and when
+        # the key most recently returned by nextKeyTyped() arrived
+        self._keyTimes = []
+        self._lastKeyTime = None
+
+        # The window surface and the canvas drawn on.  A window canvas
+        # has neither until its window is created.
+        self._background = None
+        self._surface = None
+        self._created = False
+
+        # In dirty-rectangle mode only the canvas regions passed to
+        # markDirty() since the last show are copied to the window.
+        # None means the whole canvas must be copied.
+        self._dirtyRectMode = False
+        self._dirtyRects = None
+
+        # Pixel centers of the cell columns and rows used by
+        # pictureCells(), for the grid and scales in _cellKey, and the
+        # surface and half size of each picture it has drawn
+        self._cellKey = None
+        self._cellColumns = {}
+        self._cellRows = {}
+        self._pictureSizes = {}
 
-#-----------------------------------------------------------------------
-# End added by Alan J. Broder
-#-----------------------------------------------------------------------
-    
-#-----------------------------------------------------------------------
+        #---------------------------------------------------------------
+        # Begin added by Alan J. Broder
+        #---------------------------------------------------------------
 
-def setCanvasSize(w=_DEFAULT_CANVAS_SIZE, h=_DEFAULT_CANVAS_SIZE):
-    """
-    Set the size of the canvas to w pixels wide and h pixels high.
-    Calling this function is optional. If you call it, you must do
-    so before calling any drawing function.
-    """
-    global _background
-    global _surface
-    global _canvasWidth
-    global _canvasHeight
-    global _windowCreated
-
-    if _windowCreated:
-        raise Exception('The stddraw window already was created')
-
-    if (w < 1) or (h < 1):
-        raise Exception('width and height must be positive')
-
-    _canvasWidth = w
-    _canvasHeight = h
-    _background = pygame.display.set_mode([w, h])
-    pygame.display.set_caption('stddraw window (r-click to save)')
-    _surface = pygame.Surface((w, h))
-    _surface.fill(_pygameColor(WHITE))
-    _windowCreated = True
-
-def setXscale(min=_DEFAULT_XMIN, max=_DEFAULT_XMAX):
-    """
-    Set the x-scale of the canvas such that the minimum x value
-    is min and the maximum x value is max.
-    """
-    global _xmin
-    global _xmax
-    min = float(min)
-    max = float(max)
-    if min >= max:
-        raise Exception('min must be less than max')
-    size = max - min
-    _xmin = min - _BORDER * size
-    _xmax = max + _BORDER * size
-
-def setYscale(min=_DEFAULT_YMIN, max=_DEFAULT_YMAX):
-    """
-    Set the y-scale of the canvas such that the minimum y value
-    is min and the maximum y value is max.
-    """
-    global _ymin
-    global _ymax
-    min = float(min)
-    max = float(max)
-    if min >= max:
-        raise Exception('min must be less than max')
-    size = max - min
-    _ymin = min - _BORDER * size
-    _ymax = max + _BORDER * size
-
-def setPenRadius(r=_DEFAULT_PEN_RADIUS):
-    """
-    Set the pen radius to r, thus affecting the subsequent drawing
-    of points and lines. If r is 0.0, then points will be drawn with
-    the minimum possible radius and lines with the minimum possible
-    width.
-    """
-    global _penRadius
-    r = float(r)
-    if r < 0.0:
-        raise Exception('Argument to setPenRadius() must be non-neg')
-    _penRadius = r * float(_DEFAULT_CANVAS_SIZE)
+        # Keep track of mouse status
 
-def setPenColor(c=_DEFAULT_PEN_COLOR):
-    """
-    Set the pen color to c, where c is an object of class color.Color.
-    c defaults to stddraw.BLACK.
-    """
-    global _penColor
-    _penColor = c
+        # Has the mouse been left-clicked since the last time we checked?
+        self._mousePressed = False
 
-def setFontFamily(f=_DEFAULT_FONT_FAMILY):
-    """
-    Set the font family to f (e.g. 'Helvetica' or 'Courier').
-    """
-    global _fontFamily
-    _fontFamily = f
+        # The position of the mouse as of the most recent mouse click
+        self._mousePos = None
 
-def setFontSize(s=_DEFAULT_FONT_SIZE):
-    """
-    Set the font size to s (e.g. 12 or 16).
-    """
-    global _fontSize
-    _fontSize = s
+        #---------------------------------------------------------------
+        # End added by Alan J. Broder
+        #---------------------------------------------------------------
 
-#-----------------------------------------------------------------------
+        # Initialize the x scale, the y scale, and the pen radius.
+        self.setXscale()
+        self.setYscale()
+        self.setPenRadius()
+        if not window:
+            self.setCanvasSize(w, h)
 
-def _makeSureWindowCreated():
-    global _windowCreated
-    if not _windowCreated:
-        setCanvasSize()
-        _windowCreated = True
+    #-------------------------------------------------------------------
 
-#-----------------------------------------------------------------------
+    # Private methods to scale and factor X and Y values.
 
-# Functions to draw shapes, text, and images on the background canvas.
+    def _scaleX(self, x):
+        return self._canvasWidth * (x - self._xmin) / (self._xmax - self._xmin)
 
-def _pixel(x, y):
-    """
-    Draw on the background canvas a pixel at (x, y).
-    """
-    _makeSureWindowCreated()
-    xs = _scaleX(x)
-    xy = _scaleY(y)
-    pygame.gfxdraw.pixel(
-        _surface,
-        int(round(xs)),
-        int(round(xy)),
-        _pygameColor(_penColor))
-
-def point(x, y):
-    """
-    Draw on the background canvas a point at (x, y).
-    """
-    _makeSureWindowCreated()
-    x = float(x)
-    y = float(y)
-    # If the radius is too small, then simply draw a pixel.
-    if _penRadius <= 1.0:
-        _pixel(x, y)
-    else:
-        xs = _scaleX(x)
-        ys = _scaleY(y)
-        pygame.draw.ellipse(
-            _surface,
-            _pygameColor(_penColor),
-            pygame.Rect(
-                xs-_penRadius,
-                ys-_penRadius,
-                _penRadius*2.0,
-                _penRadius*2.0),
-            0)
-
-def _thickLine(x0, y0, x1, y1, r):
-    """
-    Draw on the background canvas a line from (x0, y0) to (x1, y1).
-    Draw the line with a pen whose radius is r.
-    """
-    xs0 = _scaleX(x0)
-    ys0 = _scaleY(y0)
-    xs1 = _scaleX(x1)
-    ys1 = _scaleY(y1)
-    if (abs(xs0-xs1) < 1.0) and (abs(ys0-ys1) < 1.0):
-        filledCircle(x0, y0, r)
-        return
-    xMid = (x0+x1)/2
-    yMid = (y0+y1)/2
-    _thickLine(x0, y0, xMid, yMid, r)
-    _thickLine(xMid, yMid, x1, y1, r)
-
-def line(x0, y0, x1, y1):
-    """
-    Draw on the background canvas a line from (x0, y0) to (x1, y1).
-    """
+    def _scaleY(self, y):
+        return self._canvasHeight * (self._ymax - y) / (self._ymax - self._ymin)
 
-    THICK_LINE_CUTOFF = 3 # pixels
-
-    _makeSureWindowCreated()
-
-    x0 = float(x0)
-    y0 = float(y0)
-    x1 = float(x1)
-    y1 = float(y1)
-
-    lineWidth = _penRadius * 2.0
-    if lineWidth == 0.0: lineWidth = 1.0
-    if lineWidth < THICK_LINE_CUTOFF:
-        x0s = _scaleX(x0)
-        y0s = _scaleY(y0)
-        x1s = _scaleX(x1)
-        y1s = _scaleY(y1)
-        pygame.draw.line(
-            _surface,
-            _pygameColor(_penColor),
-            (x0s, y0s),
-            (x1s, y1s),
-            int(round(lineWidth)))
-    else:
-        _thickLine(x0, y0, x1, y1, _penRadius/_DEFAULT_CANVAS_SIZE)
-
-def circle(x, y, r):
-    """
-    Draw on the background canvas a circle of radius r centered on
-    (x, y).
-    """
-    _makeSureWindowCreated()
-    x = float(x)
-    y = float(y)
-    r = float(r)
-    ws = _factorX(2.0*r)
-    hs = _factorY(2.0*r)
-    # If the radius is too small, then simply draw a pixel.
-    if (ws <= 1.0) and (hs <= 1.0):
-        _pixel(x, y)
-    else:
-        xs = _scaleX(x)
-        ys = _scaleY(y)
-        pygame.draw.ellipse(
-            _surface,
-            _pygameColor(_penColor),
-            pygame.Rect(xs-ws/2.0, ys-hs/2.0, ws, hs),
-            int(round(_penRadius)))
-
-def filledCircle(x, y, r):
-    """
-    Draw on the background canvas a filled circle of radius r
-    centered on (x, y).
-    """
-    _makeSureWindowCreated()
-    x = float(x)
-    y = float(y)
-    r = float(r)
-    ws = _factorX(2.0*r)
-    hs = _factorY(2.0*r)
-    # If the radius is too small, then simply draw a pixel.
-    if (ws <= 1.0) and (hs <= 1.0):
-        _pixel(x, y)
-    else:
-        xs = _scaleX(x)
-        ys = _scaleY(y)
-        pygame.draw.ellipse(
-            _surface,
-            _pygameColor(_penColor),
-            pygame.Rect(xs-ws/2.0, ys-hs/2.0, ws, hs),
-            0)
-
-def rectangle(x, y, w, h):
-    """
-    Draw on the background canvas a rectangle of width w and height h
-    whose lower left point is (x, y).
-    """
-    global _surface
-    _makeSureWindowCreated()
-    x = float(x)
-    y = float(y)
-    w = float(w)
-    h = float(h)
-    ws = _factorX(w)
-    hs = _factorY(h)
-    # If the rectangle is too small, then simply draw a pixel.
-    if (ws <= 1.0) and (hs <= 1.0):
-        _pixel(x, y)
-    else:
-        xs = _scaleX(x)
-        ys = _scaleY(y)
-        pygame.draw.rect(
-            _surface,
-            _pygameColor(_penColor),
-            pygame.Rect(xs, ys-hs, ws, hs),
-            int(round(_penRadius)))
-
-def filledRectangle(x, y, w, h):
-    """
-    Draw on the background canvas a filled rectangle of width w and
-    height h whose lower left point is (x, y).
-    """
-    global _surface
-    _makeSureWindowCreated()
-    x = float(x)
-    y = float(y)
-    w = float(w)
-    h = float(h)
-    ws = _factorX(w)
-    hs = _factorY(h)
-    # If the rectangle is too small, then simply draw a pixel.
-    if (ws <= 1.0) and (hs <= 1.0):
-        _pixel(x, y)
-    else:
-        xs = _scaleX(x)
-        ys = _scaleY(y)
-        pygame.draw.rect(
-            _surface,
-            _pygameColor(_penColor),
-            pygame.Rect(xs, ys-hs, ws, hs),
-            0)
-
-def square(x, y, r):
-    """
-    Draw on the background canvas a square whose sides are of length
-    2r, centered on (x, y).
-    """
-    _makeSureWindowCreated()
-    rectangle(x-r, y-r, 2.0*r, 2.0*r)
+    def _factorX(self, w):
+        return w * self._canvasWidth / abs(self._xmax - self._xmin)
 
-def filledSquare(x, y, r):
-    """
-    Draw on the background canvas a filled square whose sides are of
-    length 2r, centered on (x, y).
-    """
-    _makeSureWindowCreated()
-    filledRectangle(x-r, y-r, 2.0*r, 2.0*r)
+    def _factorY(self, h):
+        return h * self._canvasHeight / abs(self._ymax - self._ymin)
 
-def polygon(x, y):
-    """
-    Draw on the background canvas a polygon with coordinates
-    (x[i], y[i]).
-    """
-    global _surface
-    _makeSureWindowCreated()
-    # Scale X and Y values.
-    xScaled = []
-    for xi in x:
-        xScaled.append(_scaleX(float(xi)))
-    yScaled = []
-    for yi in y:
-        yScaled.append(_scaleY(float(yi)))
-    points = []
-    for i in range(len(x)):
-        points.append((xScaled[i], yScaled[i]))
-    points.append((xScaled[0], yScaled[0]))
-    pygame.draw.polygon(
-        _surface,
-        _pygameColor(_penColor),
-        points,
-        int(round(_penRadius)))
-
-def filledPolygon(x, y):
-    """
-    Draw on the background canvas a filled polygon with coordinates
-    (x[i], y[i]).
-    """
-    global _surface
-    _makeSureWindowCreated()
-    # Scale X and Y values.
-    xScaled = []
-    for xi in x:
-        xScaled.append(_scaleX(float(xi)))
-    yScaled = []
-    for yi in y:
-        yScaled.append(_scaleY(float(yi)))
-    points = []
-    for i in range(len(x)):
-        points.append((xScaled[i], yScaled[i]))
-    points.append((xScaled[0], yScaled[0]))
-    pygame.draw.polygon(_surface, _pygameColor(_penColor), points, 0)
-
-def text(x, y, s):
-    """
-    Draw string s on the background canvas centered at (x, y).
-    """
-    _makeSureWindowCreated()
-    x = float(x)
-    y = float(y)
-    xs = _scaleX(x)
-    ys = _scaleY(y)
-    font = pygame.font.SysFont(_fontFamily, _fontSize)
-    text = font.render(s, 1, _pygameColor(_penColor))
-    textpos = text.get_rect(center=(xs, ys))
-    _surface.blit(text, textpos)
-
-def picture(pic, x=None, y=None):
-    """
-    Draw pic on the background canvas centered at (x, y).  pic is an
-    object of class picture.Picture. x and y default to the midpoint
-    of the background canvas.
-    """
-    global _surface
-    _makeSureWindowCreated()
-    # By default, draw pic at the middle of the surface.
-    if x is None:
-        x = (_xmax + _xmin) / 2.0
-    if y is None:
-        y = (_ymax + _ymin) / 2.0
-    x = float(x)
-    y = float(y)
-    xs = _scaleX(x)
-    ys = _scaleY(y)
-    ws = pic.width()
-    hs = pic.height()
-    picSurface = pic._surface # violates encapsulation
-    _surface.blit(picSurface, [xs-ws/2.0, ys-hs/2.0, ws, hs])
-
-def clear(c=WHITE):
-    """
-    Clear the background canvas to color c, where c is an
-    object of class color.Color. c defaults to stddraw.WHITE.
-    """
-    _makeSureWindowCreated()
-    _surface.fill(_pygameColor(c))
+    #-------------------------------------------------------------------
+    # Begin added by Alan J. Broder
+    #-------------------------------------------------------------------
 
-def save(f):
-    """
-    Save the window canvas to file f.
-    """
-    _makeSureWindowCreated()
+    def _userX(self, x):
+        return self._xmin + x * (self._xmax - self._xmin) / self._canvasWidth
 
-    #if sys.hexversion >= 0x03000000:
-    #    # Hack because Pygame without full image support
-    #    # can handle only .bmp files.
-    #    bmpFileName = f + '.bmp'
-    #    pygame.image.save(_surface, bmpFileName)
-    #    os.system('convert ' + bmpFileName + ' ' + f)
-    #    os.system('rm ' + bmpFileName)
-    #else:
-    #    pygame.image.save(_surface, f)
+    def _userY(self, y):
+        return self._ymax - y * (self._ymax - self._ymin) / self._canvasHeight
 
-    pygame.image.save(_surface, f)
+    #-------------------------------------------------------------------
+    # End added by Alan J. Broder
+    #-------------------------------------------------------------------
 
-#-----------------------------------------------------------------------
+    #-------------------------------------------------------------------
 
-def _show():
-    """
-    Copy the background canvas to the window canvas.
-    """
-    _background.blit(_surface, (0, 0))
-    pygame.display.flip()
-    _checkForEvents()
+    def setCanvasSize(self, w=_DEFAULT_CANVAS_SIZE, h=_DEFAULT_CANVAS_SIZE):
+        """
+        Set the size of the canvas to w pixels wide and h pixels high.
+        Calling this method is optional. If you call it, you must do
+        so before calling any drawing method.  For a window canvas it
+        creates the window.
+        """
+        global _windowCanvas
+
+        if self._window and self._created:
+            raise Exception('The stddraw window already was created')
+
+        if (w < 1) or (h < 1):
+            raise Exception('width and height must be positive')
+
+        if self._window:
+            if _windowCanvas is not None:
+                raise Exception('Another canvas already has the stddraw window')
+            self._background = pygame.display.set_mode([w, h])
+            pygame.display.set_caption('stddraw window (r-click to save)')
+            _windowCanvas = self
+
+        self._canvasWidth = w
+        self._canvasHeight = h
+        self._surface = pygame.Surface((w, h))
+        self._surface.fill(_pygameColor(WHITE))
+        self._created = True
+        if self._window:
+            # Sprites loaded before the window existed can now be
+            # converted to the display pixel format.
+            _picture.convertSprites()
+
+    def setXscale(self, min=_DEFAULT_XMIN, max=_DEFAULT_XMAX):
+        """
+        Set the x-scale of the canvas such that the minimum x value
+        is min and the maximum x value is max.
+        """
+        min = float(min)
+        max = float(max)
+        if min >= max:
+            raise Exception('min must be less than max')
+        size = max - min
+        self._xmin = min - _BORDER * size
+        self._xmax = max + _BORDER * size
+
+    def setYscale(self, min=_DEFAULT_YMIN, max=_DEFAULT_YMAX):
+        """
+        Set the y-scale of the canvas such that the minimum y value
+        is min and the maximum y value is max.
+        """
+        min = float(min)
+        max = float(max)
+        if min >= max:
+            raise Exception('min must be less than max')
+        size = max - min
+        self._ymin = min - _BORDER * size
+        self._ymax = max + _BORDER * size
+
+    def setDirtyRectMode(self, enabled=True):
+        """
+        Turn dirty-rectangle mode on or off.  While it is on, show()
+        copies to the window only the regions passed to markDirty()
+        since the previous show (or the whole canvas after clear()),
+        and updates the display with pygame.display.update() instead
+        of flipping it.
+        """
+        self._dirtyRectMode = enabled
+        self._dirtyRects = None
+
+    def markDirty(self, x, y, w, h):
+        """
+        Mark the rectangle of width w and height h whose lower left
+        point is (x, y) as changed, so that the next show() copies it
+        to the window.  Has no effect unless dirty-rectangle mode is on.
+        """
+        if self._dirtyRects is None:
+            return
+        ws = self._factorX(w)
+        hs = self._factorY(h)
+        xs = self._scaleX(x)
+        ys = self._scaleY(y)
+        self._dirtyRects.append(pygame.Rect(xs, ys-hs, ws, hs))
+
+    def setPenRadius(self, r=_DEFAULT_PEN_RADIUS):
+        """
+        Set the pen radius to r, thus affecting the subsequent drawing
+        of points and lines. If r is 0.0, then points will be drawn with
+        the minimum possible radius and lines with the minimum possible
+        width.
+        """
+        r = float(r)
+        if r < 0.0:
+            raise Exception('Argument to setPenRadius() must be non-neg')
+        self._penRadius = r * float(_DEFAULT_CANVAS_SIZE)
+
+    def setPenColor(self, c=_DEFAULT_PEN_COLOR):
+        """
+        Set the pen color to c, where c is an object of class
+        color.Color. c defaults to stddraw.BLACK.
+        """
+        self._penColor = c
+
+    def setFontFamily(self, f=_DEFAULT_FONT_FAMILY):
+        """
+        Set the font family to f (e.g. 'Helvetica' or 'Courier').
+        """
+        self._fontFamily = f
+
+    def setFontSize(self, s=_DEFAULT_FONT_SIZE):
+        """
+        Set the font size to s (e.g. 12 or 16).
+        """
+        self._fontSize = s
+
+    def isWindow(self):
+        """
+        Return True if the canvas is shown in the window, and False
+        if it is offscreen.
+        """
+        return self._window
+
+    def getSurface(self):
+        """
+        Return the pygame Surface the canvas draws on, for example to
+        copy an offscreen drawing elsewhere.
+        """
+        self._makeSureCreated()
+        return self._surface
 
-def _showAndWaitForever():
-    """
-    Copy the background canvas to the window canvas. Then wait
-    forever, that is, until the user closes the stddraw window.
-    """
-    _makeSureWindowCreated()
-    _show()
-    QUANTUM = .1
-    while True:
-        time.sleep(QUANTUM)
-        _checkForEvents()
+    #-------------------------------------------------------------------
 
-def show(msec=float('inf')):
-    """
-    Copy the background canvas to the window canvas, and
-    then wait for msec milliseconds. msec defaults to infinity.
-    """
-    if msec == float('inf'):
-        _showAndWaitForever()
-
-    _makeSureWindowCreated()
-    _show()
-    _checkForEvents()
-
-    # Sleep for the required time, but check for events every
-    # QUANTUM seconds.
-    QUANTUM = .1
-    sec = msec / 1000.0
-    if sec < QUANTUM:
-        time.sleep(sec)
-        return
-    secondsWaited = 0.0
-    while secondsWaited < sec:
-        time.sleep(QUANTUM)
-        secondsWaited += QUANTUM
-        _checkForEvents()
+    def _makeSureCreated(self):
+        if not self._created:
+            self.setCanvasSize()
 
-#-----------------------------------------------------------------------
+    #-------------------------------------------------------------------
 
-def _saveToFile():
-    """
-    Display a dialog box that asks the user for a file name.  Save the
-    drawing to the specified file.  Display a confirmation dialog box
-    if successful, and an error dialog box otherwise.  The dialog boxes
-    are displayed using Tkinter, which (on some computers) is
-    incompatible with Pygame. So the dialog boxes must be displayed
-    from child processes.
-    """
-    import subprocess
-    _makeSureWindowCreated()
+    # Methods to draw shapes, text, and images on the background canvas.
+
+    def _pixel(self, x, y):
+        """
+        Draw on the background canvas a pixel at (x, y).
+        """
+        self._makeSureCreated()
+        xs = self._scaleX(x)
+        xy = self._scaleY(y)
+        pygame.gfxdraw.pixel(
+            self._surface,
+            int(round(xs)),
+            int(round(xy)),
+            _pygameColor(self._penColor))
+
+    def point(self, x, y):
+        """
+        Draw on the background canvas a point at (x, y).
+        """
+        self._makeSureCreated()
+        x = float(x)
+        y = float(y)
+        # If the radius is too small, then simply draw a pixel.
+        if self._penRadius <= 1.0:
+            self._pixel(x, y)
+        else:
+            xs = self._scaleX(x)
+            ys = self._scaleY(y)
+            pygame.draw.ellipse(
+                self._surface,
+                _pygameColor(self._penColor),
+                pygame.Rect(
+                    xs-self._penRadius,
+                    ys-self._penRadius,
+                    self._penRadius*2.0,
+                    self._penRadius*2.0),
+                0)
+
+    def _thickLine(self, x0, y0, x1, y1, r):
+        """
+        Draw on the background canvas a line from (x0, y0) to (x1, y1).
+        Draw the line with a pen whose radius is r.
+        """
+        xs0 = self._scaleX(x0)
+        ys0 = self._scaleY(y0)
+        xs1 = self._scaleX(x1)
+        ys1 = self._scaleY(y1)
+        if (abs(xs0-xs1) < 1.0) and (abs(ys0-ys1) < 1.0):
+            self.filledCircle(x0, y0, r)
+            return
+        xMid = (x0+x1)/2
+        yMid = (y0+y1)/2
+        self._thickLine(x0, y0, xMid, yMid, r)
+        self._thickLine(xMid, yMid, x1, y1, r)
+
+    def line(self, x0, y0, x1, y1):
+        """
+        Draw on the background canvas a line from (x0, y0) to (x1, y1).
+        """
+
+        THICK_LINE_CUTOFF = 3 # pixels
+
+        self._makeSureCreated()
+
+        x0 = float(x0)
+        y0 = float(y0)
+        x1 = float(x1)
+        y1 = float(y1)
+
+        lineWidth = self._penRadius * 2.0
+        if lineWidth == 0.0: lineWidth = 1.0
+        if lineWidth < THICK_LINE_CUTOFF:
+            x0s = self._scaleX(x0)
+            y0s = self._scaleY(y0)
+            x1s = self._scaleX(x1)
+            y1s = self._scaleY(y1)
+            pygame.draw.line(
+                self._surface,
+                _pygameColor(self._penColor),
+                (x0s, y0s),
+                (x1s, y1s),
+                int(round(lineWidth)))
+        else:
+            self._thickLine(x0, y0, x1, y1, self._penRadius/_DEFAULT_CANVAS_SIZE)
+
+    def circle(self, x, y, r):
+        """
+        Draw on the background canvas a circle of radius r centered on
+        (x, y).
+        """
+        self._makeSureCreated()
+        x = float(x)
+        y = float(y)
+        r = float(r)
+        ws = self._factorX(2.0*r)
+        hs = self._factorY(2.0*r)
+        # If the radius is too small, then simply draw a pixel.
+        if (ws <= 1.0) and (hs <= 1.0):
+            self._pixel(x, y)
+        else:
+            xs = self._scaleX(x)
+            ys = self._scaleY(y)
+            pygame.draw.ellipse(
+                self._surface,
+                _pygameColor(self._penColor),
+                pygame.Rect(xs-ws/2.0, ys-hs/2.0, ws, hs),
+                int(round(self._penRadius)))
+
+    def filledCircle(self, x, y, r):
+        """
+        Draw on the background canvas a filled circle of radius r
+        centered on (x, y).
+        """
+        self._makeSureCreated()
+        x = float(x)
+        y = float(y)
+        r = float(r)
+        ws = self._factorX(2.0*r)
+        hs = self._factorY(2.0*r)
+        # If the radius is too small, then simply draw a pixel.
+        if (ws <= 1.0) and (hs <= 1.0):
+            self._pixel(x, y)
+        else:
+            xs = self._scaleX(x)
+            ys = self._scaleY(y)
+            pygame.draw.ellipse(
+                self._surface,
+                _pygameColor(self._penColor),
+                pygame.Rect(xs-ws/2.0, ys-hs/2.0, ws, hs),
+                0)
+
+    def rectangle(self, x, y, w, h):
+        """
+        Draw on the background canvas a rectangle of width w and height h
+        whose lower left point is (x, y).
+        """
+        self._makeSureCreated()
+        x = float(x)
+        y = float(y)
+        w = float(w)
+        h = float(h)
+        ws = self._factorX(w)
+        hs = self._factorY(h)
+        # If the rectangle is too small, then simply draw a pixel.
+        if (ws <= 1.0) and (hs <= 1.0):
+            self._pixel(x, y)
+        else:
+            xs = self._scaleX(x)
+            ys = self._scaleY(y)
+            pygame.draw.rect(
+                self._surface,
+                _pygameColor(self._penColor),
+                pygame.Rect(xs, ys-hs, ws, hs),
+                int(round(self._penRadius)))
+
+    def filledRectangle(self, x, y, w, h):
+        """
+        Draw on the background canvas a filled rectangle of width w and
+        height h whose lower left point is (x, y).
+        """
+        self._makeSureCreated()
+        x = float(x)
+        y = float(y)
+        w = float(w)
+        h = float(h)
+        ws = self._factorX(w)
+        hs = self._factorY(h)
+        # If the rectangle is too small, then simply draw a pixel.
+        if (ws <= 1.0) and (hs <= 1.0):
+            self._pixel(x, y)
+        else:
+            xs = self._scaleX(x)
+            ys = self._scaleY(y)
+            pygame.draw.rect(
+                self._surface,
+                _pygameColor(self._penColor),
+                pygame.Rect(xs, ys-hs, ws, hs),
+                0)
+
+    def square(self, x, y, r):
+        """
+        Draw on the background canvas a square whose sides are of length
+        2r, centered on (x, y).
+        """
+        self._makeSureCreated()
+        self.rectangle(x-r, y-r, 2.0*r, 2.0*r)
+
+    def filledSquare(self, x, y, r):
+        """
+        Draw on the background canvas a filled square whose sides are of
+        length 2r, centered on (x, y).
+        """
+        self._makeSureCreated()
+        self.filledRectangle(x-r, y-r, 2.0*r, 2.0*r)
+
+    def polygon(self, x, y):
+        """
+        Draw on the background canvas a polygon with coordinates
+        (x[i], y[i]).
+        """
+        self._makeSureCreated()
+        # Scale X and Y values.
+        xScaled = []
+        for xi in x:
+            xScaled.append(self._scaleX(float(xi)))
+        yScaled = []
+        for yi in y:
+            yScaled.append(self._scaleY(float(yi)))
+        points = []
+        for i in range(len(x)):
+            points.append((xScaled[i], yScaled[i]))
+        points.append((xScaled[0], yScaled[0]))
+        pygame.draw.polygon(
+            self._surface,
+            _pygameColor(self._penColor),
+            points,
+            int(round(self._penRadius)))
+
+    def filledPolygon(self, x, y):
+        """
+        Draw on the background canvas a filled polygon with coordinates
+        (x[i], y[i]).
+        """
+        self._makeSureCreated()
+        # Scale X and Y values.
+        xScaled = []
+        for xi in x:
+            xScaled.append(self._scaleX(float(xi)))
+        yScaled = []
+        for yi in y:
+            yScaled.append(self._scaleY(float(yi)))
+        points = []
+        for i in range(len(x)):
+            points.append((xScaled[i], yScaled[i]))
+        points.append((xScaled[0], yScaled[0]))
+        pygame.draw.polygon(self._surface, _pygameColor(self._penColor), points, 0)
+
+    def text(self, x, y, s):
+        """
+        Draw string s on the background canvas centered at (x, y).
+        """
+        self._makeSureCreated()
+        x = float(x)
+        y = float(y)
+        xs = self._scaleX(x)
+        ys = self._scaleY(y)
+        font = pygame.font.SysFont(self._fontFamily, self._fontSize)
+        text = font.render(s, 1, _pygameColor(self._penColor))
+        textpos = text.get_rect(center=(xs, ys))
+        self._surface.blit(text, textpos)
+
+    def picture(self, pic, x=None, y=None):
+        """
+        Draw pic on the background canvas centered at (x, y).  pic is an
+        object of class picture.Picture. x and y default to the midpoint
+        of the background canvas.
+        """
+        self._makeSureCreated()
+        # By default, draw pic at the middle of the surface.
+        if x is None:
+            x = (self._xmax + self._xmin) / 2.0
+        if y is None:
+            y = (self._ymax + self._ymin) / 2.0
+        x = float(x)
+        y = float(y)
+        xs = self._scaleX(x)
+        ys = self._scaleY(y)
+        ws = pic.width()
+        hs = pic.height()
+        picSurface = pic._surface # violates encapsulation
+        self._surface.blit(picSurface, [xs-ws/2.0, ys-hs/2.0, ws, hs])
+
+    def pictureCells(self, items, cellWidth, cellHeight):
+        """
+        Draw many pictures on the background canvas in one call.  The
+        canvas is taken as a grid of cells cellWidth wide and cellHeight
+        high, cell (0, 0) having its lower left corner at (0, 0).  items
+        is a sequence of (pic, column, row) tuples, each drawing pic
+        centered on its cell as picture() would.  The pixel position of
+        each column and row and the size of each picture are worked out
+        once and kept, and the pictures are handed to pygame in a single
+        Surface.blits() call, so drawing thousands of sprites costs one
+        call instead of thousands.  Pictures are drawn in order, later
+        ones over earlier ones.
+        """
+        self._makeSureCreated()
+        key = (cellWidth, cellHeight, self._xmin, self._xmax, self._ymin,
+               self._ymax, self._canvasWidth, self._canvasHeight)
+        if self._cellKey != key:
+            self._cellKey = key
+            self._cellColumns = {}
+            self._cellRows = {}
+        columns = self._cellColumns
+        rows = self._cellRows
+        sizes = self._pictureSizes
+        blits = []
+        for pic, column, row in items:
+            size = sizes.get(pic)
+            if size is None or size[0] is not pic._surface:
+                picSurface = pic._surface # violates encapsulation
+                size = (picSurface, picSurface.get_width() / 2.0,
+                        picSurface.get_height() / 2.0)
+                sizes[pic] = size
+            xs = columns.get(column)
+            if xs is None:
+                xs = columns[column] = self._scaleX((column + 0.5) * cellWidth)
+            ys = rows.get(row)
+            if ys is None:
+                ys = rows[row] = self._scaleY((row + 0.5) * cellHeight)
+            blits.append((size[0], (xs - size[1], ys - size[2])))
+        self._surface.blits(blits, False)
+
+    def clear(self, c=WHITE):
+        """
+        Clear the background canvas to color c, where c is an
+        object of class color.Color. c defaults to stddraw.WHITE.
+        """
+        self._makeSureCreated()
+        self._surface.fill(_pygameColor(c))
+        self._dirtyRects = None
+
+    def save(self, f):
+        """
+        Save the window canvas to file f.
+        """
+        self._makeSureCreated()
+
+        #if sys.hexversion >= 0x03000000:
+        #    # Hack because Pygame without full image support
+        #    # can handle only .bmp files.
+        #    bmpFileName = f + '.bmp'
+        #    pygame.image.save(self._surface, bmpFileName)
+        #    os.system('convert ' + bmpFileName + ' ' + f)
+        #    os.system('rm ' + bmpFileName)
+        #else:
+        #    pygame.image.save(self._surface, f)
+
+        pygame.image.save(self._surface, f)
 
-    stddrawPath = os.path.realpath(__file__)
+    #-------------------------------------------------------------------
 
-    childProcess = subprocess.Popen(
-        [sys.executable, stddrawPath, 'getFileName'],
-        stdout=subprocess.PIPE)
-    so, se = childProcess.communicate()
-    fileName = so.strip()
+    def _show(self):
+        """
+        Copy the background canvas to the window canvas.  In
+        dirty-rectangle mode only the regions marked since the last show
+        are copied.  An offscreen canvas just starts a new set of
+        regions.
+        """
+        if self._window:
+            if self._dirtyRects is None:
+                self._background.blit(self._surface, (0, 0))
+                pygame.display.flip()
+            elif self._dirtyRects:
+                for rect in self._dirtyRects:
+                    self._background.blit(self._surface, rect, rect)
+                pygame.display.update(self._dirtyRects)
+        if self._dirtyRectMode:
+            self._dirtyRects = []
+        self._checkForEvents()
+
+    def _showAndWaitForever(self):
+        """
+        Copy the background canvas to the window canvas. Then wait
+        forever, that is, until the user closes the stddraw window.
+        """
+        self._makeSureCreated()
+        self._show()
+        QUANTUM = .1
+        while True:
+            time.sleep(QUANTUM)
+            self._checkForEvents()
+
+    def show(self, msec=float('inf')):
+        """
+        Copy the background canvas to the window canvas, and
+        then wait for msec milliseconds. msec defaults to infinity.
+        An offscreen canvas never waits.
+        """
+        if not self._window:
+            self._makeSureCreated()
+            self._show()
+            return
+
+        if msec == float('inf'):
+            self._showAndWaitForever()
+
+        self._makeSureCreated()
+        self._show()
+        self._checkForEvents()
+
+        # Sleep for the required time, but check for events every
+        # QUANTUM seconds.
+        QUANTUM = .1
+        sec = msec / 1000.0
+        if sec < QUANTUM:
+            time.sleep(sec)
+            return
+        secondsWaited = 0.0
+        while secondsWaited < sec:
+            time.sleep(QUANTUM)
+            secondsWaited += QUANTUM
+            self._checkForEvents()
 
-    if sys.hexversion >= 0x03000000:
-        fileName = fileName.decode('utf-8')
+    #-------------------------------------------------------------------
 
-    if fileName == '':
-        return
+    def _saveToFile(self):
+        """
+        Display a dialog box that asks the user for a file name.  Save
+        the drawing to the specified file.  Display a confirmation
+        dialog box if successful, and an error dialog box otherwise.
+        The dialog boxes are displayed using Tkinter, which (on some
+        computers) is incompatible with Pygame. So the dialog boxes must
+        be displayed from child processes.
+        """
+        import subprocess
+        self._makeSureCreated()
 
-    if not fileName.endswith(('.jpg', '.png')):
-        childProcess = subprocess.Popen(
-            [sys.executable, stddrawPath, 'reportFileSaveError',
-            'File name must end with ".jpg" or ".png".'])
-        return
+        stddrawPath = os.path.realpath(__file__)
 
-    try:
-        save(fileName)
         childProcess = subprocess.Popen(
-            [sys.executable, stddrawPath, 'confirmFileSave'])
-    except (pygame.error) as e:
-        childProcess = subprocess.Popen(
-            [sys.executable, stddrawPath, 'reportFileSaveError', str(e)])
-
-def _checkForEvents():
-    """
-    Check if any new event has occured (such as a key typed or button
-    pressed).  If a key has been typed, then put that key in a queue.
-    """
-    global _surface
-    global _keysTyped
-    
-    #-------------------------------------------------------------------
-    # Begin added by Alan J. Broder
-    #-------------------------------------------------------------------
-    global _mousePos
-    global _mousePressed
-    #-------------------------------------------------------------------
-    # End added by Alan J. Broder
-    #-------------------------------------------------------------------
-    
-    _makeSureWindowCreated()
-
-    for event in pygame.event.get():
+            [sys.executable, stddrawPath, 'getFileName'],
+            stdout=subprocess.PIPE)
+        so, se = childProcess.communicate()
+        fileName = so.strip()
+
+        if sys.hexversion >= 0x03000000:
+            fileName = fileName.decode('utf-8')
+
+        if fileName == '':
+            return
+
+        if not fileName.endswith(('.jpg', '.png')):
+            childProcess = subprocess.Popen(
+                [sys.executable, stddrawPath, 'reportFileSaveError',
+                'File name must end with ".jpg" or ".png".'])
+            return
+
+        try:
+            self.save(fileName)
+            childProcess = subprocess.Popen(
+                [sys.executable, stddrawPath, 'confirmFileSave'])
+        except (pygame.error) as e:
+            childProcess = subprocess.Popen(
+                [sys.executable, stddrawPath, 'reportFileSaveError', str(e)])
+
+    def _checkForEvents(self):
+        """
+        Check if any new event has occured (such as a key typed or
+        button pressed).  If a key has been typed, then put that key in
+        a queue.  Only the window canvas receives events.
+        """
+        if not self._window:
+            return
+        self._makeSureCreated()
+
+        for event in pygame.event.get():
+            self._handleEvent(event)
+
+    def waitForEvent(self, timeout=None):
+        """
+        Wait until an event arrives (a key typed, a button pressed or a
+        call to postWake()) or timeout seconds pass, then handle every
+        waiting event as _checkForEvents() does.  With no timeout, wait
+        as long as it takes.  Unlike show(), this returns as soon as an
+        event arrives instead of sleeping in fixed steps.  An offscreen
+        canvas gets no events, so it just waits out the timeout.
+        """
+        if not self._window:
+            if timeout is None:
+                raise Exception('An offscreen canvas would wait forever')
+            time.sleep(timeout)
+            return
+        self._makeSureCreated()
+        if timeout is None:
+            event = pygame.event.wait()
+        else:
+            event = pygame.event.wait(max(1, int(timeout * 1000)))
+        self._handleEvent(event)
+        self._checkForEvents()
+
+    def postWake(self):
+        """
+        End the current or next waitForEvent() early.  May be called
+        from any thread.
+        """
+        if self._window and self._created:
+            try:
+                pygame.event.post(pygame.event.Event(_WAKE_EVENT))
+            except pygame.error:
+                # The event queue is full, so the wait is ending anyway
+                pass
+
+    def _handleEvent(self, event):
+        """
+        Act on one event taken from the pygame event queue.
+        """
         if event.type == pygame.QUIT:
             sys.exit()
         elif event.type == pygame.KEYDOWN:
-            _keysTyped = [event.unicode] + _keysTyped
+            self._keysTyped = [event.unicode] + self._keysTyped
+            self._keyTimes = [time.monotonic()] + self._keyTimes
         elif (event.type == pygame.MOUSEBUTTONUP) and \
             (event.button == 3):
-            _saveToFile()
-            
+            self._saveToFile()
+
         #---------------------------------------------------------------
         # Begin added by Alan J. Broder
         #---------------------------------------------------------------
         # Every time the mouse button is pressed, remember
         # the mouse position as of that press.
         elif (event.type == pygame.MOUSEBUTTONDOWN) and \
-            (event.button == 1): 
-            _mousePressed = True
-            _mousePos = event.pos                      
+            (event.button == 1):
+            self._mousePressed = True
+            self._mousePos = event.pos
         #---------------------------------------------------------------
         # End added by Alan J. Broder
         #---------------------------------------------------------------
 
-#-----------------------------------------------------------------------
-
-# Functions for retrieving keys
+    #-------------------------------------------------------------------
 
-def hasNextKeyTyped():
-    """
-    Return True if the queue of keys the user typed is not empty.
-    Otherwise return False.
-    """
-    global _keysTyped
-    return _keysTyped != []
+    # Methods for retrieving keys
+
+    def hasNextKeyTyped(self):
+        """
+        Return True if the queue of keys the user typed is not empty.
+        Otherwise return False.
+        """
+        return self._keysTyped != []
+
+    def nextKeyTyped(self):
+        """
+        Remove the first key from the queue of keys that the the user
+        typed, and return that key.
+        """
+        self._lastKeyTime = self._keyTimes.pop()
+        return self._keysTyped.pop()
+
+    def lastKeyTime(self):
+        """
+        Return the time.monotonic() time at which the key most recently
+        returned by nextKeyTyped() arrived, or None if no key has been
+        returned yet.
+        """
+        return self._lastKeyTime
 
-def nextKeyTyped():
-    """
-    Remove the first key from the queue of keys that the the user typed,
-    and return that key.
-    """
-    global _keysTyped
-    return _keysTyped.pop()
-
-#-----------------------------------------------------------------------
-# Begin added by Alan J. Broder
-#-----------------------------------------------------------------------
+    #-------------------------------------------------------------------
+    # Begin added by Alan J. Broder
+    #-------------------------------------------------------------------
 
-# Functions for dealing with mouse clicks 
+    # Methods for dealing with mouse clicks
+
+    def mousePressed(self):
+        """
+        Return True if the mouse has been left-clicked since the
+        last time mousePressed was called, and False otherwise.
+        """
+        if self._mousePressed:
+            self._mousePressed = False
+            return True
+        return False
+
+    def mouseX(self):
+        """
+        Return the x coordinate in user space of the location at
+        which the mouse was most recently left-clicked. If a left-click
+        hasn't happened yet, raise an exception, since mouseX() shouldn't
+        be called until mousePressed() returns True.
+        """
+        if self._mousePos:
+            return self._userX(self._mousePos[0])
+        raise Exception(
+            "Can't determine mouse position if a click hasn't happened")
+
+    def mouseY(self):
+        """
+        Return the y coordinate in user space of the location at
+        which the mouse was most recently left-clicked. If a left-click
+        hasn't happened yet, raise an exception, since mouseY() shouldn't
+        be called until mousePressed() returns True.
+        """
+        if self._mousePos:
+            return self._userY(self._mousePos[1])
+        raise Exception(
+            "Can't determine mouse position if a click hasn't happened")
 
-def mousePressed():
-    """
-    Return True if the mouse has been left-clicked since the 
-    last time mousePressed was called, and False otherwise.
-    """
-    global _mousePressed
-    if _mousePressed:
-        _mousePressed = False
-        return True
-    return False
-    
-def mouseX():
-    """
-    Return the x coordinate in user space of the location at
-    which the mouse was most recently left-clicked. If a left-click
-    hasn't happened yet, raise an exception, since mouseX() shouldn't
-    be called until mousePressed() returns True.
-    """
-    global _mousePos
-    if _mousePos:
-        return _userX(_mousePos[0])      
-    raise Exception(
-        "Can't determine mouse position if a click hasn't happened")
-    
-def mouseY():
-    """
-    Return the y coordinate in user space of the location at
-    which the mouse was most recently left-clicked. If a left-click
-    hasn't happened yet, raise an exception, since mouseY() shouldn't
-    be called until mousePressed() returns True.
-    """
-    global _mousePos
-    if _mousePos:
-        return _userY(_mousePos[1]) 
-    raise Exception(
-        "Can't determine mouse position if a click hasn't happened")
-    
-#-----------------------------------------------------------------------
-# End added by Alan J. Broder
-#-----------------------------------------------------------------------
+    #-------------------------------------------------------------------
+    # End added by Alan J. Broder
+    #-------------------------------------------------------------------
 
 #-----------------------------------------------------------------------
 
-# Initialize the x scale, the y scale, and the pen radius.
+# The default canvas, shown in the window.  The module functions are
+# its methods, so code written for a single window keeps calling
+# stddraw.point(), stddraw.show() and so on.
 
-setXscale()
-setYscale()
-setPenRadius()
 pygame.font.init()
 
+_default = Canvas(window=True)
+
+def getDefaultCanvas():
+    """
+    Return the canvas the module functions draw on.
+    """
+    return _default
+
+setCanvasSize = _default.setCanvasSize
+setXscale = _default.setXscale
+setYscale = _default.setYscale
+setDirtyRectMode = _default.setDirtyRectMode
+markDirty = _default.markDirty
+setPenRadius = _default.setPenRadius
+setPenColor = _default.setPenColor
+setFontFamily = _default.setFontFamily
+setFontSize = _default.setFontSize
+point = _default.point
+line = _default.line
+circle = _default.circle
+filledCircle = _default.filledCircle
+rectangle = _default.rectangle
+filledRectangle = _default.filledRectangle
+square = _default.square
+filledSquare = _default.filledSquare
+polygon = _default.polygon
+filledPolygon = _default.filledPolygon
+text = _default.text
+picture = _default.picture
+pictureCells = _default.pictureCells
+clear = _default.clear
+save = _default.save
+show = _default.show
+waitForEvent = _default.waitForEvent
+postWake = _default.postWake
+hasNextKeyTyped = _default.hasNextKeyTyped
+nextKeyTyped = _default.nextKeyTyped
+lastKeyTime = _default.lastKeyTime
+mousePressed = _default.mousePressed
+mouseX = _default.mouseX
+mouseY = _default.mouseY
+
 #-----------------------------------------------------------------------
 
 # Functions for displaying Tkinter dialog boxes in child processes.
@@ -0,0 +1,226 @@
+#
+# Author: Lorn Jaeger
+#
+# Description: Chunked terrain cache for the Ultima 0.1 game. Maps too big
+#              to pre-render into one offscreen surface are drawn from
+#              square chunks of tiles, each rendered with its lighting into
+#              a surface of its own the first time it comes into view. A
+#              chunk is rendered again only when the lit flag or the type
+#              of a tile inside it changes, and the least recently used
+#              chunks outside the view are dropped once the cached chunks
+#              would pass a memory cap.
+#
+
+from collections import OrderedDict
+from TerrainRenderer import TerrainRenderer
+
+class TerrainCache(TerrainRenderer):
+
+    # Default width and height in tiles of a chunk, and most bytes of
+    #    chunk surfaces to keep
+    CHUNK = 16
+    MAX_BYTES = 16 * 1024 * 1024
+
+    # Constructor for the cache
+    #
+    # Input parameters are the TileGrid (or ChunkedGrid) to draw, the list
+    #    of sprites (pictures) indexed by tile type code, None for types
+    #    that have none, the size in pixels of a tile, the width and
+    #    height in tiles of a chunk and the most bytes of chunk surfaces
+    #    to keep. The cache keeps more only while the view itself needs
+    #    more chunks than that.
+    def __init__(self, tiles, sprites, size, chunk=CHUNK, maxBytes=MAX_BYTES):
+        self.tiles = tiles
+        self.sprites = sprites
+        self.size = size
+        self.chunk = chunk
+        self.width = tiles.width
+        self.height = tiles.height
+        self.chunkBytes = (chunk * size) ** 2 * 4
+        self.capacity = max(1, maxBytes // self.chunkBytes)
+        # (chunk x, chunk y) -> [surface, lit flags it was rendered with],
+        #    least recently drawn first. The flags are None once a tile
+        #    type in the chunk has changed.
+        self.chunks = OrderedDict()
+        self.hits = 0           # chunks drawn from the cache
+        self.renders = 0        # chunks rendered, the first time or again
+        self.evictions = 0      # chunks dropped under the memory cap
+
+    # Returns the left and bottom cell and the width and height in cells
+    #    of the chunk at (chunkX, chunkY), which are smaller than a whole
+    #    chunk along the right and top edges of the map
+    def bounds(self, chunkX, chunkY):
+        left = chunkX * self.chunk
+        bottom = chunkY * self.chunk
+        return left, bottom, min(self.chunk, self.width - left), min(self.chunk, self.height - bottom)
+
+    # Returns the lit flags of the cells of the chunk at (chunkX, chunkY)
+    def litFlags(self, chunkX, chunkY):
+        left, bottom, width, height = self.bounds(chunkX, chunkY)
+        lit = self.tiles.lit
+        mapHeight = self.height
+        return bytes(lit[x * mapHeight + y] for x in range(left, left + width)
+                                            for y in range(bottom, bottom + height))
+
+    # Returns the surface of the chunk at (chunkX, chunkY), rendering it if
+    #    it is not cached or a tile in it has changed since it was rendered
+    def chunkSurface(self, chunkX, chunkY):
+        key = (chunkX, chunkY)
+        flags = self.litFlags(chunkX, chunkY)
+        entry = self.chunks.get(key)
+        if entry is not None:
+            self.chunks.move_to_end(key)
+            if entry[1] == flags:
+                self.hits += 1
+                return entry[0]
+            surface = entry[0]
+        else:
+            left, bottom, width, height = self.bounds(chunkX, chunkY)
+            surface = self.newSurface(width * self.size, height * self.size)
+            entry = self.chunks[key] = [surface, None]
+        self.render(chunkX, chunkY, surface, flags)
+        entry[1] = flags
+        self.renders += 1
+        return surface
+
+    # Draw the lit tiles of the chunk at (chunkX, chunkY) onto its surface,
+    #    given the chunk's lit flags, leaving the unlit tiles dark
+    def render(self, chunkX, chunkY, surface, flags):
+        left, bottom, width, height = self.bounds(chunkX, chunkY)
+        types = self.tiles.types
+        sprites = self.sprites
+        size = self.size
+        mapHeight = self.height
+        surface.fill(TerrainCache.DARK)
+        blits = []
+        flag = 0
+        for x in range(left, left + width):
+            for y in range(bottom, bottom + height):
+                if flags[flag]:
+                    sprite = sprites[types[x * mapHeight + y]]
+                    if sprite is not None:
+                        # violates encapsulation, as StdDraw.picture() does
+                        blits.append((sprite._surface, ((x - left) * size, (bottom + height - 1 - y) * size)))
+                flag += 1
+        surface.blits(blits, False)
+
+    # Mark the chunks holding the given (x, y) cells, whose tile types have
+    #    changed, to be rendered again the next time they are drawn
+    def invalidate(self, cells):
+        chunk = self.chunk
+        for x, y in cells:
+            entry = self.chunks.get((x // chunk, y // chunk))
+            if entry is not None:
+                entry[1] = None
+
+    # Returns the (chunk x, chunk y) of every chunk overlapping a view,
+    #    given as its left and bottom cell and its width and height
+    def viewChunks(self, view):
+        left, bottom, width, height = view
+        chunk = self.chunk
+        return [(chunkX, chunkY) for chunkX in range(left // chunk, (left + width - 1) // chunk + 1)
+                                 for chunkY in range(bottom // chunk, (bottom + height - 1) // chunk + 1)]
+
+    # Draw the lit terrain of a whole view onto a surface, whose top left
+    #    pixel shows the top left cell of the view
+    def drawView(self, surface, view):
+        left, bottom, width, height = view
+        size = self.size
+        blits = []
+        for chunkX, chunkY in self.viewChunks(view):
+            chunkLeft, chunkBottom, chunkWidth, chunkHeight = self.bounds(chunkX, chunkY)
+            blits.append((self.chunkSurface(chunkX, chunkY),
+                          ((chunkLeft - left) * size, (bottom + height - chunkBottom - chunkHeight) * size)))
+        surface.blits(blits, False)
+        self.evict(view)
+
+    # Draw the lit terrain of the given (x, y) cells, all inside the view,
+    #    onto a surface showing the view, copying each from its chunk
+    def drawCells(self, surface, view, cells):
+        left, bottom, width, height = view
+        size = self.size
+        chunk = self.chunk
+        byChunk = {}
+        for x, y in cells:
+            byChunk.setdefault((x // chunk, y // chunk), []).append((x, y))
+        blits = []
+        for (chunkX, chunkY), chunkCells in byChunk.items():
+            chunkSurface = self.chunkSurface(chunkX, chunkY)
+            chunkLeft, chunkBottom, chunkWidth, chunkHeight = self.bounds(chunkX, chunkY)
+            top = chunkBottom + chunkHeight - 1
+            for x, y in chunkCells:
+                blits.append((chunkSurface, ((x - left) * size, (bottom + height - 1 - y) * size),
+                              ((x - chunkLeft) * size, (top - y) * size, size, size)))
+        surface.blits(blits, False)
+        self.evict(view)
+
+    # Drop the least recently drawn chunks outside the view until the
+    #    cache is back under its cap
+    def evict(self, view):
+        excess = len(self.chunks) - self.capacity
+        if excess <= 0:
+            return
+        visible = set(self.viewChunks(view))
+        for key in [key for key in self.chunks if key not in visible][:excess]:
+            del self.chunks[key]
+            self.evictions += 1
+
+    # Accessor method
+    #
+    # Returns the number of bytes held by the cached chunks
+    def getBytes(self):
+        return sum(entry[0].get_width() * entry[0].get_height() * entry[0].get_bytesize()
+                   for entry in self.chunks.values())
+
+    # Accessor method
+    #
+    # Returns the chunks drawn from the cache, rendered, dropped and held
+    def getStats(self):
+        return self.hits, self.renders, self.evictions, len(self.chunks)
+
+# Main code to test the terrain cache class
+if __name__ == "__main__":
+    import os
+    import sys
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    from World import World
+
+    # Walk the avatar about the map, turning when it is blocked, and count
+    #    the chunks drawn from the cache and rendered again along the way
+    if len(sys.argv) < 2:
+        print("Must specify a level file!")
+        sys.exit(1)
+    import random
+    import StdDraw
+    world = World(sys.argv[1], canvas=StdDraw.Canvas(1, 1), chunked=sys.argv[1].endswith(".ulm"),
+                  aggroRadius=0, activityRadius=0)
+    world.scheduler.stop()
+    cache = world.terrainCache
+    if cache is None:
+        print("%s fits in one terrain surface" % sys.argv[1])
+        sys.exit(0)
+    print("after the first frame: %d hits, %d renders, %d evictions, %d chunks held" % cache.getStats())
+    random.seed(1)
+    heading = "d"
+    moves = 0
+    scrolls = 0
+    stepRenders = []
+    for step in range(400):
+        position = (world.avatar.getX(), world.avatar.getY())
+        view = world.view
+        renders = cache.renders
+        world.handleKey(heading)
+        world.draw()
+        if (world.avatar.getX(), world.avatar.getY()) == position:
+            heading = random.choice("wasd")
+        else:
+            moves += 1
+        if world.view != view:
+            scrolls += 1
+        else:
+            stepRenders.append(cache.renders - renders)
+    hits, renders, evictions, held = cache.getStats()
+    print("after %d moves and %d view moves: %d hits, %d renders, %d evictions, %d chunks held, %d KB" %
+          (moves, scrolls, hits, renders, evictions, held, cache.getBytes() // 1024))
+    print("chunks rendered by a step that keeps the view: %.2f on average, %d at most" %
+          (sum(stepRenders) / len(stepRenders), max(stepRenders)))
@@ -0,0 +1,135 @@
+#
+# Author: Lorn Jaeger
+#
+# Description: Pre-rendered terrain for the Ultima 0.1 game. Every tile of
+#              the map is drawn once, lit, into an offscreen surface when
+#              the world is loaded. A frame is then made by filling the
+#              canvas dark and copying the terrain of the lit cells, found
+#              from the lit flags in one NumPy operation, and the monsters
+#              and avatar are drawn on top, instead of choosing and drawing
+#              a sprite for every cell.
+#
+
+import numpy
+import pygame
+from TerrainRenderer import TerrainRenderer
+
+class TerrainLayer(TerrainRenderer):
+
+    # Constructor for the layer
+    #
+    # Input parameters are the TileGrid to draw, the list of sprites
+    #    (pictures) indexed by tile type code, None for types that have
+    #    none, and the size in pixels of a tile. Cell (x, y) is drawn
+    #    with its lower left corner at pixel (x * size, (y + 1) * size)
+    #    up from the bottom, as the world's StdDraw scales place it.
+    def __init__(self, tiles, sprites, size):
+        self.tiles = tiles
+        self.sprites = sprites
+        self.size = size
+        self.width = tiles.width
+        self.height = tiles.height
+        self.terrain = self.newSurface(self.width * size, self.height * size)
+        self.terrain.fill(TerrainLayer.DARK)
+        self.drawTiles((x, y) for x in range(self.width) for y in range(self.height))
+        # One dark cell, to cover the unlit cells of a partial frame
+        self.dark = self.newSurface(size, size)
+        self.dark.fill(TerrainLayer.DARK)
+
+    # Pixel rectangle of the cell at (x, y)
+    def rect(self, x, y):
+        size = self.size
+        return pygame.Rect(x * size, (self.height - 1 - y) * size, size, size)
+
+    # Draw the lit tiles of the given (x, y) cells into the terrain
+    def drawTiles(self, cells):
+        types = self.tiles.types
+        height = self.height
+        size = self.size
+        top = (height - 1) * size
+        blits = []
+        for x, y in cells:
+            sprite = self.sprites[types[x * height + y]]
+            if sprite is not None:
+                # violates encapsulation, as StdDraw.picture() does
+                blits.append((sprite._surface, (x * size, top - y * size)))
+            else:
+                self.terrain.fill(TerrainLayer.DARK, self.rect(x, y))
+        self.terrain.blits(blits, False)
+
+    # Pixel rectangles of the cells whose lit flag is lit, found from the
+    #    lit flags with NumPy so no Python code runs for the other cells
+    def rects(self, lit):
+        flags = numpy.frombuffer(self.tiles.lit, dtype=numpy.uint8)
+        cells = numpy.flatnonzero(flags if lit else flags == 0)
+        size = self.size
+        lefts = (cells // self.height) * size
+        tops = (self.height - 1 - cells % self.height) * size
+        return [(left, top, size, size) for left, top in zip(lefts.tolist(), tops.tolist())]
+
+    # Draw the whole lit terrain onto a surface
+    #
+    # The darkness mask is the lit flags themselves. With most cells
+    #    dark the surface is filled dark and the terrain of the lit cells
+    #    copied over it; with most cells lit the whole terrain is copied
+    #    and the unlit cells covered with the dark cell. Either way the
+    #    cells are drawn in one blits() call.
+    def drawAll(self, surface):
+        litCount = numpy.count_nonzero(numpy.frombuffer(self.tiles.lit, dtype=numpy.uint8))
+        if 2 * litCount < self.width * self.height:
+            surface.fill(TerrainLayer.DARK, (0, 0) + self.terrain.get_size())
+            terrain = self.terrain
+            surface.blits([(terrain, rect, rect) for rect in self.rects(True)], False)
+        else:
+            surface.blit(self.terrain, (0, 0))
+            dark = self.dark
+            surface.blits([(dark, rect) for rect in self.rects(False)], False)
+
+    # Draw the lit terrain of the given (x, y) cells onto a surface
+    #
+    # Unlit cells are covered with the dark cell, all in one blits() call
+    def drawCells(self, surface, cells):
+        lit = self.tiles.lit
+        height = self.height
+        size = self.size
+        top = (height - 1) * size
+        terrain = self.terrain
+        dark = self.dark
+        blits = []
+        for x, y in cells:
+            rect = (x * size, top - y * size, size, size)
+            if lit[x * height + y]:
+                blits.append((terrain, rect, rect))
+            else:
+                blits.append((dark, rect))
+        surface.blits(blits, False)
+
+    # Accessor method
+    #
+    # Returns the number of bytes held by the terrain
+    def getBytes(self):
+        width, height = self.terrain.get_size()
+        return width * height * self.terrain.get_bytesize()
+
+# Main code to test the terrain layer class
+if __name__ == "__main__":
+    import os
+    import sys
+    import time
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    from World import World
+
+    if len(sys.argv) < 2:
+        print("Must specify a level file!")
+        sys.exit(1)
+    import StdDraw
+    world = World(sys.argv[1], canvas=StdDraw.Canvas(1, 1))
+    world.scheduler.stop()
+    layer = world.terrainLayer
+    surface = pygame.Surface(layer.terrain.get_size())
+    start = time.perf_counter()
+    for frame in range(20):
+        layer.drawAll(surface)
+    elapsed = time.perf_counter() - start
+    print("%d x %d tiles, %d lit: %.2f ms a whole frame, terrain %d KB" %
+          (layer.width, layer.height, len(layer.rects(True)), 1000 * elapsed / 20, layer.getBytes() // 1024))
@@ -0,0 +1,32 @@
+#
+# Author: Lorn Jaeger
+#
+# Description: Base class of the pre-rendered terrain of the Ultima 0.1
+#              game, holding what the TerrainLayer, drawn as one surface,
+#              and the TerrainCache, drawn a chunk at a time, share.
+#
+
+import pygame
+
+class TerrainRenderer:
+
+    # Colour of the unlit cells, the colour of the blank tile sprite
+    DARK = (0, 0, 0)
+
+    # A surface of the given size in the display's pixel format
+    @staticmethod
+    def newSurface(width, height):
+        surface = pygame.Surface((width, height))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        return surface
+
+# Main code to test the terrain renderer class
+if __name__ == "__main__":
+    import os
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    surface = TerrainRenderer.newSurface(32, 16)
+    print(surface.get_size(), surface.get_bitsize())
+    pygame.display.set_mode((8, 8))
+    surface = TerrainRenderer.newSurface(32, 16)
+    print(surface.get_size(), surface.get_bitsize(), surface.get_at((0, 0))[:3] != TerrainRenderer.DARK)
@@ -25,6 +25,29 @@ class Tile:
     # Static variable associated with tiles to specity the size
     SIZE = 16
 
+    # Image drawn for each type of lit tile, and for any unlit tile
+    SPRITES = {
+        TileType.FLOOR:    "rec/brickfloor.gif",
+        TileType.LAVA:     "rec/lava.gif",
+        TileType.WATER:    "rec/water.gif",
+        TileType.GRASS:    "rec/grasslands.gif",
+        TileType.FOREST:   "rec/forest.gif",
+        TileType.MOUNTAIN: "rec/mountains.gif",
+        TileType.WALL:     "rec/stonewall.gif",
+    }
+    BLANK_SPRITE = "rec/blank.gif"
+
+    # Map file code for each type of tile
+    CODES = {
+        "B": TileType.FLOOR,
+        "L": TileType.LAVA,
+        "W": TileType.WATER,
+        "F": TileType.FOREST,
+        "G": TileType.GRASS,
+        "M": TileType.MOUNTAIN,
+        "S": TileType.WALL,
+    }
+
     # Constructor for a tile
     #
     # Paramter is a string or character that specifies the
@@ -33,23 +56,14 @@ class Tile:
         self.lit = False              # Is the tile lit?
         self.occupied = None          # What is the object standing on the tile
     
-        if code == "B":
-            self.type = TileType.FLOOR
-        elif code == "L":
-            self.type = TileType.LAVA
-        elif code == "W":
-            self.type = TileType.WATER
-        elif code =="F":
-            self.type = TileType.FOREST
-        elif code == "G":
-            self.type = TileType.GRASS
-        elif code == "M":
-            self.type = TileType.MOUNTAIN
-        elif code == "S":
-            self.type = TileType.WALL
-        else:
-            self.type = TileType.INVALID
+        self.type = self.CODES.get(code, TileType.INVALID)
             
+    # Mutator for the type of the tile
+    #
+    # Input parameter is the new TileType
+    def setType(self, tileType):
+        self.type = tileType
+
     # Method to set the occupant of a tile       
     #       
     # None indicates an empty tile
@@ -106,28 +120,18 @@ class Tile:
     # Draw the tile at the given location
     #
     # Input parameters x and y are integers specifying
-    #    the tile's position within the world grid
-    def draw(self, x, y):
+    #    the tile's position within the world grid, and optionally the
+    #    StdDraw canvas to draw on, the window by default
+    def draw(self, x, y, canvas=StdDraw.getDefaultCanvas()):
         drawX = (x + 0.5) * self.SIZE
         drawY = (y + 0.5) * self.SIZE
 
         if self.lit:
-            if self.type == TileType.FLOOR:
-                StdDraw.picture(picture.Picture("rec/brickfloor.gif"), drawX, drawY)
-            elif self.type == TileType.LAVA:
-                StdDraw.picture(picture.Picture("rec/lava.gif"), drawX, drawY)
-            elif self.type == TileType.WATER:
-                StdDraw.picture(picture.Picture("rec/water.gif"), drawX, drawY)
-            elif self.type == TileType.GRASS:
-                StdDraw.picture(picture.Picture("rec/grasslands.gif"), drawX, drawY)
-            elif self.type == TileType.FOREST:
-                StdDraw.picture(picture.Picture("rec/forest.gif"), drawX, drawY)
-            elif self.type == TileType.MOUNTAIN:
-                StdDraw.picture(picture.Picture("rec/mountains.gif"), drawX, drawY)
-            elif self.type == TileType.WALL:
-                StdDraw.picture(picture.Picture("rec/stonewall.gif"), drawX, drawY)
+            fileName = self.SPRITES.get(self.type)
+            if fileName is not None:
+                canvas.picture(picture.sprite(fileName), drawX, drawY)
         else:
-            StdDraw.picture(picture.Picture("rec/blank.gif"), drawX, drawY)
+            canvas.picture(picture.sprite(self.BLANK_SPRITE), drawX, drawY)
 
 #
 # Main code for testing the Tile class
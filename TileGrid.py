@@ -0,0 +1,220 @@
+#
+# Author: Lorn Jaeger
+#
+# Description: Compact grid of tiles for the Ultima 0.1 game. Each cell is
+#              stored as a one byte tile type code, a one byte lit flag and
+#              a four byte occupant id, and per-type lookup tables answer
+#              the questions the Tile class answers.
+#
+
+from array import array
+import StdDraw
+from Tile import Tile, TileType
+
+# Tile that only answers questions about its type, used to fill the lookup
+#    tables from the Tile methods so both agree
+def _probe(tileType):
+    tile = Tile(None)
+    tile.setType(tileType)
+    return tile
+
+class TileGrid:
+
+    # Lookup tables indexed by the type code stored for a cell
+    TYPES = [None] * (max(t.value for t in TileType) + 1)
+    OPAQUE = bytearray(len(TYPES))
+    PASSABLE = bytearray(len(TYPES))
+    DAMAGE = [0] * len(TYPES)
+    for _type in TileType:
+        TYPES[_type.value] = _type
+        OPAQUE[_type.value] = _probe(_type).isOpaque()
+        PASSABLE[_type.value] = _probe(_type).isPassable()
+        DAMAGE[_type.value] = _probe(_type).getDamage()
+    del _type
+
+    # Type code for each map file code
+    CODE_VALUES = {code: tileType.value for code, tileType in Tile.CODES.items()}
+    INVALID = TileType.INVALID.value
+
+    # Constructor for the grid
+    #
+    # Input parameters are the width and height of the grid. Every cell
+    #    starts out as an unlit, unoccupied INVALID tile.
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        size = width * height
+        self.types = bytearray([self.INVALID]) * size
+        self.lit = bytearray(size)
+        self.occupancy = array('i', [0]) * size    # occupant id, 0 if empty
+        self.occupants = {}                        # occupant id -> object
+
+    # Index of the cell at (x, y) in the flat arrays
+    def index(self, x, y):
+        return x * self.height + y
+
+    # Set the type of the cell at (x, y) from a map file code
+    def setCode(self, x, y, code):
+        self.types[x * self.height + y] = self.CODE_VALUES.get(code, self.INVALID)
+
+    # Accessor method
+    #
+    # Returns the TileType of the cell at (x, y)
+    def getType(self, x, y):
+        return self.TYPES[self.types[x * self.height + y]]
+
+    # Mutator for the type of the cell at (x, y)
+    #
+    # Input parameter tileType is the new TileType
+    def setType(self, x, y, tileType):
+        self.types[x * self.height + y] = tileType.value
+
+    # Returns True if the cell at (x, y) is lit, False otherwise
+    def getLit(self, x, y):
+        return self.lit[x * self.height + y] != 0
+
+    # Mutator for the lit flag of the cell at (x, y)
+    def setLit(self, x, y, value):
+        self.lit[x * self.height + y] = 1 if value else 0
+
+    # Set the lit flag of every cell to the given value
+    def setAllLit(self, value):
+        self.lit[:] = bytes([1 if value else 0]) * len(self.lit)
+
+    # Returns the lit flags of a box of cells, given as its left and
+    #    bottom cell and its width and height, as bytes in the order of
+    #    the flat arrays
+    def getLitBox(self, left, bottom, width, height):
+        return self.copyBox(self.lit, left, bottom, width, height)
+
+    # Returns the tile type codes of a box of cells, given as its left and
+    #    bottom cell and its width and height, as bytes in the order of
+    #    the flat arrays
+    def getTypeBox(self, left, bottom, width, height):
+        return self.copyBox(self.types, left, bottom, width, height)
+
+    # Copy the column spans of a box out of one of the flat arrays
+    def copyBox(self, values, left, bottom, width, height):
+        start = left * self.height + bottom
+        return b"".join(values[column:column + height]
+                        for column in range(start, start + width * self.height, self.height))
+
+    # Returns True if the cell at (x, y) blocks light, False otherwise
+    def isOpaque(self, x, y):
+        return self.OPAQUE[self.types[x * self.height + y]] != 0
+
+    # Returns True if the cell at (x, y) can be walked through
+    def isPassable(self, x, y):
+        return self.PASSABLE[self.types[x * self.height + y]] != 0
+
+    # Returns the damage done by standing on the cell at (x, y)
+    def getDamage(self, x, y):
+        return self.DAMAGE[self.types[x * self.height + y]]
+
+    # Returns the object standing on the cell at (x, y), or None
+    def getOccupant(self, x, y):
+        ident = self.occupancy[x * self.height + y]
+        if ident == 0:
+            return None
+        return self.occupants[ident]
+
+    # Set the object standing on the cell at (x, y)
+    #
+    # Input parameter obj has an ident attribute that is a positive
+    #    integer unique to it, or is None to empty the cell
+    def setOccupant(self, x, y, obj):
+        if obj is None:
+            self.occupancy[x * self.height + y] = 0
+        else:
+            self.occupants[obj.ident] = obj
+            self.occupancy[x * self.height + y] = obj.ident
+
+    # Draw the cell at (x, y) on a StdDraw canvas, the window by default
+    def draw(self, x, y, canvas=StdDraw.getDefaultCanvas()):
+        TileView(self, x, y).draw(x, y, canvas)
+
+    # Column x of the grid, so existing callers can keep writing
+    #    tiles[x][y] and get a Tile-compatible view of the cell
+    def __getitem__(self, x):
+        return TileColumn(self, x)
+
+    def __len__(self):
+        return self.width
+
+# One column of a TileGrid
+class TileColumn:
+
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.x = x
+
+    def __getitem__(self, y):
+        return TileView(self.grid, self.x, y)
+
+    def __len__(self):
+        return self.grid.height
+
+# A Tile-compatible view of one cell of a TileGrid. Reads and writes of its
+#    type, lit and occupied attributes go to the grid's arrays, so every
+#    Tile method works on it unchanged.
+class TileView(Tile):
+
+    def __init__(self, grid, x, y):
+        self.grid = grid
+        self.cell = x * grid.height + y
+        self.x = x
+        self.y = y
+
+    @property
+    def type(self):
+        return TileGrid.TYPES[self.grid.types[self.cell]]
+
+    @type.setter
+    def type(self, tileType):
+        self.grid.types[self.cell] = tileType.value
+
+    @property
+    def lit(self):
+        return self.grid.lit[self.cell] != 0
+
+    @lit.setter
+    def lit(self, value):
+        self.grid.lit[self.cell] = 1 if value else 0
+
+    @property
+    def occupied(self):
+        return self.grid.getOccupant(self.x, self.y)
+
+    @occupied.setter
+    def occupied(self, obj):
+        self.grid.setOccupant(self.x, self.y, obj)
+
+    def isOpaque(self):
+        return TileGrid.OPAQUE[self.grid.types[self.cell]] != 0
+
+    def isPassable(self):
+        return TileGrid.PASSABLE[self.grid.types[self.cell]] != 0
+
+    def getDamage(self):
+        return TileGrid.DAMAGE[self.grid.types[self.cell]]
+
+#
+# Main code for testing the TileGrid class
+#
+if __name__ == "__main__":
+    codes = ["B", "L", "W", "F", "G", "M", "S"]
+    grid = TileGrid(len(codes), 2)
+    for i in range(0, len(codes)):
+        for j in range(0, 2):
+            grid.setCode(i, j, codes[i])
+            if (i + j) % 2 == 0:
+                grid.setLit(i, j, True)
+    # The view and the grid should agree with a plain Tile of each type
+    for i in range(0, len(codes)):
+        tile = Tile(codes[i])
+        view = grid[i][0]
+        print("%s : lit %s\topaque %s\tpassable %s\tdamage %d" %(codes[i], view.getLit(),
+              view.isOpaque() == tile.isOpaque(), view.isPassable() == tile.isPassable(),
+              grid.getDamage(i, 0)))
+    print("bytes per cell: %d" % ((len(grid.types) + len(grid.lit) +
+          grid.occupancy.itemsize * len(grid.occupancy)) // (grid.width * grid.height)))
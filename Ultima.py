@@ -3,37 +3,36 @@
 #
 # Description: Game loop for the Ultima 0.1 project.
 #
+# Usage: python Ultima.py level [fps]
+#
 
 import sys
 from World import World
-import StdDraw
-import pygame
+from GameLoop import GameLoop
 
 # Program must be run with a configuration file specified
-if len(sys.argv) < 1:
+if len(sys.argv) < 2:
     print("Must specify a level file!")
 else:
     # Create a game world and draw it
     world = World(sys.argv[1])
-    world.draw()
-    # While the game is still on:
-    while world.avatarAlive() and world.getNumMonsters() > 0:
-        # Check to see if the player has entered a key
-        #  and if so, let the world handle it
-        if StdDraw.hasNextKeyTyped():
-            ch = StdDraw.nextKeyTyped()
-            world.handleKey(ch)
-        # Redraw the world - keeping in mind there are threads
-        world.lock.acquire()
-        world.draw()
-        world.lock.release()
-        # Display avatar health in the windoe title bar
-        caption = "Health: " + str(world.avatar.getHitPoints())
-        pygame.display.set_caption(caption)
-        StdDraw.show(100)
+    # Run the game, drawing at most fps frames a second
+    fps = float(sys.argv[2]) if len(sys.argv) > 2 else GameLoop.FPS
+    loop = GameLoop(world, fps)
+    loop.run()
 
     # Game is over - display win or loss
     if (world.getNumMonsters() == 0):
         print("You win!!!")
     else:
         print("You lose...")
+    stats = loop.getLatencyStats()
+    if stats is not None:
+        print("%d frames; input to screen over %d keys: mean %.1f ms, 95%% %.1f ms, worst %.1f ms" %
+              ((loop.frames,) + stats))
+    drains, mean, peak, depth = world.renderQueue.getDepthStats()
+    print("render queue: %d cells published, %.1f waiting per frame on average, %d at most" %
+          (world.renderQueue.published, mean, peak))
+    if world.terrainCache is not None:
+        print("terrain cache: %d chunks drawn from the cache, %d rendered, %d dropped, %d held" %
+              world.terrainCache.getStats())
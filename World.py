@@ -5,81 +5,328 @@
 #              characters in the Ultima 0.1 game
 
 from Tile import Tile
+from TileGrid import TileGrid
 from Avatar import Avatar
 from Monster import Monster
+from LightCache import LightCache
+from LitRegion import LitRegion
+from Scheduler import Scheduler
+from RegionLocks import RegionLocks
+from SpatialIndex import SpatialIndex
+from FlowField import FlowField
+from MapFile import MapFile
+from EventLog import eventLog
+from RenderQueue import RenderQueue
+from TerrainCache import TerrainCache
+from ChunkedGrid import ChunkedGrid
 import math
+import time
 import sys
 import StdDraw
+import picture
 import random
 import threading
+from array import array
+from collections import deque
+
+# NumPy is only needed by the vectorized lighting engine, the monster
+#    store and the pre-rendered terrain
+try:
+    import numpy
+    from MonsterStore import MonsterStore
+    from TerrainLayer import TerrainLayer
+except ImportError:
+    numpy = None
+    MonsterStore = None
+    TerrainLayer = None
+
+# A connected region of transparent tiles together with the opaque tiles
+#    bordering it. A torch held inside the region whose light reaches
+#    every one of these cells lights exactly this set.
+class Component:
+
+    # Constructor for a component
+    #
+    # Input parameters are the component's id, the set of (x, y) cells it
+    #    lights and how many of those cells are opaque. The cells are kept
+    #    as a LitRegion, a byte a cell, so large regions stay small.
+    def __init__(self, ident, lit, opaque):
+        self.id = ident
+        self.lit = LitRegion.fromCells(lit)
+        self.opaque = opaque
+        # Bounding box of the lit cells
+        self.minX = self.lit.left
+        self.maxX = self.lit.left + self.lit.width - 1
+        self.minY = self.lit.bottom
+        self.maxY = self.lit.bottom + self.lit.height - 1
+
+    # Does a torch of radius r at (x, y) reach every cell of the bounding box
+    #
+    # The disk is convex, so it is enough to test the four corners
+    def coveredBy(self, x, y, r):
+        for cornerX in (self.minX, self.maxX):
+            for cornerY in (self.minY, self.maxY):
+                deltaX = x - cornerX
+                deltaY = y - cornerY
+                if not math.sqrt(deltaX * deltaX + deltaY * deltaY) < r:
+                    return False
+        return True
 
 class World:
 
+    # Lighting engines that light() can choose between
+    LIGHT_RECURSIVE = "recursive"     # recursive lightDFS
+    LIGHT_ITERATIVE = "iterative"     # explicit-stack lightIterative
+    LIGHT_NUMPY = "numpy"             # vectorized lightNumpy
+
+    # Default limits of the light cache: results kept, and bytes of lit
+    #    flags kept summed over all results
+    LIGHT_CACHE_ENTRIES = 256
+    LIGHT_CACHE_BYTES = 16 * 1024 * 1024
+
+    # Largest id marking cells of a region too large for the torches tried
+    #    on it so far; each attempt to label such a region marks the cells
+    #    it reached with an id of its own, COMPONENT_LARGE or less
+    COMPONENT_LARGE = -2
+
+    # Width and height in cells of the chunks a chunked world pages in, and
+    #    the default cap on the bytes of tile types it keeps in memory
+    CHUNK_SIZE = 64
+    RESIDENT_BYTES = 16 * 1024 * 1024
+
+    # Most bytes of terrain pre-rendered into one surface. Bigger maps, and
+    #    chunked ones, draw their terrain from a TerrainCache of chunks
+    #    and show only a view of VIEW_CELLS by VIEW_CELLS cells around the
+    #    avatar, moved to centre the avatar again when it comes within
+    #    VIEW_MARGIN cells of an edge.
+    TERRAIN_BYTES = 64 * 1024 * 1024
+    VIEW_CELLS = 64
+    VIEW_MARGIN = 8
+
+    # Width and height in cells of the map chunk each region lock covers
+    LOCK_CHUNK = 16
+
+    # Distance in tiles within which monsters chase the avatar
+    AGGRO_RADIUS = 8.0
+
+    # Distance in tiles within which monsters take turns. Monsters farther
+    #    away are parked until the avatar comes near; the margin keeps a
+    #    monster on the edge from being parked and woken every turn.
+    ACTIVITY_RADIUS = 16.0
+    ACTIVITY_MARGIN = 2.0
+
     # Constructor for the world
     #
     # Input parameter is a file name holding the configuration information
-    #    for the world to be created
+    #    for the world to be created, a text map or a binary one written
+    #    by MapFile, and optionally the lighting engine
+    #    used by light(), whether key presses relight incrementally,
+    #    whether the world is headless, whether monsters are kept in a
+    #    MonsterStore, the radius within which monsters chase the avatar
+    #    (0 to let every monster wander), the radius within which
+    #    monsters take turns at all (0 to keep every monster active),
+    #    whether the world is chunked, the memory cap of a chunked world
+    #    and the StdDraw canvas to draw on
     #    The constructor reads in file data, stores it in appropriate
     #    attributes and sets up the window within which to draw.
     #    It also initializes the lighting in the world.
-    def __init__(self, filename):
+    #    A headless world never opens a window or draws, and does not start
+    #    the scheduler thread: its clock starts at 0 and the caller gives
+    #    monsters their turns with stepMonsters(), so a simulation can
+    #    run without pygame's display or any sleeps.
+    #    With monsterStore set, monsters are rows of NumPy arrays in a
+    #    MonsterStore that moves every due monster in one batch, instead
+    #    of Monster objects taking turns one at a time.
+    #    A chunked world reads its tiles from the map file a chunk at a
+    #    time as they are first looked at, and keeps its tiles, lit flags
+    #    and component ids in pages of those chunks within residentBytes,
+    #    as far as the cells still lit or labelled allow (see
+    #    ChunkedGrid), dropping the least recently used tile chunks. The
+    #    map file should be a binary one so chunks can be read without
+    #    reading the rest. Chunked worlds keep monsters as objects and
+    #    cannot use the NumPy lighting engine, which both need the whole
+    #    map in arrays.
+    #    Without a canvas the world draws in the window. Worlds given
+    #    offscreen canvases draw on surfaces of their own, so several can
+    #    be drawn in one process.
+    def __init__(self, filename, lightEngine=LIGHT_ITERATIVE, incrementalLight=True, headless=False,
+                 monsterStore=False, aggroRadius=AGGRO_RADIUS, activityRadius=ACTIVITY_RADIUS,
+                 chunked=False, residentBytes=RESIDENT_BYTES, canvas=None):
+        self.headless = headless
+        self.canvas = canvas if canvas is not None else StdDraw.getDefaultCanvas()
+        if chunked and (monsterStore or lightEngine == World.LIGHT_NUMPY):
+            raise ValueError("chunked worlds support neither the monster store nor numpy lighting")
+        # Time of the headless clock, advanced by stepMonsters()
+        self.clock = 0.0
+        # Parked monsters by id, with the time each was parked. They are
+        #    off the scheduler until the avatar comes within
+        #    activityRadius of them.
+        self.activityRadius = activityRadius
+        self.dormant = {}
+        self.dormantLock = threading.Lock()
+        self.parks = 0          # times a monster was parked
+        self.wakes = 0          # times a parked monster was woken
+        if monsterStore and MonsterStore is None:
+            raise ImportError("the monster store requires NumPy")
         # ALlow for Ultima.py to aquire a lock
         self.lock = threading.Lock()
+
+        # Cells whose appearance changed since the last frame. Any thread
+        #    publishes to the queue; only the main thread drains it and
+        #    draws. A game loop sets its listener to hear of new changes.
+        self.renderQueue = RenderQueue()
+        # Cells whose tile type changed since the last frame, so the main
+        #    thread can draw them into the pre-rendered terrain
+        self.terrainChanges = deque()
+        self.terrainLayer = None
+        self.terrainCache = None
+        # The first frame draws every cell
+        self.redrawAll = True
+        # Cells lit by the most recent call to light(), a set or a LitRegion
+        self.litCells = set()
+        self.lightEngine = lightEngine
+        self.incrementalLight = incrementalLight
+        # Avatar position and torch radius of the current lighting, and
+        #    how many of the lit cells are opaque
+        self.litState = None
+        self.litOpaque = 0
+        # Component lit in full by the current lighting, if any
+        self.litComponent = None
+        # Recent lighting results, so walking back over the same cells
+        #    does not flood fill again
+        self.lightCache = LightCache(World.LIGHT_CACHE_ENTRIES, World.LIGHT_CACHE_BYTES)
         
-        with open(filename, 'r') as f:
-            # Read in the first line of text
-            line = f.readline().split()
-            
-            # Translate that line to width and height
-            self.width = int(line[0])
-            self.height = int(line[1])
-            
-            # Read in the second line of text
-            line = f.readline().split()
-            
-            # Translate that into the avatar position
-            self.avatar = Avatar(int(line[0]), int(line[1]), int(line[2]), int(line[3]), float(line[4]))
-            self.tiles = [[None for i in range(self.height)] for j in range(self.width)]
-            
-            # Read in the rest of the file and parse into color blocks
-            line = f.read().split()
-            index = 0
-            for i in range(0, self.height):
-                for j in range(0, self.width):
-                    self.tiles[j][self.height - i - 1] = Tile(line[index])
-                    index += 1
-            
-            # After all the tiles are created the rest of the file is monsters
-            # Create all monsters
-            line = line[self.width*self.height:]
-            i = 0
-            # Keep track of number of monsters as a game ending condition
-            self.monsterList = []
-            while i < len(line):
-                monster = Monster(self, line[i], line[i+1], line[i+2], line[i+3], line[i+4], line[i+5])
-                self.monsterList.append(monster)
+        # Text and binary maps are both read into a MapFile
+        level = MapFile.open(filename) if chunked else MapFile.load(filename)
+        self.width = level.width
+        self.height = level.height
+        self.avatar = Avatar(*level.avatar)
+        # Left and bottom cell and width and height in cells of the part
+        #    of the map drawn on the canvas
+        self.view = (0, 0, self.width, self.height)
+        # Tile types, lit flags and occupants are packed into arrays;
+        #    tiles[x][y] still gives a Tile-compatible view of a cell
+        self.chunked = chunked
+        if chunked:
+            self.tiles = ChunkedGrid(level, World.CHUNK_SIZE, residentBytes)
+        else:
+            self.tiles = TileGrid(self.width, self.height)
+            level.fillGrid(self.tiles)
+        # Moves lock only the map chunks they touch
+        self.regionLocks = RegionLocks(self.width, self.height, World.LOCK_CHUNK)
+
+        # Keep track of monsters by location; the number of monsters is
+        #    a game ending condition
+        self.monsters = SpatialIndex(self.tiles)
+        # One scheduler thread gives every monster its turns
+        self.scheduler = Scheduler()
+        self.store = None
+        if monsterStore:
+            self.store = MonsterStore(self, level.monsters)
+            # The whole store takes its turns as one scheduler actor
+            if not headless:
+                self.store.startClock(time.monotonic())
+                self.scheduler.add(self.store, self.store.sleep)
+        else:
+            for record in level.monsters:
+                monster = Monster(self, *record)
+                monster.ident = len(self.monsters) + 1
                 # Set the tile the monster stands on as occupied
-                self.tiles[int(line[i+1])][int(line[i+2])].setOccupied(monster)
-                # Start the monster thread
-                threading.Thread(target=monster.run, daemon=True).start()
-                i += 6
-            f.close()
+                self.monsters.insert(monster)
+                # Schedule the monster's first move, or park it if it is
+                #    far from the avatar
+                if self.isActive(monster.getX(), monster.getY(), 0.0):
+                    self.scheduler.add(monster, monster.sleep, 0.0 if headless else None)
+                else:
+                    self.dormant[monster.ident] = (monster, self.now())
+
+        # Opacity of every tile as a boolean array for the NumPy engine
+        self.opacity = None
+        if numpy is not None and not chunked:
+            opaque = numpy.frombuffer(bytes(TileGrid.OPAQUE), dtype=numpy.uint8)
+            types = numpy.frombuffer(self.tiles.types, dtype=numpy.uint8)
+            self.opacity = opaque[types].astype(bool).reshape(self.width, self.height)
+
+        # Connected regions of transparent tiles. componentIds holds each
+        #    cell's component id by grid index, a large-region mark for
+        #    cells of a region too large for the torch that tried to label
+        #    it, or -1 for opaque cells and cells not labelled yet. Regions
+        #    are labelled the first time the avatar stands in them, so
+        #    loading never walks the whole map. largeRegions holds, for
+        #    each mark, the torch radius the region was found to need.
+        if chunked:
+            self.componentIds = self.tiles.statePages('i', -1)
+        else:
+            self.componentIds = array('i', [-1]) * (self.width * self.height)
+        self.components = {}
+        self.largeRegions = {}
+        self.nextComponent = 0
 
-        # Set up the window for drawing
-        StdDraw.setCanvasSize(self.width * Tile.SIZE, self.height * Tile.SIZE)
-        StdDraw.setXscale(0.0, self.width * Tile.SIZE)
-        StdDraw.setYscale(0.0, self.height * Tile.SIZE)
+        # Monsters near the avatar read their way to it from one shared
+        #    flow field, searched again whenever the avatar moves
+        self.flowField = None
+        if aggroRadius > 0:
+            self.flowField = FlowField(self.tiles, aggroRadius)
+            self.flowField.update(self.avatar.getX(), self.avatar.getY())
 
         # Initial lighting
         self.light(self.avatar.getX(), self.avatar.getY(), self.avatar.getTorchRadius())
+        if headless:
+            return
+
+        # Set up the canvas for drawing. Maps too big for one terrain
+        #    surface show a view around the avatar.
+        cached = chunked or self.width * self.height * Tile.SIZE * Tile.SIZE * 4 > World.TERRAIN_BYTES
+        if cached:
+            self.view = self.centredView()
+        self.canvas.setCanvasSize(self.view[2] * Tile.SIZE, self.view[3] * Tile.SIZE)
+        self.setViewScale()
+        self.canvas.setDirtyRectMode(True)
+
+        # Decode every sprite up front so frames never read from disk
+        picture.preloadSprites(list(Tile.SPRITES.values()) + [Tile.BLANK_SPRITE] + \
+                               list(Monster.SPRITES.values()) + [Avatar.SPRITE])
+        # Sprite of each lit tile type code (None for types with none),
+        #    of unlit tiles, of each monster type value and of the avatar.
+        #    The registry reads an invalidated sprite again into the same
+        #    Picture, so these stay current; the terrain drawn from them is
+        #    drawn again when the registry's generation changes.
+        self.tileSprites = [None] * len(TileGrid.TYPES)
+        for tileType, fileName in Tile.SPRITES.items():
+            self.tileSprites[tileType.value] = picture.sprite(fileName)
+        self.blankSprite = picture.sprite(Tile.BLANK_SPRITE)
+        self.monsterSprites = {monsterType.value: picture.sprite(fileName)
+                               for monsterType, fileName in Monster.SPRITES.items()}
+        self.avatarSprite = picture.sprite(Avatar.SPRITE)
+        self.spriteGeneration = picture.spriteGeneration()
+        # Draw the terrain once, so frames copy it and mask the unlit
+        #    cells instead of drawing every tile. Maps too big for that
+        #    render it a chunk at a time as it comes into view, and worlds
+        #    without NumPy draw their tiles one by one.
+        if cached:
+            self.terrainCache = TerrainCache(self.tiles, self.tileSprites, Tile.SIZE)
+        elif TerrainLayer is not None:
+            self.terrainLayer = TerrainLayer(self.tiles, self.tileSprites, Tile.SIZE)
+
+        # Draw the first frame
         self.draw()
 
+        # Let the monsters start moving
+        self.scheduler.start()
 
 
     # Accept keyboard input and performs the appropriate action
     # 
     # Input parameter is a character that indicates the action to be taken
     def handleKey(self, ch):
+        self.applyKey(ch)
+        self.updateLighting()
+
+    # Move the avatar or change its torch for a key press, without
+    #    updating the lighting
+    #
+    # Input parameter is a character that indicates the action to be taken
+    def applyKey(self, ch):
         deltaX = 0
         deltaY = 0
         if ch == 'w':
@@ -98,9 +345,17 @@ class World:
         if deltaX != 0 or deltaY != 0:    
             self.avatarMove(deltaX, deltaY)    
         
-        # Update lighting to reflect avatars new position
-        self.setLit(False)
-        self.light(self.avatar.getX(), self.avatar.getY(), self.avatar.getTorchRadius())
+    # Update lighting to reflect avatars new position
+    def updateLighting(self):
+        if self.incrementalLight:
+            changed = self.relight(self.avatar.getX(), self.avatar.getY(), self.avatar.getTorchRadius())
+        else:
+            previous = self.litCells
+            self.setLit(False)
+            self.light(self.avatar.getX(), self.avatar.getY(), self.avatar.getTorchRadius())
+            changed = previous ^ self.litCells
+        # Only cells that changed lit state need to be redrawn
+        self.markDirtyCells(changed)
         
         
     # Check if avatar is alive
@@ -115,29 +370,53 @@ class World:
     # Checks if tile at coordinates is valid and passable and not ocuupied by 
     # a monster. If an avatar is present, incur damage. If not, move to the tile
     # take damage and update occupation status.
+    # The chunks holding the monster and the tile are locked for the move,
+    # so two movers can never end up on the same tile.
     def monsterMove(self, monster, x, y):
-        # Check if tile is valid to move to
-        if x >= 0 and x < self.width and \
-           y >= 0 and y < self.height and \
-           self.tiles[x][y].isPassable() and not\
-           isinstance(self.tiles[x][y].occupied, Monster):
+        # Check if tile is on the map
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            return
+
+        stripes = self.regionLocks.acquireMove(monster.getX(), monster.getY(), x, y)
+        try:
+            # Check if tile is valid to move to
+            if monster.hp <= 0 or not self.tiles.isPassable(x, y) or \
+               self.monsters.at(x, y) is not None:
+                return
 
             # Do damage to avatar if present
             if x == self.avatar.getX() and y == self.avatar.getY():
                 self.avatar.incurDamage(monster.getDamage())
-
-                
+                # Redraw the avatar so the frame showing its health follows
+                self.markDirty(x, y)
+                if __debug__:
+                    eventLog.info("combat", "monster %d hits avatar for %d, avatar hp %d",
+                                  monster.ident, monster.getDamage(), self.avatar.getHitPoints())
             else:
+                # Set previous tile to unoccupied and update position
+                self.markDirty(monster.getX(), monster.getY())
+                self.monsters.move(monster, x, y)
+                self.markDirty(x, y)
+                if __debug__:
+                    eventLog.debug("move", "monster %d to (%d, %d)", monster.ident, x, y)
                 # Do damage associated with tile
-                monster.incurDamage(self.tiles[x][y].getDamage())
-                # Set previous tile to unoccupied
-                self.tiles[monster.getX()][monster.getY()].setOccupied(None)
-                # Update position
-                monster.setLocation(x, y)
-                self.tiles[x][y].setOccupied(monster)
-                monster.draw()
+                self.damageMonster(monster, self.tiles.getDamage(x, y))
+        finally:
+            self.regionLocks.release(stripes)
         
      
+    # Give a turn to every monster that is due at time now
+    #
+    # Used to drive a headless world from its own clock
+    # Returns the number of monster turns taken
+    def stepMonsters(self, now):
+        self.clock = now
+        if self.store is not None:
+            steps = self.store.steps
+            self.store.step(now)
+            return self.store.steps - steps
+        return self.scheduler.runDue(now)
+
     # Checks for a variety of cases and moves the avatar
     #
     # Called by the method handleKey if a direction key is pressed
@@ -147,49 +426,630 @@ class World:
         y = self.avatar.getY() + y
 
         # Check if coords are in bounds
-        if x >= 0 and x < self.width and \
-           y >= 0 and y < self.height:
-        
-           tile = self.tiles[x][y]
-           # Check if passable
-           if tile.isPassable():
-               # Check for a monster, if present do damage to the occupier
-               if tile.occupied != None:
-                   tile.occupied.incurDamage(self.avatar.damage)
-               # Otherwise, move avatar
-               else:   
-                  self.avatar.incurDamage(tile.getDamage())
-                  self.avatar.setLocation(x, y)
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            return
+
+        # Lock the chunks the avatar moves between
+        moved = False
+        with self.regionLocks.holding(((self.avatar.getX(), self.avatar.getY()), (x, y))):
+            # Check if passable
+            if self.tiles.isPassable(x, y):
+                # Check for a monster, if present do damage to the occupier
+                if self.store is not None:
+                    occupant = self.store.at(x, y)
+                    if occupant >= 0:
+                        if __debug__:
+                            eventLog.info("combat", "avatar hits monster %d for %d", occupant, self.avatar.damage)
+                        if self.store.incurDamage(occupant, self.avatar.damage):
+                            self.markDirty(x, y)
+                            if __debug__:
+                                eventLog.info("combat", "monster %d dies at (%d, %d)", occupant, x, y)
+                        return
+                occupant = self.monsters.at(x, y)
+                if occupant != None:
+                    if __debug__:
+                        eventLog.info("combat", "avatar hits monster %d for %d", occupant.ident, self.avatar.damage)
+                    self.damageMonster(occupant, self.avatar.damage)
+                # Otherwise, move avatar
+                else:
+                    self.avatar.incurDamage(self.tiles.getDamage(x, y))
+                    self.markDirty(self.avatar.getX(), self.avatar.getY())
+                    self.avatar.setLocation(x, y)
+                    self.markDirty(x, y)
+                    moved = True
+                    if __debug__:
+                        eventLog.debug("move", "avatar to (%d, %d), hp %d", x, y, self.avatar.getHitPoints())
+        if moved and self.flowField is not None:
+            self.flowField.update(x, y)
+        if moved and self.dormant:
+            self.wakeMonsters()
         
     
-    # Draw all the lit tiles
+    # Current time on the clock monsters are scheduled by
+    def now(self):
+        if self.headless:
+            return self.clock
+        return time.monotonic()
+
+    # Is the cell at (x, y) close enough to the avatar for a monster on it
+    #    to take turns
+    #
+    # margin widens the radius, so active monsters are parked a little
+    #    farther out than parked ones are woken
+    def isActive(self, x, y, margin):
+        if self.activityRadius <= 0:
+            return True
+        deltaX = x - self.avatar.getX()
+        deltaY = y - self.avatar.getY()
+        return math.sqrt(deltaX * deltaX + deltaY * deltaY) < self.activityRadius + margin
+
+    # Park a monster that has wandered far from the avatar
+    #
+    # Called by the monster at the start of its turn. A parked monster
+    #    takes no more turns, so the scheduler drops it, until
+    #    wakeMonsters() finds the avatar near it again.
+    # Returns True if the monster was parked
+    def parkIfFar(self, monster):
+        if self.isActive(monster.getX(), monster.getY(), World.ACTIVITY_MARGIN):
+            return False
+        with self.dormantLock:
+            self.dormant[monster.ident] = (monster, self.now())
+            self.parks += 1
+        return True
+
+    # Wake the parked monsters now within the activity radius of the avatar
+    #
+    # Each woken monster makes up for the turns it missed with one coarse
+    #    step and goes back on the scheduler.
+    def wakeMonsters(self):
+        near = self.monsters.within(self.avatar.getX(), self.avatar.getY(), self.activityRadius)
+        now = self.now()
+        with self.dormantLock:
+            for monster in near:
+                parked = self.dormant.pop(monster.ident, None)
+                if parked is None:
+                    continue
+                if monster.sleep > 0:
+                    monster.catchUp(int((now - parked[1]) / monster.sleep))
+                self.scheduler.add(monster, monster.sleep, now)
+                self.wakes += 1
+
+    # Accessor method
+    #
+    # Returns the number of living monsters taking turns
+    def getActiveCount(self):
+        if self.store is not None:
+            return self.store.activeCount()
+        return len(self.monsters) - self.getDormantCount()
+
+    # Accessor method
+    #
+    # Returns the number of living monsters parked far from the avatar
+    def getDormantCount(self):
+        if self.store is not None:
+            return self.store.count() - self.store.activeCount()
+        with self.dormantLock:
+            return len(self.dormant)
+
+    # Mark the cell at x,y as needing to be redrawn in the next frame
+    def markDirty(self, x, y):
+        self.renderQueue.push(x, y)
+
+    # Mark every (x, y) cell in the given collection as needing to be redrawn
+    def markDirtyCells(self, cells):
+        self.renderQueue.pushAll(cells)
+
+    # Is there anything to redraw since the last frame
+    def hasChanges(self):
+        return self.redrawAll or not self.renderQueue.isEmpty()
+
+    # Do damage to a monster, removing it from the world if it dies
+    #
+    # The caller holds the region lock for the monster's tile
+    def damageMonster(self, monster, points):
+        monster.incurDamage(points)
+        if monster.hp <= 0:
+            self.monsters.remove(monster)
+            with self.dormantLock:
+                self.dormant.pop(monster.ident, None)
+            self.markDirty(monster.getX(), monster.getY())
+            if __debug__:
+                eventLog.info("combat", "monster %d dies at (%d, %d)", monster.ident, monster.getX(), monster.getY())
+
+    # Find the monsters near the avatar
     #
-    # Only action is to draw all the components associated with the world
+    # Returns a list of the monsters less than r tiles from the avatar, or
+    #    an array of their indexes in a monster store
+    def monstersNearAvatar(self, r):
+        if self.store is not None:
+            return self.store.within(self.avatar.getX(), self.avatar.getY(), r)
+        return self.monsters.within(self.avatar.getX(), self.avatar.getY(), r)
+
+    # Returns the view of at most VIEW_CELLS by VIEW_CELLS cells centred on
+    #    the avatar as nearly as the edges of the map allow
+    def centredView(self):
+        width = min(self.width, World.VIEW_CELLS)
+        height = min(self.height, World.VIEW_CELLS)
+        left = min(max(0, self.avatar.getX() - width // 2), self.width - width)
+        bottom = min(max(0, self.avatar.getY() - height // 2), self.height - height)
+        return (left, bottom, width, height)
+
+    # Set the canvas scales so the canvas shows the cells of the view
+    def setViewScale(self):
+        left, bottom, width, height = self.view
+        self.canvas.setXscale(left * Tile.SIZE, (left + width) * Tile.SIZE)
+        self.canvas.setYscale(bottom * Tile.SIZE, (bottom + height) * Tile.SIZE)
+
+    # Centre the view on the avatar again if it has come within VIEW_MARGIN
+    #    cells of an edge of the view that is not an edge of the map
+    #
+    # Returns whether the view moved
+    def followAvatar(self):
+        left, bottom, width, height = self.view
+        x = self.avatar.getX()
+        y = self.avatar.getY()
+        margin = World.VIEW_MARGIN
+        if (x - left >= margin or left == 0) and \
+           (left + width - 1 - x >= margin or left + width == self.width) and \
+           (y - bottom >= margin or bottom == 0) and \
+           (bottom + height - 1 - y >= margin or bottom + height == self.height):
+            return False
+        view = self.centredView()
+        if view == self.view:
+            return False
+        self.view = view
+        self.setViewScale()
+        return True
+
+    # Is the cell at (x, y) inside the view
+    def inView(self, x, y):
+        left, bottom, width, height = self.view
+        return left <= x < left + width and bottom <= y < bottom + height
+
+    # Draw everything standing on the cell at x,y: the tile, then any
+    #    monster on it, then the avatar if it is there
+    def drawCell(self, x, y):
+        self.canvas.pictureCells(self.tileBatch([(x, y)]) + self.entityBatch([(x, y)]), Tile.SIZE, Tile.SIZE)
+
+    # Make the StdDraw.pictureCells() batch that draws the tiles of the given
+    #    (x, y) cells
+    def tileBatch(self, cells):
+        height = self.height
+        types = self.tiles.types
+        lit = self.tiles.lit
+        tileSprites = self.tileSprites
+        blank = self.blankSprite
+        batch = []
+        for x, y in cells:
+            cell = x * height + y
+            sprite = tileSprites[types[cell]] if lit[cell] else blank
+            if sprite is not None:
+                batch.append((sprite, x, y))
+        return batch
+
+    # Make the StdDraw.pictureCells() batch that draws the monsters and the
+    #    avatar standing on the given (x, y) cells. Monsters are only
+    #    drawn on lit tiles.
+    def entityBatch(self, cells):
+        height = self.height
+        lit = self.tiles.lit
+        monsterSprites = self.monsterSprites
+        store = self.store
+        avatarX = self.avatar.getX()
+        avatarY = self.avatar.getY()
+        batch = []
+        for x, y in cells:
+            if lit[x * height + y]:
+                if store is not None:
+                    index = store.at(x, y)
+                    monsterType = int(store.type[index]) if index >= 0 else None
+                else:
+                    occupant = self.monsters.at(x, y)
+                    monsterType = occupant.type.value if occupant is not None else None
+                sprite = monsterSprites.get(monsterType)
+                if sprite is not None:
+                    batch.append((sprite, x, y))
+            if x == avatarX and y == avatarY:
+                batch.append((self.avatarSprite, x, y))
+        return batch
+
+    # Draw the world
+    #
+    # The first frame draws every tile, monster and the avatar. After that
+    #    only the cells published to the render queue since the last frame
+    #    are redrawn, and their rectangles are handed to the canvas so the
+    #    screen update covers just those cells.
+    #    With a terrain layer the tiles are copied from the pre-rendered
+    #    terrain and the unlit ones covered by its darkness mask; with a
+    #    terrain cache they are copied from the lit chunks of the view,
+    #    and the whole view is drawn again whenever it moves to follow
+    #    the avatar; otherwise they are drawn in one
+    #    StdDraw.pictureCells() batch.
+    #    The monsters and the avatar are drawn over them in another.
+    #    After picture.invalidateSprites() the terrain is rendered again
+    #    from the new sprites and the whole view is redrawn.
+    #    Called only from the main thread, which is the only thread that
+    #    draws; monster turns just publish the cells they change.
     def draw(self):
-        # First update the lighting of the world
-        for x in range(0, self.width):
-            for y in range(0, self.height):
-                self.tiles[x][y].draw(x, y)
-        # Draw all monsters
-        for monster in self.monsterList:
-            if monster.hp <= 0:
-                self.monsterList.remove(monster)
-                self.tiles[monster.getX()][monster.getY()].setOccupied(None)
+        dirty = self.renderQueue.drain()
+        if self.headless:
+            return
+
+        # Sprites read again since the last frame are drawn in the tables
+        #    already, but the pre-rendered terrain still shows the old ones
+        if self.spriteGeneration != picture.spriteGeneration():
+            self.spriteGeneration = picture.spriteGeneration()
+            if self.terrainCache is not None:
+                self.terrainCache = TerrainCache(self.tiles, self.tileSprites, Tile.SIZE)
+            if self.terrainLayer is not None:
+                self.terrainLayer = TerrainLayer(self.tiles, self.tileSprites, Tile.SIZE)
+            self.redrawAll = True
+
+        canvas = self.canvas
+        size = Tile.SIZE
+        layer = self.terrainLayer
+        cache = self.terrainCache
+        if self.terrainChanges:
+            changed = set()
+            while self.terrainChanges:
+                changed.add(self.terrainChanges.popleft())
+            if layer is not None:
+                layer.drawTiles(changed)
+            if cache is not None:
+                cache.invalidate(changed)
+        if cache is not None:
+            if self.followAvatar():
+                self.redrawAll = True
+            dirty = [(x, y) for x, y in dirty if self.inView(x, y)]
+        if self.redrawAll:
+            self.redrawAll = False
+            if cache is not None:
+                cache.drawView(canvas.getSurface(), self.view)
+                # Monsters are only drawn on lit cells
+                left, bottom, width, height = self.view
+                occupied = [(x, y) for x in range(left, left + width) for y in range(bottom, bottom + height)
+                            if self.tiles.getLit(x, y)]
             else:
-                monster.draw()
-        # Draw avatar
-        self.avatar.draw()
+                if layer is not None:
+                    layer.drawAll(canvas.getSurface())
+                else:
+                    canvas.pictureCells(self.tileBatch((x, y) for x in range(0, self.width)
+                                                              for y in range(0, self.height)), size, size)
+                if self.store is not None:
+                    occupied = self.store.cells()
+                else:
+                    occupied = [(monster.getX(), monster.getY()) for monster in self.monsters]
+            occupied.append((self.avatar.getX(), self.avatar.getY()))
+            canvas.pictureCells(self.entityBatch(set(occupied)), size, size)
+            left, bottom, width, height = self.view
+            canvas.markDirty(left * size, bottom * size, width * size, height * size)
+            return
+
+        if cache is not None:
+            cache.drawCells(canvas.getSurface(), self.view, dirty)
+        elif layer is not None:
+            layer.drawCells(canvas.getSurface(), dirty)
+        else:
+            canvas.pictureCells(self.tileBatch(dirty), size, size)
+        canvas.pictureCells(self.entityBatch(dirty), size, size)
+        for x, y in dirty:
+            canvas.markDirty(x * size, y * size, size, size)
 
     # Light the world
     #
     # Input parameters are the x and y position of the avatar and the
-    #    current radius of the torch.
-    #    Calls the recursive lightDFS method to continue the lighting
+    #    current radius of the torch, and optionally which engine to use.
+    #    If no engine is given the world's lightEngine is used, after
+    #    checking the precomputed components and the light cache; naming
+    #    an engine skips both so engines can be benchmarked on the same
+    #    world. useCache set to False skips the cache lookup when the
+    #    caller has already missed.
     # Returns the total number of tiles lit
-    def light(self, x, y, r):
-        result = self.lightDFS(x, y, x, y, r)
-        print("light(%d, %d, %.1f) = %d" %(x, y, r, result))
+    def light(self, x, y, r, engine=None, useCache=True):
+        self.litCells = set()
+        self.litComponent = None
+        component = None
+        cached = None
+        default = engine is None
+        if default:
+            engine = self.lightEngine
+            component = self.coveringComponent(x, y, r)
+            if component is None and useCache:
+                cached = self.lightCache.get(x, y, r)
+        if cached is not None:
+            # Cached regions are never changed, so the world can hold one
+            cached[0].setFlags(self.tiles, True)
+            self.litCells = cached[0]
+            result = len(self.litCells)
+        elif component is not None:
+            # The torch reaches all of the avatar's region, so the result
+            #    was already worked out when the map was loaded
+            component.lit.setFlags(self.tiles, True)
+            self.litCells = component.lit
+            self.litComponent = component
+            result = len(self.litCells)
+        elif engine == World.LIGHT_RECURSIVE:
+            result = self.lightDFS(x, y, x, y, r)
+        elif engine == World.LIGHT_ITERATIVE:
+            result = self.lightIterative(x, y, r)
+        elif engine == World.LIGHT_NUMPY:
+            result = self.lightNumpy(x, y, r)
+        else:
+            raise ValueError("unknown lighting engine: %s" % engine)
+        self.litState = (x, y, r)
+        if component is not None:
+            self.litOpaque = component.opaque
+        elif cached is not None:
+            self.litOpaque = cached[1]
+        else:
+            # The iterative and NumPy engines count their opaque cells
+            #    themselves
+            if engine == World.LIGHT_RECURSIVE:
+                self.litOpaque = 0
+                for litX, litY in self.litCells:
+                    if self.tiles.isOpaque(litX, litY):
+                        self.litOpaque += 1
+            if default:
+                self.lightCache.put(x, y, r, self.litRegion(x, y, r, len(self.litCells)), self.litOpaque)
+        if __debug__:
+            eventLog.info("light", "light(%d, %d, %.1f) = %d", x, y, r, result)
         return result
+
+    # Returns the count cells lit by a torch of radius r at (x, y), which
+    #    must be the current lighting, as a LitRegion. The grid's lit
+    #    flags inside the torch's bounding box are copied as they are.
+    def litRegion(self, x, y, r, count):
+        if isinstance(self.litCells, LitRegion) and self.litState == (x, y, r):
+            return self.litCells
+        reach = int(math.ceil(r))
+        left = max(0, x - reach)
+        bottom = max(0, y - reach)
+        return LitRegion.fromGrid(self.tiles, left, bottom, min(self.width, x + reach + 1) - left,
+                                  min(self.height, y + reach + 1) - bottom, count)
+
+    # Update the lighting for a new avatar position or torch radius
+    #
+    # Input parameters are the new x and y position of the avatar and the
+    #    new radius of the torch.
+    #    Only the previously lit cells are turned off instead of the whole
+    #    grid. If the previous lit region held no opaque tile then nothing
+    #    blocked the light, so it was the whole torch disk. If the cells
+    #    entering the new disk are transparent too, the new region is the
+    #    whole new disk and only the cells between the two disk edges
+    #    change, which costs time proportional to the torch perimeter.
+    #    Otherwise the new region is flood filled with light().
+    # Returns the set of (x, y) cells whose lit state changed
+    def relight(self, x, y, r):
+        if self.litState == (x, y, r):
+            return set()
+
+        # Still lighting all of the same region, so nothing changes
+        if self.litComponent is not None and \
+           self.coveringComponent(x, y, r) is self.litComponent:
+            self.litState = (x, y, r)
+            return set()
+
+        if self.litState is not None and self.litOpaque == 0:
+            oldSpans = self.diskSpans(*self.litState)
+            newSpans = self.diskSpans(x, y, r)
+            entering = self.spanDifference(newSpans, oldSpans)
+            leaving = self.spanDifference(oldSpans, newSpans)
+            opaque = False
+            for enterX, enterY in entering:
+                if self.tiles.isOpaque(enterX, enterY):
+                    opaque = True
+                    break
+            if not opaque:
+                for leaveX, leaveY in leaving:
+                    self.tiles.setLit(leaveX, leaveY, False)
+                for enterX, enterY in entering:
+                    self.tiles.setLit(enterX, enterY, True)
+                if isinstance(self.litCells, set):
+                    self.litCells -= leaving
+                    self.litCells |= entering
+                else:
+                    # Regions are never changed, so copy the new disk's
+                    #    flags rather than make a set of every lit cell
+                    count = len(self.litCells) - len(leaving) + len(entering)
+                    self.litCells = self.litRegion(x, y, r, count)
+                self.litState = (x, y, r)
+                self.litComponent = None
+                if __debug__:
+                    eventLog.info("light", "light(%d, %d, %.1f) = %d", x, y, r, len(self.litCells))
+                return entering | leaving
+
+        previous = self.litCells
+        if self.coveringComponent(x, y, r) is None:
+            # A cached result only needs the cells that differ touched
+            cached = self.lightCache.get(x, y, r)
+            if cached is not None:
+                lit, opaque = cached
+                changed = previous ^ lit
+                for cellX, cellY in changed:
+                    self.tiles.setLit(cellX, cellY, (cellX, cellY) in lit)
+                self.litCells = lit
+                self.litState = (x, y, r)
+                self.litOpaque = opaque
+                self.litComponent = None
+                if __debug__:
+                    eventLog.info("light", "light(%d, %d, %.1f) = %d", x, y, r, len(lit))
+                return changed
+
+        self.clearLit(previous)
+        self.light(x, y, r, useCache=False)
+        return previous ^ self.litCells
+
+    # Turn off the lit flags of the given cells, a set or a LitRegion
+    def clearLit(self, cells):
+        if isinstance(cells, LitRegion):
+            cells.setFlags(self.tiles, False)
+        else:
+            for litX, litY in cells:
+                self.tiles.setLit(litX, litY, False)
+
+    # Find the component a torch at (x, y) of radius r lights in full
+    #
+    # Returns the component holding (x, y) if the torch disk covers its
+    #    whole bounding box, None otherwise
+    def coveringComponent(self, x, y, r):
+        index = self.tiles.index(x, y)
+        ident = self.componentIds[index]
+        if ident == -1:
+            if self.tiles.isOpaque(x, y):
+                return None
+            self.labelComponent(x, y, r)
+            ident = self.componentIds[index]
+        elif ident <= World.COMPONENT_LARGE and self.largeRegions.get(ident, 0) < r:
+            # A bigger torch than the last attempt might cover the region
+            self.labelComponent(x, y, r)
+            ident = self.componentIds[index]
+        if ident < 0:
+            return None
+        component = self.components[ident]
+        if component.coveredBy(x, y, r):
+            return component
+        return None
+
+    # Label the transparent region holding (x, y) as a new component
+    #
+    # Flood fills the transparent cells connected to (x, y), recording the
+    #    new id for each one, and collects the opaque cells bordering them.
+    #    The torch of radius r at (x, y) that wants the component covers it
+    #    only if every one of those cells is closer than r, so the fill
+    #    stops at the first cell that is not and the region is not kept:
+    #    the cells filled so far get a large-region mark instead, which
+    #    remembers that cell's distance as the radius the region needs,
+    #    and the region is tried again only by a torch bigger than that.
+    #    The fill never leaves the torch disk, and a torch of the same size
+    #    does not label the region again at every step.
+    def labelComponent(self, x, y, r):
+        ident = self.nextComponent
+        self.nextComponent += 1
+        lit = set()
+        opaque = 0
+        stack = [(x, y)]
+        while stack:
+            currentX, currentY = stack.pop()
+            if currentX < 0 or currentY < 0 or \
+               currentX >= self.width or currentY >= self.height or \
+               (currentX, currentY) in lit:
+                continue
+            deltaX = x - currentX
+            deltaY = y - currentY
+            distance = math.sqrt(deltaX * deltaX + deltaY * deltaY)
+            if not distance < r:
+                mark = World.COMPONENT_LARGE - ident
+                self.largeRegions[mark] = distance
+                for cellX, cellY in lit:
+                    if not self.tiles.isOpaque(cellX, cellY):
+                        self.componentIds[self.tiles.index(cellX, cellY)] = mark
+                return
+            lit.add((currentX, currentY))
+            if self.tiles.isOpaque(currentX, currentY):
+                opaque += 1
+                continue
+            self.componentIds[self.tiles.index(currentX, currentY)] = ident
+            stack.append((currentX - 1, currentY))
+            stack.append((currentX + 1, currentY))
+            stack.append((currentX, currentY - 1))
+            stack.append((currentX, currentY + 1))
+        self.components[ident] = Component(ident, lit, opaque)
+
+    # Relabel the components around (x, y) after that tile changed opacity
+    #
+    # Only the components holding (x, y) or one of its neighbours can
+    #    split, merge or gain or lose a bordering cell, so just their cells
+    #    are cleared, to be labelled again when the avatar stands in them.
+    #    Cells with a large-region mark are cleared too, as the region
+    #    they belong to may now be small: every part of a marked patch
+    #    that the change cut off touches (x, y), so clearing the cells
+    #    joined to the neighbours through the same mark clears them all.
+    def updateComponents(self, x, y):
+        for nextX, nextY in ((x, y), (x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            if nextX < 0 or nextY < 0 or nextX >= self.width or nextY >= self.height:
+                continue
+            ident = self.componentIds[self.tiles.index(nextX, nextY)]
+            if ident >= 0 and ident in self.components:
+                component = self.components.pop(ident)
+                for cellX, cellY in component.lit:
+                    if self.componentIds[self.tiles.index(cellX, cellY)] == ident:
+                        self.componentIds[self.tiles.index(cellX, cellY)] = -1
+            elif ident <= World.COMPONENT_LARGE:
+                self.largeRegions.pop(ident, None)
+                stack = [(nextX, nextY)]
+                while stack:
+                    cellX, cellY = stack.pop()
+                    if cellX < 0 or cellY < 0 or cellX >= self.width or cellY >= self.height or \
+                       self.componentIds[self.tiles.index(cellX, cellY)] != ident:
+                        continue
+                    self.componentIds[self.tiles.index(cellX, cellY)] = -1
+                    stack.append((cellX - 1, cellY))
+                    stack.append((cellX + 1, cellY))
+                    stack.append((cellX, cellY - 1))
+                    stack.append((cellX, cellY + 1))
+        self.componentIds[self.tiles.index(x, y)] = -1
+
+    # Change the type of the tile at (x, y)
+    #
+    # Input parameters are the tile's position and its new TileType.
+    #    Keeps the opacity array and the components up to date, relights
+    #    the world and marks the changed cells for redrawing.
+    def changeTile(self, x, y, tileType):
+        wasOpaque = self.tiles.isOpaque(x, y)
+        self.tiles.setType(x, y, tileType)
+        if self.tiles.isOpaque(x, y) != wasOpaque:
+            if self.opacity is not None:
+                self.opacity[x, y] = self.tiles.isOpaque(x, y)
+            self.updateComponents(x, y)
+            self.lightCache.invalidate(x, y)
+        if self.flowField is not None:
+            self.flowField.invalidate(x, y)
+
+        previous = self.litCells
+        self.clearLit(previous)
+        if self.litState is not None:
+            self.light(*self.litState)
+        self.terrainChanges.append((x, y))
+        self.markDirtyCells(previous ^ self.litCells)
+        self.markDirty(x, y)
+
+    # Find the cells of the map within the torch disk
+    #
+    # Input parameters are the centre (x, y) of the disk and its radius r.
+    #    Uses the same distance test as the lighting engines.
+    # Returns a dictionary mapping each map row inside the disk to the
+    #    (first, last) columns of the disk on that row
+    def diskSpans(self, x, y, r):
+        spans = {}
+        reach = int(math.ceil(r))
+        for currentY in range(max(0, y - reach), min(self.height, y + reach + 1)):
+            deltaY = y - currentY
+            if not abs(deltaY) < r:
+                continue
+            half = int(math.sqrt(max(0.0, r * r - deltaY * deltaY)))
+            while half > 0 and not math.sqrt(half * half + deltaY * deltaY) < r:
+                half -= 1
+            while math.sqrt((half + 1) * (half + 1) + deltaY * deltaY) < r:
+                half += 1
+            spans[currentY] = (max(0, x - half), min(self.width - 1, x + half))
+        return spans
+
+    # Find the cells covered by one set of disk spans but not another
+    #
+    # Input parameters are two dictionaries returned by diskSpans.
+    # Returns the set of (x, y) cells in spans but not in others
+    def spanDifference(self, spans, others):
+        cells = set()
+        for row, (first, last) in spans.items():
+            if row in others:
+                otherFirst, otherLast = others[row]
+                columns = list(range(first, min(last, otherFirst - 1) + 1))
+                columns.extend(range(max(first, otherLast + 1), last + 1))
+            else:
+                columns = range(first, last + 1)
+            for column in columns:
+                cells.add((column, row))
+        return cells
     
     # Recursively light from (x, y) limiting to radius r
     #
@@ -200,7 +1060,7 @@ class World:
     def lightDFS(self, x, y, currentX, currentY, r):
         if currentX < 0 or currentY < 0 or \
            currentX >= self.width or currentY >= self.height or \
-           self.tiles[currentX][currentY].getLit():
+           self.tiles.getLit(currentX, currentY):
                 return 0
         
         result = 0
@@ -210,16 +1070,146 @@ class World:
         dist = math.sqrt(deltaX * deltaX + deltaY * deltaY)
 
         if dist < r:
-            self.tiles[currentX][currentY].setLit(True)
+            self.tiles.setLit(currentX, currentY, True)
+            self.litCells.add((currentX, currentY))
             result += 1
                                                             
-            if not self.tiles[currentX][currentY].isOpaque():
+            if not self.tiles.isOpaque(currentX, currentY):
                 result += self.lightDFS(x, y, currentX - 1, currentY, r)	# west		
                 result += self.lightDFS(x, y, currentX + 1, currentY, r)	# east
                 result += self.lightDFS(x, y, currentX, currentY - 1, r)	# north
                 result += self.lightDFS(x, y, currentX, currentY + 1, r)	# south							
         return result
             
+    # Light from (x, y) limiting to radius r without recursion
+    #
+    # Visits the same cells as lightDFS, but keeps the cells still to be
+    #    looked at on an explicit stack, so the search depth is not bounded
+    #    by Python's recursion limit on large open maps. The search works
+    #    on a copy of the tile types of the torch's bounding box and marks
+    #    the lit cells in flags of its own, which become the LitRegion of
+    #    the lit cells, and counts the opaque ones as it goes, so a
+    #    chunked grid's pages are not looked up cell by cell. Cells are
+    #    marked as they are pushed, so each is on the stack, an array of
+    #    box indexes, at most once.
+    # Returns the number of tiles lit
+    def lightIterative(self, x, y, r):
+        reach = int(math.ceil(r))
+        left = max(0, x - reach)
+        bottom = max(0, y - reach)
+        width = min(self.width, x + reach + 1) - left
+        height = min(self.height, y + reach + 1) - bottom
+        types = self.tiles.getTypeBox(left, bottom, width, height)
+        lit = bytearray(width * height)
+        opaque = TileGrid.OPAQUE
+        # The torch's position inside the box
+        x -= left
+        y -= bottom
+        result = 0
+        litOpaque = 0
+        stack = array('i')
+        if r > 0:
+            lit[x * height + y] = 1
+            stack.append(x * height + y)
+        while stack:
+            cell = stack.pop()
+            result += 1
+            if opaque[types[cell]]:
+                litOpaque += 1
+                continue
+
+            currentX, currentY = divmod(cell, height)
+            for nextX, nextY in ((currentX - 1, currentY),     # west
+                                 (currentX + 1, currentY),     # east
+                                 (currentX, currentY - 1),     # north
+                                 (currentX, currentY + 1)):    # south
+                if nextX < 0 or nextY < 0 or nextX >= width or nextY >= height:
+                    continue
+                nextCell = nextX * height + nextY
+                if lit[nextCell]:
+                    continue
+                deltaX = x - nextX
+                deltaY = y - nextY
+                if math.sqrt(deltaX * deltaX + deltaY * deltaY) < r:
+                    lit[nextCell] = 1
+                    stack.append(nextCell)
+        self.litCells = LitRegion(left, bottom, width, height, bytes(lit), result)
+        self.litCells.setFlags(self.tiles, True)
+        self.litOpaque = litOpaque
+        return result
+
+    # Light from (x, y) limiting to radius r with NumPy array operations
+    #
+    # Works on the bounding box of the torch disk. The transparent cells
+    #    inside the disk that are connected to the avatar are found by
+    #    alternately spreading along runs of cells in each row and each
+    #    column until nothing changes; the lit cells are those plus every
+    #    disk cell next to one of them, which is exactly what lightDFS
+    #    lights. The lit cells are kept as a LitRegion of the mask and
+    #    the opaque ones counted from it, so no Python code runs per cell.
+    # Returns the number of tiles lit
+    def lightNumpy(self, x, y, r):
+        if numpy is None:
+            raise ImportError("the numpy lighting engine needs NumPy")
+        if self.opacity is None:
+            raise ValueError("chunked worlds support neither the monster store nor numpy lighting")
+        reach = int(math.ceil(r))
+        left = max(0, x - reach)
+        right = min(self.width, x + reach + 1)
+        bottom = max(0, y - reach)
+        top = min(self.height, y + reach + 1)
+
+        deltaX = numpy.arange(left, right).reshape(-1, 1) - x
+        deltaY = numpy.arange(bottom, top).reshape(1, -1) - y
+        disk = numpy.sqrt(deltaX * deltaX + deltaY * deltaY) < r
+        clear = disk & ~self.opacity[left:right, bottom:top]
+
+        # Transparent cells reachable from the avatar
+        reached = numpy.zeros_like(clear)
+        reached[x - left, y - bottom] = clear[x - left, y - bottom]
+        while True:
+            spread = self.fillRuns(clear, reached)
+            spread = self.fillRuns(clear.T, spread.T).T
+            if numpy.array_equal(spread, reached):
+                break
+            reached = spread
+
+        # Cells next to a reachable transparent cell are lit as well
+        lit = reached.copy()
+        lit[1:, :] |= reached[:-1, :]
+        lit[:-1, :] |= reached[1:, :]
+        lit[:, 1:] |= reached[:, :-1]
+        lit[:, :-1] |= reached[:, 1:]
+        lit &= disk
+        lit[x - left, y - bottom] = True
+
+        flags = numpy.frombuffer(self.tiles.lit, dtype=numpy.uint8).reshape(self.width, self.height)
+        flags[left:right, bottom:top][lit] = 1
+        self.litCells = LitRegion.fromMask(left, bottom, lit)
+        self.litOpaque = int(numpy.count_nonzero(lit & self.opacity[left:right, bottom:top]))
+        return len(self.litCells)
+
+    # Spread reached cells along the runs of open cells in each row
+    #
+    # Input parameters are two boolean arrays of the same shape: the open
+    #    cells, and the open cells already reached.
+    # Returns the reached cells after every run holding a reached cell
+    #    has been reached in full
+    def fillRuns(self, cells, reached):
+        rows = cells.shape[0]
+        # A closed column at the end of each row keeps runs from wrapping
+        padded = numpy.zeros((rows, cells.shape[1] + 1), dtype=bool)
+        padded[:, :-1] = cells
+        flat = padded.ravel()
+        starts = flat.copy()
+        starts[1:] &= ~flat[:-1]
+        runs = numpy.cumsum(starts)
+        hit = numpy.zeros(runs[-1] + 1 if len(runs) else 1, dtype=bool)
+        flatReached = numpy.zeros_like(padded)
+        flatReached[:, :-1] = reached
+        hit[runs[flatReached.ravel()]] = True
+        return (flat & hit[runs]).reshape(padded.shape)[:, :-1]
+
     # Turn all the lit values of the tiles to a given value. Used
     #    to reset lighting each time the avatar moves or the torch
     #    strength changes
@@ -228,15 +1218,15 @@ class World:
     #    the light, but is flexible to turn the light on in some future
     #    version
     def setLit(self, value):
-        for x  in range(0, self.width):
-            for y in range(0, self.height):
-                self.tiles[x][y].setLit(value)
+        self.tiles.setAllLit(value)
                 
             
     #
-    # Return the length of the list of monsters
+    # Return the number of monsters still alive
     def getNumMonsters(self):
-        return len(self.monsterList)
+        if self.store is not None:
+            return self.store.count()
+        return len(self.monsters)
     
 # Main code to test the world class
 if __name__ == "__main__":
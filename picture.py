@@ -8,6 +8,7 @@ The picture module defines the Picture class.
 
 import os
 import sys
+import threading
 import color
 import stdarray
 
@@ -128,4 +129,107 @@ class Picture:
            c.getBlue(), 0)
         self._surface.set_at((x, y), pygameColor)
 
+#-----------------------------------------------------------------------
+
+# Process-wide sprite registry.  Each image file is decoded once,
+# converted to the display pixel format, and the same Picture object is
+# handed out on every later request.  Invalidating a sprite reads its
+# file again into that same Picture, so callers may keep the Pictures
+# they are given.  The hit and miss counters let a caller confirm that
+# steady-state frames do no file I/O.
+
+_sprites = {}
+_spriteHits = 0
+_spriteMisses = 0
+_spriteGeneration = 0
+_spriteLock = threading.Lock()
+
+def _toDisplayFormat(surface):
+    """
+    Return surface converted to the pixel format of the display, or
+    surface itself if no display mode has been set yet.
+    """
+    if pygame.display.get_surface() is None:
+        return surface
+    if surface.get_flags() & pygame.SRCALPHA:
+        return surface.convert_alpha()
+    return surface.convert()
+
+def sprite(fileName):
+    """
+    Return the shared Picture for the image file whose name is
+    fileName, reading it from disk only the first time it is asked for.
+    """
+    global _spriteHits
+    global _spriteMisses
+    with _spriteLock:
+        pic = _sprites.get(fileName)
+        if pic is not None:
+            _spriteHits += 1
+            return pic
+        _spriteMisses += 1
+        pic = Picture(fileName)
+        pic._surface = _toDisplayFormat(pic._surface)
+        _sprites[fileName] = pic
+        return pic
+
+def preloadSprites(fileNames):
+    """
+    Load every image file named in fileNames into the sprite registry
+    so that the first frame does not pay for decoding them.
+    """
+    for fileName in fileNames:
+        sprite(fileName)
+
+def invalidateSprites(fileName=None):
+    """
+    Read the image file whose name is fileName again into the Picture
+    the registry hands out for it, so that everything holding that
+    Picture draws the new image.  If fileName is None, read every
+    cached sprite again.  A file not in the registry is read on its
+    first use as before.
+    """
+    global _spriteGeneration
+    with _spriteLock:
+        if fileName is None:
+            fileNames = list(_sprites)
+        else:
+            fileNames = [fileName] if fileName in _sprites else []
+        for name in fileNames:
+            _sprites[name]._surface = _toDisplayFormat(Picture(name)._surface)
+        _spriteGeneration += 1
 
+def spriteGeneration():
+    """
+    Return a number that changes every time invalidateSprites() is
+    called, so that a caller keeping images drawn from sprites knows
+    to draw them again.
+    """
+    return _spriteGeneration
+
+def convertSprites():
+    """
+    Convert every cached sprite to the pixel format of the display.
+    Called once the display mode is known, for sprites that were
+    loaded before the window existed.
+    """
+    with _spriteLock:
+        for pic in _sprites.values():
+            pic._surface = _toDisplayFormat(pic._surface)
+
+def spriteStats():
+    """
+    Return a (hits, misses) tuple counting sprite requests served from
+    the registry and requests that had to read an image file.
+    """
+    return (_spriteHits, _spriteMisses)
+
+def resetSpriteStats():
+    """
+    Set the sprite hit and miss counters back to zero.
+    """
+    global _spriteHits
+    global _spriteMisses
+    with _spriteLock:
+        _spriteHits = 0
+        _spriteMisses = 0